@@ -6,6 +6,7 @@
 // License: LGPLv3
 
 #include <SoftwareSerial.h>
+#include "frame_parser.h"
 
 SoftwareSerial swSerial(10, 11); // RX, TX
 
@@ -23,6 +24,20 @@ SoftwareSerial swSerial(10, 11); // RX, TX
 // CTRL.5: 0 = DIG_MOVE_DWN ,   1 = DIG_MOVE_UP 0x20
 // CTRL.6: 0 = LED_OFF ,        1 = LED_ON      0x40
 // CRC: 0-255
+// Reply: "<ADC>:OK\r\n" or "<ADC>:ERR\r\n"
+//
+// Protocol v2 (see py/protocol.py), v1 frames are still accepted:
+// [0xfe][SEQ][SPD_L][SPD_R][CTRL][CRC]         frame, CRC over SEQ..CTRL
+// [0xfd][SEQ][ADC_LO][ADC_HI][FLAGS][CRC]      reply, CRC over SEQ..FLAGS
+// [0xfc][VERSION][CRC]                         hello, sent at boot and as
+//                                              the answer to a hello
+// FLAGS.0: frame rejected (CRC error)
+// FLAGS.1: the failsafe stopped the robot before this frame
+
+#define REPLY_START 0xfd
+#define PROTOCOL_VERSION 2
+#define FLAG_CRC_ERR 0x01
+#define FLAG_FAILSAFE 0x02
 
 // Constants and pin assignments
 #define L_WHL_PWM_PIN 3
@@ -48,24 +63,16 @@ SoftwareSerial swSerial(10, 11); // RX, TX
 #define LED 12
 #define LED_MAP 0x40
 
+// Stop everything when no valid frame arrived for this long. The control
+// unit repeats unchanged frames every 200 ms while driving.
+#define FAILSAFE_MS 500
+
 byte data[3];
-byte buff;
-
-// Calculate CRC
-int get_crc() {
-    byte crc = 0;
-    for (int i = 0; i < 3; i++) {
-        crc ^= data[i];
-        for (int j = 0; j < 8; j++) {
-            if (crc & 0x01) {
-                crc = (crc >> 1) ^ 0x8C;
-            } else {
-                crc >>= 1;
-            }
-        }
-    }
-    return crc;
-}
+struct fp_parser parser;
+struct fp_frame frame;
+unsigned long last_frame = 0;
+bool failsafe = true;
+bool tripped = false;
 
 // Handle left and right wheels
 void handle_wheels() {
@@ -105,6 +112,77 @@ void handle_led() {
     digitalWrite(LED, data[2] & LED_MAP);
 }
 
+// Stop wheels and digger, same as a stop frame
+void handle_failsafe() {
+    tripped = data[0] || data[1] ||
+        (data[2] & (DIG_ROT_ON_MAP | DIG_MOVE_ON_MAP));
+    data[0] = 0;
+    data[1] = 0;
+    data[2] = L_WHL_DIR_MAP;
+    handle_wheels();
+    handle_dig_rot();
+    handle_dig_move();
+    failsafe = true;
+}
+
+// Apply a frame with a valid CRC from data[]
+void handle_frame() {
+    last_frame = millis();
+    failsafe = false;
+    tripped = false;
+    handle_wheels();
+    handle_dig_rot();
+    handle_dig_move();
+    handle_led();
+}
+
+// v2 binary reply with the battery ADC value
+void send_reply(byte seq, byte flags) {
+    int adc = analogRead(A0);
+    byte reply[6] = {REPLY_START, seq, (byte)(adc & 0xff), (byte)(adc >> 8),
+                     flags, 0};
+    reply[5] = fp_crc(reply + 1, 4);
+    swSerial.write(reply, 6);
+}
+
+// Announce our protocol version
+void send_hello() {
+    byte hello[HELLO_LEN] = {HELLO_START, PROTOCOL_VERSION, 0};
+    hello[2] = fp_crc(hello + 1, 1);
+    swSerial.write(hello, HELLO_LEN);
+}
+
+// Valid frame from the parser
+void handle_parsed() {
+    switch (frame.start) {
+    case V1_START:
+        memcpy(data, frame.data, 3);
+        swSerial.println(String(analogRead(A0)) + ":OK");
+        handle_frame();
+        break;
+    case V2_START:
+        memcpy(data, frame.data, 3);
+        send_reply(frame.seq, tripped ? FLAG_FAILSAFE : 0);
+        handle_frame();
+        break;
+    case HELLO_START:
+        send_hello();
+        break;
+    }
+}
+
+// Frame with a bad CRC, answered once until the parser is back in sync
+void handle_rejected() {
+    switch (frame.start) {
+    case V1_START:
+        swSerial.println(String(analogRead(A0)) + ":ERR");
+        break;
+    case V2_START:
+        send_reply(frame.seq, FLAG_CRC_ERR);
+        break;
+    }
+}
+
 void setup() {
     pinMode(R_WHL_PWM_PIN, OUTPUT);
     pinMode(R_WHL_DIR_PIN, OUTPUT);
@@ -116,27 +194,26 @@ void setup() {
     pinMode(DIG_MOVE_DIR_PIN, OUTPUT);
     pinMode(LED, OUTPUT);
 
+    fp_init(&parser);
     swSerial.begin(38400);
     swSerial.println("MOODBOT v0.5.0");
+    send_hello();
 }
 
 void loop() {
-    if (swSerial.available() >= 5) {
-        buff = swSerial.read();
-        if (buff == 0xff) {
-            for (int i = 0; i < 3; i++) {
-                data[i] = swSerial.read();
-            }
-            buff = swSerial.read();
-            if (buff == get_crc()) {
-                swSerial.println(String(analogRead(A0)) + ":OK");
-                handle_wheels();
-                handle_dig_rot();
-                handle_dig_move();
-                handle_led();
-            } else {
-                swSerial.println(String(analogRead(A0)) + ":ERR");
-            }
+    while (swSerial.available() > 0) {
+        fp_push(&parser, swSerial.read());
+    }
+    byte result;
+    while ((result = fp_poll(&parser, &frame)) != FP_NONE) {
+        if (result == FP_FRAME) {
+            handle_parsed();
+        } else {
+            handle_rejected();
         }
     }
+
+    if (!failsafe && millis() - last_frame > FAILSAFE_MS) {
+        handle_failsafe();
+    }
 }
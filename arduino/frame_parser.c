@@ -0,0 +1,120 @@
+// Product: MoodBot (Robot)
+// Author:  Edgars Grankins
+// Company: GRCR-Technologies
+// Date:    18.10.2026
+// Version: 0.5
+// License: LGPLv3
+
+#include "frame_parser.h"
+
+// Frame length for a start byte, 0 for any other byte
+static uint8_t frame_len(uint8_t byte) {
+    switch (byte) {
+    case V1_START:
+        return V1_FRAME_LEN;
+    case V2_START:
+        return V2_FRAME_LEN;
+    case HELLO_START:
+        return HELLO_LEN;
+    default:
+        return 0;
+    }
+}
+
+// CRC-8, Dallas/Maxim polynomial (reflected)
+uint8_t fp_crc_update(uint8_t crc, uint8_t byte) {
+    crc ^= byte;
+    for (uint8_t j = 0; j < 8; j++) {
+        if (crc & 0x01) {
+            crc = (crc >> 1) ^ 0x8C;
+        } else {
+            crc >>= 1;
+        }
+    }
+    return crc;
+}
+
+uint8_t fp_crc(const uint8_t *buf, uint8_t len) {
+    uint8_t crc = 0;
+    for (uint8_t i = 0; i < len; i++) {
+        crc = fp_crc_update(crc, buf[i]);
+    }
+    return crc;
+}
+
+void fp_init(struct fp_parser *p) {
+    uint8_t *bytes = (uint8_t *)p;
+    for (uint16_t i = 0; i < sizeof(*p); i++) {
+        bytes[i] = 0;
+    }
+}
+
+uint8_t fp_push(struct fp_parser *p, uint8_t byte) {
+    uint8_t next = (p->head + 1) & FP_RING_MASK;
+    if (next == p->tail) {
+        p->overflows++;
+        return 0;
+    }
+    p->ring[p->head] = byte;
+    p->head = next;
+    return 1;
+}
+
+// Copy the candidate frame out of the ring
+static void copy_frame(const struct fp_parser *p, struct fp_frame *frame) {
+    const uint8_t *ring = p->ring;
+    uint8_t i = p->tail;
+    frame->start = ring[i];
+    i = (i + 1) & FP_RING_MASK;
+    if (frame->start == V2_START) {
+        frame->seq = ring[i];
+        i = (i + 1) & FP_RING_MASK;
+    } else {
+        frame->seq = 0;
+    }
+    for (uint8_t n = 0; n < 3; n++) {
+        frame->data[n] = ring[i];
+        i = (i + 1) & FP_RING_MASK;
+    }
+}
+
+uint8_t fp_poll(struct fp_parser *p, struct fp_frame *frame) {
+    while (((p->tail + p->pos) & FP_RING_MASK) != p->head) {
+        uint8_t byte = p->ring[(p->tail + p->pos) & FP_RING_MASK];
+        if (p->pos == 0) {
+            // Hunting for a start byte
+            p->len = frame_len(byte);
+            if (p->len == 0) {
+                p->tail = (p->tail + 1) & FP_RING_MASK;
+                p->dropped++;
+                continue;
+            }
+            p->crc = 0;
+            p->pos = 1;
+            continue;
+        }
+        if (++p->pos < p->len) {
+            p->crc = fp_crc_update(p->crc, byte);
+            continue;
+        }
+
+        // `byte` is the candidate's CRC
+        copy_frame(p, frame);
+        p->pos = 0;
+        if (byte == p->crc) {
+            p->tail = (p->tail + p->len) & FP_RING_MASK;
+            p->resync = 0;
+            p->frames++;
+            return FP_FRAME;
+        }
+        // Corrupted frame or a data byte that looked like a start byte,
+        // rescan from the next byte
+        p->tail = (p->tail + 1) & FP_RING_MASK;
+        p->crc_errors++;
+        if (!p->resync) {
+            p->resync = 1;
+            return FP_CRC_ERR;
+        }
+    }
+    return FP_NONE;
+}
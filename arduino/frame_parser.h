@@ -0,0 +1,72 @@
+// Product: MoodBot (Robot)
+// Author:  Edgars Grankins
+// Company: GRCR-Technologies
+// Date:    18.10.2026
+// Version: 0.5
+// License: LGPLv3
+//
+// RF frame parser: received bytes go into a ring buffer (fp_push), fp_poll
+// scans them one byte at a time and returns each frame with a valid CRC.
+// A candidate frame is only consumed once its CRC matches. On a CRC error
+// the scan restarts at the byte after the candidate's start byte, so a data
+// byte that looks like a start byte (a speed of 255) or a dropped byte costs
+// at most the frame it hit. Plain C, also built on the host (arduino/host).
+
+#ifndef FRAME_PARSER_H
+#define FRAME_PARSER_H
+
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+#define V1_START 0xff
+#define V1_FRAME_LEN 5          // [START][SPD_L][SPD_R][CTRL][CRC]
+#define V2_START 0xfe
+#define V2_FRAME_LEN 6          // [START][SEQ][SPD_L][SPD_R][CTRL][CRC]
+#define HELLO_START 0xfc
+#define HELLO_LEN 3             // [START][VERSION][CRC]
+
+#define FP_RING_SIZE 128        // Power of two, a full SoftwareSerial buffer
+                                // (64) plus a partial frame
+#define FP_RING_MASK (FP_RING_SIZE - 1)
+
+// fp_poll results
+#define FP_NONE 0               // Need more bytes
+#define FP_FRAME 1              // Valid frame
+#define FP_CRC_ERR 2            // First CRC error since the last valid frame
+
+struct fp_frame {
+    uint8_t start;              // V1_START, V2_START or HELLO_START
+    uint8_t seq;                // v2 only
+    uint8_t data[3];            // SPD_L SPD_R CTRL, data[0] = VERSION for a hello
+};
+
+struct fp_parser {
+    uint8_t ring[FP_RING_SIZE];
+    uint8_t head;               // Next byte to write
+    uint8_t tail;               // Start byte of the candidate frame
+    uint8_t pos;                // Candidate bytes scanned, 0 while hunting
+    uint8_t len;                // Candidate frame length
+    uint8_t crc;                // CRC of the candidate so far
+    uint8_t resync;             // CRC error seen, not reported again
+    uint32_t frames;            // Valid frames
+    uint32_t crc_errors;        // Candidates with a bad CRC
+    uint32_t dropped;           // Bytes skipped while hunting for a start
+    uint32_t overflows;         // Bytes lost to a full ring
+};
+
+void fp_init(struct fp_parser *p);
+// Add a received byte, 0 if the ring is full
+uint8_t fp_push(struct fp_parser *p, uint8_t byte);
+// Scan buffered bytes until a frame or the first CRC error after a valid one
+uint8_t fp_poll(struct fp_parser *p, struct fp_frame *frame);
+uint8_t fp_crc_update(uint8_t crc, uint8_t byte);
+uint8_t fp_crc(const uint8_t *buf, uint8_t len);
+
+#ifdef __cplusplus
+}
+#endif
+
+#endif
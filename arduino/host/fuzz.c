@@ -0,0 +1,363 @@
+// Product: MoodBot (Robot)
+// Author:  Edgars Grankins
+// Company: GRCR-Technologies
+// Date:    18.10.2026
+// Version: 0.5
+// License: LGPLv3
+//
+// Host build of the firmware frame parser. Generates a stream of v1, v2 and
+// hello frames (speeds 0-255, so data bytes look like start bytes), damages
+// some of them (bit flip, dropped, inserted or cut off bytes) and checks:
+//
+//   - every accepted frame was sent as is at that stream offset, except for
+//     frames that only match by CRC collision ("phantoms", ~1/256 of the
+//     damaged candidates)
+//   - every undamaged frame is parsed unless a phantom (or a damaged frame
+//     completed by such a collision) overlaps it, that is the parser is
+//     back in sync within one frame of any damage
+//
+//   ./fuzz [-n frames] [-p damage probability] [-s seed] [-b]
+//
+// -b benchmarks the parser instead and compares it with the firmware's
+// previous parser (drop bytes until 0xff, take the next four) on v1 frames.
+
+#include <stdint.h>
+#include <stdio.h>
+#include <stdlib.h>
+#include <string.h>
+#include <time.h>
+#include <unistd.h>
+
+#include "frame_parser.h"
+
+struct sent {
+    uint32_t offset;            // Stream offset of the start byte
+    uint8_t len;
+    uint8_t intact;
+    uint8_t parsed;
+    struct fp_frame frame;
+};
+
+struct stream {
+    uint8_t *bytes;
+    uint32_t len;
+    struct sent *frames;
+    uint32_t count;
+    uint32_t damaged;
+};
+
+static uint32_t rng_state = 1;
+
+// xorshift32, the same stream on every libc
+static uint32_t rng(void) {
+    uint32_t x = rng_state;
+    x ^= x << 13;
+    x ^= x >> 17;
+    x ^= x << 5;
+    return rng_state = x;
+}
+
+static double now(void) {
+    struct timespec ts;
+    clock_gettime(CLOCK_MONOTONIC, &ts);
+    return ts.tv_sec + ts.tv_nsec / 1e9;
+}
+
+// Encode one random frame into buf, return its length
+static uint8_t make_frame(uint8_t *buf, struct fp_frame *frame, int v1_only) {
+    uint32_t kind = v1_only ? 0 : rng() % 20;
+    memset(frame, 0, sizeof(*frame));
+    if (kind == 19) {
+        frame->start = HELLO_START;
+        frame->data[0] = 1 + rng() % 2;
+        buf[0] = HELLO_START;
+        buf[1] = frame->data[0];
+        buf[2] = fp_crc(buf + 1, 1);
+        return HELLO_LEN;
+    }
+    for (int i = 0; i < 3; i++) {
+        // Full throttle is common, so is 0xff in the speed bytes
+        frame->data[i] = rng() % 4 == 0 ? 0xff : (uint8_t)rng();
+    }
+    frame->data[2] &= 0x7f;
+    if (kind < 5) {
+        frame->start = V1_START;
+        buf[0] = V1_START;
+        memcpy(buf + 1, frame->data, 3);
+        buf[4] = fp_crc(buf + 1, 3);
+        return V1_FRAME_LEN;
+    }
+    frame->start = V2_START;
+    frame->seq = (uint8_t)rng();
+    buf[0] = V2_START;
+    buf[1] = frame->seq;
+    memcpy(buf + 2, frame->data, 3);
+    buf[5] = fp_crc(buf + 1, 4);
+    return V2_FRAME_LEN;
+}
+
+// Damage a frame in place, return its new length
+static uint8_t damage(uint8_t *buf, uint8_t len) {
+    uint8_t i = rng() % len;
+    switch (rng() % 4) {
+    case 0:
+        buf[i] ^= 1 << (rng() % 8);
+        return len;
+    case 1:
+        memmove(buf + i, buf + i + 1, len - i - 1);
+        return len - 1;
+    case 2:
+        memmove(buf + i + 1, buf + i, len - i);
+        buf[i] = rng() % 2 ? 0xff : (uint8_t)rng();
+        return len + 1;
+    default:
+        return i;
+    }
+}
+
+static void generate(struct stream *s, uint32_t count, double p, int v1_only) {
+    s->bytes = malloc(count * (V2_FRAME_LEN + 1));
+    s->frames = calloc(count, sizeof(*s->frames));
+    s->len = 0;
+    s->count = count;
+    s->damaged = 0;
+    for (uint32_t n = 0; n < count; n++) {
+        struct sent *f = &s->frames[n];
+        uint8_t *buf = s->bytes + s->len;
+        uint8_t len = make_frame(buf, &f->frame, v1_only);
+        f->offset = s->len;
+        f->len = len;
+        f->intact = rng() >= p * UINT32_MAX;
+        if (!f->intact) {
+            len = damage(buf, len);
+            s->damaged++;
+        }
+        s->len += len;
+    }
+}
+
+static int same_frame(const struct fp_frame *a, const struct fp_frame *b) {
+    return a->start == b->start && a->seq == b->seq &&
+           memcmp(a->data, b->data, a->start == HELLO_START ? 1 : 3) == 0;
+}
+
+// Index of the last sent frame starting at or before `offset`
+static uint32_t find_sent(const struct stream *s, uint32_t offset) {
+    uint32_t lo = 0, hi = s->count;
+    while (lo < hi) {
+        uint32_t mid = (lo + hi) / 2;
+        if (s->frames[mid].offset <= offset) {
+            lo = mid + 1;
+        } else {
+            hi = mid;
+        }
+    }
+    return lo ? lo - 1 : 0;
+}
+
+struct result {
+    uint32_t intact;            // Undamaged frames sent
+    uint32_t parsed;            // ... and parsed
+    uint32_t recovered;         // Damaged frames parsed anyway (a byte
+                                // inserted before them, a flipped CRC bit...)
+    uint32_t phantoms;          // Frames that were never sent
+    uint32_t shadowed;          // Undamaged frames overlapped by a phantom
+                                // or a frame recovered by CRC collision
+    uint32_t missed;            // Undamaged frames lost otherwise
+    uint32_t twice;             // Frames parsed more than once
+    uint32_t rejected;          // FP_CRC_ERR results
+};
+
+// Run the parser over the stream, pushing `chunk` bytes between polls
+static void check(struct stream *s, uint32_t chunk, struct fp_parser *parser,
+                  struct result *r) {
+    struct fp_frame frame;
+    memset(r, 0, sizeof(*r));
+    fp_init(parser);
+    // Spans [start, end) of frames parsed anywhere but where they were sent
+    uint32_t *spans = malloc(2 * sizeof(uint32_t) * (s->len / HELLO_LEN + 1));
+    uint32_t n_spans = 0;
+
+    for (uint32_t pushed = 0; pushed < s->len;) {
+        for (uint32_t end = pushed + chunk; pushed < end && pushed < s->len;) {
+            fp_push(parser, s->bytes[pushed++]);
+        }
+        uint8_t result;
+        while ((result = fp_poll(parser, &frame)) != FP_NONE) {
+            if (result == FP_CRC_ERR) {
+                r->rejected++;
+                continue;
+            }
+            uint32_t end = pushed - ((parser->head - parser->tail) & FP_RING_MASK);
+            uint8_t len = frame.start == V1_START ? V1_FRAME_LEN :
+                          frame.start == V2_START ? V2_FRAME_LEN : HELLO_LEN;
+            // Damage moves a frame by at most one byte
+            uint32_t n = find_sent(s, end - len + 1);
+            struct sent *f = &s->frames[n];
+            if (!same_frame(&f->frame, &frame) && n > 0) {
+                f = &s->frames[n - 1];
+            }
+            if (!same_frame(&f->frame, &frame)) {
+                r->phantoms++;
+            } else if (f->parsed++) {
+                r->twice++;
+            } else if (f->intact && f->offset != end - len) {
+                // Parsed at the wrong offset, cannot happen
+                r->twice++;
+            }
+            if (!f->intact || !same_frame(&f->frame, &frame)) {
+                spans[2 * n_spans] = end - len;
+                spans[2 * n_spans + 1] = end;
+                n_spans++;
+            }
+        }
+    }
+
+    uint32_t k = 0;
+    for (uint32_t n = 0; n < s->count; n++) {
+        struct sent *f = &s->frames[n];
+        if (!f->intact) {
+            r->recovered += f->parsed > 0;
+            continue;
+        }
+        r->intact++;
+        if (f->parsed) {
+            r->parsed++;
+            continue;
+        }
+        while (k < n_spans && spans[2 * k + 1] <= f->offset) {
+            k++;
+        }
+        if (k < n_spans && spans[2 * k] < f->offset + f->len) {
+            r->shadowed++;
+        } else {
+            r->missed++;
+            if (r->missed < 10) {
+                fprintf(stderr, "intact frame at %u not parsed\n", f->offset);
+            }
+        }
+    }
+    free(spans);
+}
+
+static int fuzz(uint32_t count, double p) {
+    struct stream s;
+    struct fp_parser parser;
+    struct result r;
+    generate(&s, count, p, 0);
+    check(&s, 1, &parser, &r);
+
+    printf("frames %u (%u damaged), bytes %u\n", s.count, s.damaged, s.len);
+    printf("intact %u, parsed %u, hidden by collisions %u, missed %u, "
+           "parsed twice %u\n", r.intact, r.parsed, r.shadowed, r.missed,
+           r.twice);
+    printf("damaged but parsed %u, phantoms %u, CRC errors %u (%u reported), "
+           "bytes dropped %u, overflows %u\n", r.recovered, r.phantoms,
+           parser.crc_errors, r.rejected, parser.dropped, parser.overflows);
+    free(s.bytes);
+    free(s.frames);
+    return r.missed || r.twice ? 1 : 0;
+}
+
+// The parser in arduino.ino before the ring buffer. Counts the undamaged
+// frames it parses, or with `classify` 0 every frame with a valid CRC.
+static uint32_t legacy_parse(struct stream *s, int classify) {
+    uint32_t parsed = 0;
+    uint32_t i = 0;
+    while (i + V1_FRAME_LEN <= s->len) {
+        if (s->bytes[i] != V1_START) {
+            i++;
+            continue;
+        }
+        uint8_t *buf = s->bytes + i;
+        if (buf[4] == fp_crc(buf + 1, 3)) {
+            if (classify) {
+                struct sent *f = &s->frames[find_sent(s, i)];
+                parsed += f->offset == i && f->intact;
+            } else {
+                parsed++;
+            }
+        }
+        i += V1_FRAME_LEN;
+    }
+    return parsed;
+}
+
+// Ring parser fed `chunk` bytes at a time, frames with a valid CRC
+static uint32_t ring_parse(struct stream *s, uint32_t chunk) {
+    struct fp_parser parser;
+    struct fp_frame frame;
+    fp_init(&parser);
+    uint32_t parsed = 0;
+    for (uint32_t i = 0; i < s->len;) {
+        for (uint32_t end = i + chunk; i < end && i < s->len; i++) {
+            fp_push(&parser, s->bytes[i]);
+        }
+        uint8_t result;
+        while ((result = fp_poll(&parser, &frame)) != FP_NONE) {
+            parsed += result == FP_FRAME;
+        }
+    }
+    return parsed;
+}
+
+static void bench(uint32_t count, double p) {
+    struct stream s;
+    struct fp_parser parser;
+    struct result r;
+    generate(&s, count, p, 1);
+    uint32_t intact = s.count - s.damaged;
+
+    uint32_t legacy = legacy_parse(&s, 1);
+    check(&s, 64, &parser, &r);
+    double t = now();
+    legacy_parse(&s, 0);
+    double legacy_t = now() - t;
+    t = now();
+    ring_parse(&s, 64);
+    double ring_t = now() - t;
+
+    printf("v1 frames %u (%u damaged), bytes %u\n", s.count, s.damaged, s.len);
+    printf("previous parser: %u/%u intact frames, %.2f lost per damaged frame, "
+           "%.1f ns/byte\n", legacy, intact,
+           s.damaged ? (double)(intact - legacy) / s.damaged : 0,
+           legacy_t * 1e9 / s.len);
+    printf("ring parser:     %u/%u intact frames, %.2f lost per damaged frame, "
+           "%.1f ns/byte\n", r.parsed, intact,
+           s.damaged ? (double)(intact - r.parsed) / s.damaged : 0,
+           ring_t * 1e9 / s.len);
+    free(s.bytes);
+    free(s.frames);
+}
+
+int main(int argc, char **argv) {
+    uint32_t count = 1000000;
+    double p = 0.05;
+    int run_bench = 0;
+    int opt;
+    while ((opt = getopt(argc, argv, "n:p:s:b")) != -1) {
+        switch (opt) {
+        case 'n':
+            count = strtoul(optarg, NULL, 10);
+            break;
+        case 'p':
+            p = atof(optarg);
+            break;
+        case 's':
+            rng_state = strtoul(optarg, NULL, 10) | 1;
+            break;
+        case 'b':
+            run_bench = 1;
+            break;
+        default:
+            fprintf(stderr, "usage: %s [-n frames] [-p damage] [-s seed] [-b]\n",
+                    argv[0]);
+            return 2;
+        }
+    }
+    if (run_bench) {
+        bench(count, p);
+        return 0;
+    }
+    return fuzz(count, p);
+}
@@ -20,12 +20,23 @@
 #    You should have received a copy of the GNU Lesser General Public License
 #    along with MFRC522-Python.  If not, see <http://www.gnu.org/licenses/>.
 #
-import RPi.GPIO as GPIO
-import spidev
 import signal
+import threading
 import time
 import logging
 
+
+# ISO 14443-3 CRC_A lookup table (reflected polynomial 0x8408)
+def _crc_a_table():
+    table = []
+    for i in range(256):
+        crc = i
+        for _ in range(8):
+            crc = (crc >> 1) ^ 0x8408 if crc & 1 else crc >> 1
+        table.append(crc)
+    return tuple(table)
+
+
 class MFRC522:
     MAX_LEN = 16
 
@@ -123,10 +134,53 @@ class MFRC522:
     Reserved33 = 0x3E
     Reserved34 = 0x3F
 
+    # Registers only the host writes, their last written value is what the
+    # chip holds, so reads can be served from the shadow cache
+    SHADOW_REGS = frozenset((
+        CommIEnReg, DivlEnReg, WaterLevelReg, BitFramingReg,
+        ModeReg, TxModeReg, RxModeReg, TxControlReg, TxAutoReg, TxSelReg,
+        RxSelReg, RxThresholdReg, DemodReg, MifareReg, SerialSpeedReg,
+        ModWidthReg, RFCfgReg, GsNReg, CWGsPReg, ModGsPReg,
+        TModeReg, TPrescalerReg, TReloadRegH, TReloadRegL))
+
+    # Registers the chip changes by itself (status, IRQ, FIFO, results),
+    # always read from hardware
+    VOLATILE_REGS = frozenset((
+        CommandReg, CommIrqReg, DivIrqReg, ErrorReg, Status1Reg, Status2Reg,
+        FIFODataReg, FIFOLevelReg, ControlReg, CollReg,
+        CRCResultRegM, CRCResultRegL, TCounterValueRegH, TCounterValueRegL,
+        VersionReg))
+
+    # Longest wait for the IRQ pin, the chip timer expires well before
+    IRQ_TIMEOUT = 0.05
+
+    # CalulateCRC modes: on the host, on the chip, or both and compare
+    CRC_SOFT = 'soft'
+    CRC_CHIP = 'chip'
+    CRC_CHECK = 'check'
+
+    CRC_A_TABLE = _crc_a_table()
+
     serNum = []
 
-    def __init__(self, bus=0, device=0, spd=1000000, pin_mode=10, pin_rst=-1, debugLevel='WARNING'):
-        self.spi = spidev.SpiDev()
+    def __init__(self, bus=0, device=0, spd=1000000, pin_mode=10, pin_rst=-1, debugLevel='WARNING',
+                 spi=None, gpio=None, shadow=False, pin_irq=None, crc_mode=CRC_SOFT):
+        # spi/gpio can be injected (e.g. simulated devices), default to the real ones
+        if spi is None:
+            import spidev
+            spi = spidev.SpiDev()
+        if gpio is None:
+            import RPi.GPIO as gpio
+        self.spi = spi
+        self.gpio = gpio
+        # Register shadow cache (None = disabled) and its counters
+        self.shadow = {} if shadow else None
+        self.spi_xfers = 0
+        self.shadow_hits = 0
+        # Per-command completion waits: key -> [count, total s, max s, SPI reads]
+        self.wait_stats = {}
+        self.crc_mode = crc_mode
+        self.crc_mismatches = 0
         self.spi.open(bus, device)
         self.spi.max_speed_hz = spd
 
@@ -135,10 +189,10 @@ class MFRC522:
         level = logging.getLevelName(debugLevel)
         self.logger.setLevel(level)
 
-        gpioMode = GPIO.getmode()
+        gpioMode = self.gpio.getmode()
         
         if gpioMode is None:
-            GPIO.setmode(pin_mode)
+            self.gpio.setmode(pin_mode)
         else:
             pin_mode = gpioMode
             
@@ -148,23 +202,96 @@ class MFRC522:
             else:
                 pin_rst = 22
             
-        GPIO.setup(pin_rst, GPIO.OUT)
-        GPIO.output(pin_rst, 1)
+        self.gpio.setup(pin_rst, self.gpio.OUT)
+        self.gpio.output(pin_rst, 1)
+
+        # With the IRQ line wired, wait for its falling edge instead of
+        # busy-polling the IRQ registers
+        self.irq_event = None
+        if pin_irq is not None:
+            self.irq_event = threading.Event()
+            self.gpio.setup(pin_irq, self.gpio.IN, pull_up_down=self.gpio.PUD_UP)
+            self.gpio.add_event_detect(pin_irq, self.gpio.FALLING,
+                                       callback=self.IRQ_Callback)
         self.MFRC522_Init()
 
     def MFRC522_Reset(self):
         self.Write_MFRC522(self.CommandReg, self.PCD_RESETPHASE)
+        # Soft reset restores the power-on values
+        if self.shadow is not None:
+            self.shadow.clear()
 
     def Write_MFRC522(self, addr, val):
-        val = self.spi.xfer2([(addr << 1) & 0x7E, val])
+        self.spi_xfers += 1
+        self.spi.xfer2([(addr << 1) & 0x7E, val])
+        if self.shadow is not None and addr in self.SHADOW_REGS:
+            self.shadow[addr] = val & 0xFF
 
     def Read_MFRC522(self, addr):
-        val = self.spi.xfer2([((addr << 1) & 0x7E) | 0x80, 0])
-        return val[1]
+        if self.shadow is not None:
+            val = self.shadow.get(addr)
+            if val is not None:
+                self.shadow_hits += 1
+                return val
+        self.spi_xfers += 1
+        val = self.spi.xfer2([((addr << 1) & 0x7E) | 0x80, 0])[1]
+        if self.shadow is not None and addr in self.SHADOW_REGS:
+            self.shadow[addr] = val
+        return val
+
+    # Write all bytes of data to one register (e.g. the FIFO) in one transfer
+    def Write_MFRC522_Burst(self, addr, data):
+        self.spi_xfers += 1
+        self.spi.xfer2([(addr << 1) & 0x7E] + list(data))
+
+    # Read a sequence of registers (repeats allowed) in one transfer
+    def Read_MFRC522_Burst(self, addrs):
+        self.spi_xfers += 1
+        val = self.spi.xfer2([((addr << 1) & 0x7E) | 0x80 for addr in addrs] + [0])
+        return val[1:]
+
+    # SPI transfers done and transfers saved by the shadow cache
+    def SPI_Stats(self):
+        return {'transfers': self.spi_xfers, 'saved': self.shadow_hits}
+
+    def IRQ_Callback(self, channel):
+        self.irq_event.set()
+
+    # Wait until one of the mask bits is set in an IRQ register, sleeping on
+    # the IRQ pin. Returns (register value or None on timeout, SPI reads).
+    def Wait_IRQ(self, reg, mask):
+        deadline = time.monotonic() + self.IRQ_TIMEOUT
+        reads = 0
+        while True:
+            n = self.Read_MFRC522(reg)
+            reads += 1
+            if n & mask:
+                return n, reads
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None, reads
+            self.irq_event.wait(remaining)
+            self.irq_event.clear()
+
+    def Record_Wait(self, key, start, reads):
+        elapsed = time.monotonic() - start
+        stats = self.wait_stats.get(key)
+        if stats is None:
+            stats = self.wait_stats[key] = [0, 0.0, 0.0, 0]
+        stats[0] += 1
+        stats[1] += elapsed
+        stats[2] = max(stats[2], elapsed)
+        stats[3] += reads
+
+    # Completion wait per command: count, average/max wait and SPI reads
+    def Wait_Stats(self):
+        return {key: {'count': count, 'avg': total / count, 'max': longest,
+                      'reads': reads / count}
+                for key, (count, total, longest, reads) in self.wait_stats.items()}
 
     def Close_MFRC522(self):
         self.spi.close()
-        GPIO.cleanup()
+        self.gpio.cleanup()
 
     def SetBitMask(self, reg, mask):
         tmp = self.Read_MFRC522(reg)
@@ -198,39 +325,57 @@ class MFRC522:
             irqEn = 0x77
             waitIRq = 0x30
 
-        self.Write_MFRC522(self.CommIEnReg, irqEn | 0x80)
-        self.ClearBitMask(self.CommIrqReg, 0x80)
-        self.SetBitMask(self.FIFOLevelReg, 0x80)
+        if self.irq_event is not None:
+            # Only raise the IRQ pin for completion, timeout and errors
+            self.Write_MFRC522(self.CommIEnReg, (irqEn & (waitIRq | 0x03)) | 0x80)
+            self.irq_event.clear()
+        else:
+            self.Write_MFRC522(self.CommIEnReg, irqEn | 0x80)
+        # Clear all IRQ bits (Set1=0) and flush the FIFO (FlushBuffer is the
+        # only writable bit), neither needs a read first
+        self.Write_MFRC522(self.CommIrqReg, 0x7F)
+        self.Write_MFRC522(self.FIFOLevelReg, 0x80)
 
         self.Write_MFRC522(self.CommandReg, self.PCD_IDLE)
 
-        for i in range(len(sendData)):
-            self.Write_MFRC522(self.FIFODataReg, sendData[i])
+        self.Write_MFRC522_Burst(self.FIFODataReg, sendData)
 
         self.Write_MFRC522(self.CommandReg, command)
 
         if command == self.PCD_TRANSCEIVE:
             self.SetBitMask(self.BitFramingReg, 0x80)
 
-        i = 2000
-        while True:
-            n = self.Read_MFRC522(self.CommIrqReg)
-            i -= 1
-            if ~((i != 0) and ~(n & 0x01) and ~(n & waitIRq)):
-                break
+        start = time.monotonic()
+        if self.irq_event is not None:
+            n, reads = self.Wait_IRQ(self.CommIrqReg, irqEn & (waitIRq | 0x03))
+            i = 0 if n is None else 1
+            n = n or 0
+        else:
+            i = 2000
+            while True:
+                n = self.Read_MFRC522(self.CommIrqReg)
+                i -= 1
+                # Done, or the chip timer expired (no card answered)
+                if not ((i != 0) and not (n & 0x01) and not (n & waitIRq)):
+                    break
+            reads = 2000 - i
+        self.Record_Wait((command, sendData[0]), start, reads)
 
         self.ClearBitMask(self.BitFramingReg, 0x80)
 
         if i != 0:
-            if (self.Read_MFRC522(self.ErrorReg) & 0x1B) == 0x00:
+            # Error, FIFO level and last bits in one transfer
+            error, level, control = self.Read_MFRC522_Burst(
+                [self.ErrorReg, self.FIFOLevelReg, self.ControlReg])
+            if (error & 0x1B) == 0x00:
                 status = self.MI_OK
 
                 if n & irqEn & 0x01:
                     status = self.MI_NOTAGERR
 
                 if command == self.PCD_TRANSCEIVE:
-                    n = self.Read_MFRC522(self.FIFOLevelReg)
-                    lastBits = self.Read_MFRC522(self.ControlReg) & 0x07
+                    n = level
+                    lastBits = control & 0x07
                     if lastBits != 0:
                         backLen = (n - 1) * 8 + lastBits
                     else:
@@ -241,8 +386,7 @@ class MFRC522:
                     if n > self.MAX_LEN:
                         n = self.MAX_LEN
 
-                    for i in range(n):
-                        backData.append(self.Read_MFRC522(self.FIFODataReg))
+                    backData = self.Read_MFRC522_Burst([self.FIFODataReg] * n)
             else:
                 status = self.MI_ERR
 
@@ -289,23 +433,54 @@ class MFRC522:
         return (status, backData)
 
     def CalulateCRC(self, pIndata):
-        self.ClearBitMask(self.DivIrqReg, 0x04)
-        self.SetBitMask(self.FIFOLevelReg, 0x80)
-
-        for i in range(len(pIndata)):
-            self.Write_MFRC522(self.FIFODataReg, pIndata[i])
-
-        self.Write_MFRC522(self.CommandReg, self.PCD_CALCCRC)
-        i = 0xFF
-        while True:
-            n = self.Read_MFRC522(self.DivIrqReg)
-            i -= 1
-            if not ((i != 0) and not (n & 0x04)):
-                break
-        pOutData = []
-        pOutData.append(self.Read_MFRC522(self.CRCResultRegL))
-        pOutData.append(self.Read_MFRC522(self.CRCResultRegM))
-        return pOutData
+        if self.crc_mode == self.CRC_SOFT:
+            return self.Soft_CRC(pIndata)
+        if self.crc_mode == self.CRC_CHIP:
+            return self.Chip_CRC(pIndata)
+
+        soft = self.Soft_CRC(pIndata)
+        chip = self.Chip_CRC(pIndata)
+        if soft != chip:
+            self.crc_mismatches += 1
+            self.logger.error("CRC mismatch for %s: host %s, chip %s" % (pIndata, soft, chip))
+        return chip
+
+    # CRC_A on the host, [low, high] like the chip's result registers
+    def Soft_CRC(self, pIndata):
+        table = self.CRC_A_TABLE
+        crc = 0x6363
+        for b in pIndata:
+            crc = (crc >> 8) ^ table[(crc ^ b) & 0xFF]
+        return [crc & 0xFF, crc >> 8]
+
+    # CRC_A on the chip's coprocessor
+    def Chip_CRC(self, pIndata):
+        # Clear CRCIRq (Set2=0), a read-modify-write would leave it set
+        self.Write_MFRC522(self.DivIrqReg, 0x04)
+        self.Write_MFRC522(self.FIFOLevelReg, 0x80)
+
+        self.Write_MFRC522_Burst(self.FIFODataReg, pIndata)
+
+        start = time.monotonic()
+        if self.irq_event is not None:
+            # Only CRCIRq may drive the IRQ pin while we wait
+            self.Write_MFRC522(self.CommIEnReg, 0x80)
+            self.Write_MFRC522(self.DivlEnReg, 0x84)
+            self.irq_event.clear()
+            self.Write_MFRC522(self.CommandReg, self.PCD_CALCCRC)
+            n, reads = self.Wait_IRQ(self.DivIrqReg, 0x04)
+            self.Write_MFRC522(self.DivlEnReg, 0x80)
+        else:
+            self.Write_MFRC522(self.CommandReg, self.PCD_CALCCRC)
+            i = 0xFF
+            while True:
+                n = self.Read_MFRC522(self.DivIrqReg)
+                i -= 1
+                if not ((i != 0) and not (n & 0x04)):
+                    break
+            reads = 0xFF - i
+        self.Record_Wait((self.PCD_CALCCRC, None), start, reads)
+        return self.Read_MFRC522_Burst([self.CRCResultRegL, self.CRCResultRegM])
 
     def MFRC522_SelectTag(self, serNum):
         backData = []
@@ -356,6 +531,12 @@ class MFRC522:
         # Return the status
         return status
 
+    def MFRC522_Halt(self):
+        buf = [self.PICC_HALT, 0]
+        buf += self.CalulateCRC(buf)
+        # A halted card does not answer
+        self.MFRC522_ToCard(self.PCD_TRANSCEIVE, buf)
+
     def MFRC522_StopCrypto1(self):
         self.ClearBitMask(self.Status2Reg, 0x08)
 
@@ -403,14 +584,41 @@ class MFRC522:
                 self.logger.debug("Data written")
 
 
-    def MFRC522_DumpClassic1K(self, key, uid):
-        for i in range(64):
-            status = self.MFRC522_Auth(self.PICC_AUTHENT1A, i, key, uid)
-            # Check if authenticated
-            if status == self.MI_OK:
-                self.MFRC522_Read(i)
-            else:
-                self.logger.error("Authentication error")
+    # Read blocks start..end-1 (Classic 1K, 4 blocks per sector) into one
+    # buffer, authenticating once per sector. Returns (status, buffer); the
+    # buffer is `out` if given (at least 16 bytes per block), else a new
+    # bytearray. Blocks that could not be read are left untouched.
+    def MFRC522_ReadBlocks(self, key, uid, start, end, out=None, authMode=PICC_AUTHENT1A):
+        if out is None:
+            out = bytearray((end - start) * 16)
+        status = self.MI_OK
+        block = start
+        while block < end:
+            trailer = block // 4 * 4 + 3
+            last = min(end, trailer + 1)
+            if self.MFRC522_Auth(authMode, trailer, key, uid) != self.MI_OK:
+                # The card dropped out of the authenticated state
+                return self.MI_ERR, out
+            for i in range(block, last):
+                data = self.MFRC522_Read(i)
+                if data:
+                    pos = (i - start) * 16
+                    out[pos:pos + 16] = data
+                else:
+                    status = self.MI_ERR
+            block = last
+        return status, out
+
+    # Read the data blocks (not the trailer) of one sector
+    def MFRC522_ReadSector(self, key, uid, sector, out=None):
+        return self.MFRC522_ReadBlocks(key, uid, sector * 4, sector * 4 + 3, out)
+
+    # Read all 64 blocks (trailers included) into one 1024 byte buffer
+    def MFRC522_DumpClassic1K(self, key, uid, out=None):
+        status, out = self.MFRC522_ReadBlocks(key, uid, 0, 64, out)
+        if status != self.MI_OK:
+            self.logger.error("Error while dumping card")
+        return out
 
     def MFRC522_Init(self):
         self.MFRC522_Reset()
@@ -422,4 +630,7 @@ class MFRC522:
 
         self.Write_MFRC522(self.TxAutoReg, 0x40)
         self.Write_MFRC522(self.ModeReg, 0x3D)
+        if self.irq_event is not None:
+            # Push-pull IRQ output
+            self.Write_MFRC522(self.DivlEnReg, 0x80)
         self.AntennaOn()
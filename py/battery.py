@@ -0,0 +1,73 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from time import monotonic
+from typing import Callable, Optional
+
+
+# Battery state from the robot's ADC replies, O(1) per sample.
+# The voltage sags while the motors pull current, so each sample is first
+# lifted by SAG counts per PWM step of the frame the robot was executing
+# when it took the sample, then smoothed with an EMA. The low state has a
+# hysteresis band and the discharge rate, averaged over RATE_WINDOW long
+# steps, predicts the remaining runtime.
+class BatteryEstimator:
+    EMPTY = 723         # ADC value at 0 %
+    COUNTS = 2.5        # ADC counts per percent
+    LOW_ENTER = 801     # Becomes low below this (compensated) ADC value
+    LOW_EXIT = 811      # ... and stops being low above this one
+    SAG = 0.2           # ADC counts lost per PWM step of mean wheel speed
+    ALPHA = 0.05        # EMA weight of a new sample
+    RATE_WINDOW = 30    # Seconds between discharge rate updates
+    RATE_ALPHA = 0.3    # EMA weight of a new discharge rate
+
+    def __init__(self, clock: Callable[[], float] = monotonic) -> None:
+        self.clock = clock
+        self.level = None       # Smoothed, sag compensated ADC value
+        self.low = False
+        self.rate = None        # Discharge rate in ADC counts per second
+        self.samples = 0
+        self.anchor = None      # (time, level) the current rate step began
+
+    # Feed one ADC sample taken while the wheels ran at `pwm` (mean of both
+    # wheels, 0-127)
+    def update(self, raw: int, pwm: float = 0) -> None:
+        value = raw + self.SAG * pwm
+        level = self.level
+        level = value if level is None else level + self.ALPHA * (value - level)
+        self.level = level
+        self.samples += 1
+
+        if self.low:
+            if level > self.LOW_EXIT:
+                self.low = False
+        elif level < self.LOW_ENTER:
+            self.low = True
+
+        now = self.clock()
+        if self.anchor is None:
+            self.anchor = (now, level)
+        elif now - self.anchor[0] >= self.RATE_WINDOW:
+            then, before = self.anchor
+            rate = (before - level) / (now - then)
+            self.rate = rate if self.rate is None else \
+                self.rate + self.RATE_ALPHA * (rate - self.rate)
+            self.anchor = (now, level)
+
+    # Charge in percent (0-100), None before the first sample
+    @property
+    def percent(self) -> Optional[int]:
+        if self.level is None:
+            return None
+        return min(max(int((self.level - self.EMPTY) / self.COUNTS), 0), 100)
+
+    # Predicted seconds until empty, None while not known or not discharging
+    @property
+    def runtime(self) -> Optional[float]:
+        if self.level is None or not self.rate or self.rate <= 0:
+            return None
+        return max(self.level - self.EMPTY, 0) / self.rate
@@ -0,0 +1,677 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Off-target benchmarks, run with: python3 bench.py <name> [-n N]
+
+import argparse
+import itertools
+import random
+from time import perf_counter
+
+BENCHMARKS = {}
+
+
+# Register a benchmark under a name, `n` is its default size
+def benchmark(name, n=100000):
+    def register(func):
+        BENCHMARKS[name] = (func, n)
+        return func
+    return register
+
+
+# Time `func` over `n` calls and print the rate
+def report(label: str, func, n: int) -> float:
+    start = perf_counter()
+    for _ in range(n):
+        func()
+    elapsed = perf_counter() - start
+    print(f'{label:<32} {elapsed / n * 1e6:9.2f} us/op {n / elapsed:12.0f} op/s')
+    return elapsed
+
+
+# Rough cost of one spidev xfer2 call on the Pi (syscall + setup), in us.
+# Used with 1 us per bit at 1 MHz to estimate the SPI time of a card read.
+XFER_US = 30
+
+
+# Bit-by-bit CRC-8 loop the control unit used before the table engine
+def legacy_crc8(data: bytes, poly: int) -> int:
+    crc = 0
+    for b in data:
+        crc ^= b
+        for _ in range(8):
+            if crc & 1:
+                crc = (crc >> 1) ^ poly
+            else:
+                crc >>= 1
+    return crc & 0xff
+
+
+@benchmark('crc')
+def bench_crc(n: int) -> None:
+    from crc8 import CRC8_POLY, build_frame, crc8, encode_frames
+
+    frames = [(random.randrange(128), random.randrange(128), random.randrange(128))
+              for _ in range(256)]
+    next_frame = itertools.cycle(frames).__next__
+
+    def legacy():
+        l, r, c = next_frame()
+        data = [0xFF, l, r, c, 0]
+        data[4] = legacy_crc8(bytes(data[1:4]), CRC8_POLY)
+        return bytes(data)
+
+    def table():
+        l, r, c = next_frame()
+        data = [0xFF, l, r, c, 0]
+        data[4] = crc8(bytes(data[1:4]), CRC8_POLY)
+        return bytes(data)
+
+    def frame():
+        return build_frame(*next_frame())
+
+    for l, r, c in frames:
+        assert legacy_crc8(bytes((l, r, c)), CRC8_POLY) == build_frame(l, r, c)[4]
+
+    base = report('legacy bit loop, per frame', legacy, n)
+    report('table crc8, per frame', table, n)
+    fast = report('build_frame, per frame', frame, n)
+
+    out = bytearray(len(frames) * 5)
+    batches = max(1, n // len(frames))
+    batch = report(f'encode_frames x{len(frames)}, per batch',
+                   lambda: encode_frames(frames, out), batches)
+    per_frame = batch / (batches * len(frames))
+    print(f'speedup build_frame: {base / fast:.1f}x, '
+          f'encode_frames: {base / n / per_frame:.1f}x')
+
+
+# Card reads on the simulated MFRC522 with chip/host CRC_A and busy-poll/IRQ
+# waits, reports SPI transfers per read and per empty-field poll
+@benchmark('card', n=2000)
+def bench_card(n: int) -> None:
+    from MFRC522 import MFRC522
+    from rpi_cu import MFRC522Reader
+    from sim import SimBackend, SimCard
+
+    modes = (('busy-poll, chip CRC', None, MFRC522.CRC_CHIP),
+             ('busy-poll, host CRC', None, MFRC522.CRC_SOFT),
+             ('irq, host CRC', 18, MFRC522.CRC_SOFT),
+             ('busy-poll, cross-check', None, MFRC522.CRC_CHECK))
+    for mode, pin_irq, crc_mode in modes:
+        backend = SimBackend(rfid_irq_pin=pin_irq)
+        reader = MFRC522Reader(backend, pin_irq=pin_irq, crc_mode=crc_mode)
+        driver = reader.READER
+        spi = backend.spis[0]
+        card = SimCard(b'\xde\xad\xbe\xef', 'MoodBot')
+
+        def read():
+            card.state = SimCard.IDLE
+            reader.last_uid = None
+            assert reader.read_no_block()[0]
+
+        def reread():
+            card.state = SimCard.IDLE
+            assert reader.read_no_block()[0]
+
+        def empty():
+            assert not reader.read_no_block()[0]
+
+        print(f'-- {mode}')
+        backend.rfid.insert(card)
+        before = spi.transfers
+        before_bytes = spi.bytes
+        saved = driver.shadow_hits
+        report('card read (request..block reads)', read, n)
+        transfers = (spi.transfers - before) / n
+        bus_us = transfers * XFER_US + (spi.bytes - before_bytes) / n * 8
+        print(f'SPI transfers per read: {transfers:.1f}, '
+              f'saved by shadow cache: {(driver.shadow_hits - saved) / n:.1f}, '
+              f'est. SPI time on the Pi: {bus_us / 1000:.2f} ms')
+        before = spi.transfers
+        report('same card again (UID fast path)', reread, n)
+        print(f'SPI transfers per read: {(spi.transfers - before) / n:.1f}')
+
+        backend.rfid.remove(card)
+        before = spi.transfers
+        report('empty field poll', empty, max(1, n // 10))
+        print(f'SPI transfers per poll: {(spi.transfers - before) / max(1, n // 10):.1f}')
+        for key, stats in sorted(driver.Wait_Stats().items(), key=str):
+            print(f'  wait {key}: {stats["count"]}x avg {stats["avg"] * 1e6:.1f} us, '
+                  f'{stats["reads"]:.1f} IRQ reg reads')
+        if crc_mode == MFRC522.CRC_CHECK:
+            print(f'CRC_A mismatches host vs chip: {driver.crc_mismatches}')
+
+
+# Background card polling over n virtual seconds with a tap every 10 s:
+# polls and SPI transfers per second and tap-to-read latency
+@benchmark('presence', n=600)
+def bench_presence(n: int) -> None:
+    from game import CARD_ACCEPTED
+    from rpi_cu import MFRC522Reader
+    from sim import SimBackend, SimCard
+
+    backend = SimBackend()
+    reader = MFRC522Reader(backend)
+    spi = backend.spis[0]
+    taps = list(range(5, n, 10))
+    for i, at in enumerate(taps):
+        backend.tap(SimCard(bytes((1, 2, 3, i & 0xFF))), at=at, duration=2.0)
+
+    latencies = []
+
+    def check():
+        if reader.id is not None:
+            latencies.append(backend.clock.now - max(t for t in taps if t <= backend.clock.now))
+            reader.id = None
+        backend.clock.call_later(0.001, check)
+
+    before = spi.transfers
+    reader.run()
+    check()
+    backend.clock.run(until=n)
+    print(f'polls: {reader.polls / n:.1f}/s, SPI transfers: {(spi.transfers - before) / n:.0f}/s')
+    print(f'tap-to-read latency: avg {sum(latencies) / len(latencies) * 1000:.0f} ms, '
+          f'max {max(latencies) * 1000:.0f} ms over {len(latencies)} taps')
+
+    # Tap to game start through the whole App: reader poll plus idle tick,
+    # with the previous poll backoff and 1 s idle tick vs. now
+    from rpi_cu import App
+    from sim import run_headless
+
+    for label, poll_max, idle_rate in (('before', 0.25, 1000),
+                                       ('now', MFRC522Reader.POLL_MAX,
+                                        App.IDLE_RATE)):
+        saved = MFRC522Reader.POLL_MAX, App.IDLE_RATE, App.GAME_TIMEOUT
+        MFRC522Reader.POLL_MAX, App.IDLE_RATE, App.GAME_TIMEOUT = \
+            poll_max, idle_rate, 2
+        try:
+            backend = SimBackend()
+            # Taps at odd offsets, so they do not line up with the ticks
+            taps = [5 + 10 * i + 0.137 * (i % 7) for i in range(n // 10 - 1)]
+            for i, at in enumerate(taps):
+                backend.tap(SimCard(bytes((4, 3, 2, i & 0xFF))), at=at,
+                            duration=2.0)
+            starts = []
+            app = run_headless(0, backend)
+            app.robot_controller.startup.reported = True
+            on_game_event = app.on_game_event
+
+            def recorded(event):
+                if event == CARD_ACCEPTED:
+                    starts.append(backend.clock.now)
+                on_game_event(event)
+
+            app.game.on_event = recorded
+            backend.clock.run(until=n)
+        finally:
+            MFRC522Reader.POLL_MAX, App.IDLE_RATE, App.GAME_TIMEOUT = saved
+        delays = [start - max(t for t in taps if t <= start) for start in starts]
+        print(f'tap-to-start {label:<6}: avg {sum(delays) / len(delays) * 1000:.0f} ms, '
+              f'max {max(delays) * 1000:.0f} ms over {len(delays)}/{len(taps)} taps')
+
+
+# Joystick read cost per filter (n reads) and the noise left in the value
+# the control loop sees at 20 Hz, for a centred stick with ADC noise/spikes
+@benchmark('joystick', n=100000)
+def bench_joystick(n: int) -> None:
+    from rpi_cu import MCP3004Reader
+    from sim import SimBackend
+
+    rng = random.Random(1)
+
+    def noisy(t):
+        spike = 0.3 if rng.random() < 0.02 else 0.0
+        return 0.5 + rng.gauss(0, 0.02) + spike
+
+    for mode in (None, 'ema', 'median'):
+        backend = SimBackend()
+        backend.joystick(0, noisy)
+        backend.joystick(1, 0.5)
+        reader = MCP3004Reader(backend, filter=mode)
+        reads = []
+
+        def tick():
+            reads.append(reader.read()[0])
+            backend.clock.call_later(0.05, tick)
+
+        reader.run()
+        backend.clock.call_later(0.5, tick)
+        backend.clock.run(until=60)
+        err = (sum((x - 0.5) ** 2 for x in reads) / len(reads)) ** 0.5
+        dead = sum(abs(x - 0.5) >= 0.1 for x in reads)
+        print(f'filter={mode}: rms error {err:.4f}, outside deadzone {dead}/{len(reads)}, '
+              f'{reader.samples / 60:.0f} samples/s')
+        report(f'read() filter={mode}', reader.read, n)
+
+    backend = SimBackend()
+    reader = MCP3004Reader(backend)
+    report('read() synchronous ADC', reader.read, n)
+
+
+# Frame from joystick/buttons: per-tick mixing vs. the precomputed table
+@benchmark('mixer', n=200000)
+def bench_mixer(n: int) -> None:
+    from mixer import FrameTable, mix_frame, expo
+
+    rng = random.Random(1)
+    inputs = [(rng.random(), rng.random(), rng.randrange(32)) for _ in range(1024)]
+
+    start = perf_counter()
+    table = FrameTable()
+    print(f'table build: {(perf_counter() - start) * 1000:.0f} ms, '
+          f'{len(table.blob)} bytes, {table.codes} control codes')
+    start = perf_counter()
+    FrameTable(curve=expo(0.4), trim_l=0.95)
+    print(f'table build with expo + trim: {(perf_counter() - start) * 1000:.0f} ms')
+
+    # Quantization error against the exact mix
+    worst = 0
+    mismatched = 0
+    for x, y, mask in inputs:
+        exact, quant = mix_frame(x, y, mask), table.frame(x, y, mask)
+        worst = max(worst, abs(exact[1] - quant[1]), abs(exact[2] - quant[2]))
+        mismatched += exact[3] != quant[3]
+    s = table.scale
+    same = all(table.frame(qx / s, qy / s, mask) == mix_frame(qx / s, qy / s, mask)
+               for qx in range(0, s + 1, 4) for qy in range(s + 1) for mask in range(32))
+    print(f'max PWM error: {worst}, control mismatches: {mismatched}/{len(inputs)}, '
+          f'exact on grid: {same}')
+
+    it = itertools.cycle(inputs)
+    report('mix_frame (per tick)', lambda: mix_frame(*next(it)), n)
+    report('FrameTable.frame', lambda: table.frame(*next(it)), n)
+
+
+# Frames on the RF link over n virtual seconds: every tick vs. change-driven
+# TX with keepalive, for the default scenario and a driver who mostly holds
+# the stick still
+@benchmark('tx', n=300)
+def bench_tx(n: int) -> None:
+    from rpi_cu import RobotController
+    from sim import SimCard, default_scenario, run_headless, step_trace
+
+    def held():
+        backend = default_scenario()
+        backend.joystick(0, step_trace([(5, 0.9), (20, 0.5), (35, 0.1), (60, 0.5)]))
+        backend.joystick(1, step_trace([(10, 1.0), (50, 0.5), (70, 0.0), (100, 0.5)]))
+        backend.tap(SimCard(b'\x05\x06\x07\x08'), at=200.0)
+        return backend
+
+    default = RobotController.KEEPALIVE
+    try:
+        for label, scenario in (('sine stick', default_scenario), ('held stick', held)):
+            for keepalive in (0, default):
+                RobotController.KEEPALIVE = keepalive
+                backend = scenario()
+                app = run_headless(n, backend)
+                stats = app.robot_controller.tx.stats()
+                robot = backend.robots['/dev/ttyUSB0']
+                print(f'{label}, keepalive={keepalive}: {stats["sent_rate"]:.1f} frames/s '
+                      f'of {stats["offered_rate"]:.1f} offered (changes={stats["changes"]}, '
+                      f'keepalives={stats["keepalives"]}), robot ok={robot.frames_ok} '
+                      f'failsafes={robot.failsafes}')
+    finally:
+        RobotController.KEEPALIVE = default
+
+
+# Flight recorder: cost of recording one frame (n records), then record
+# 300 s of the default scenario and replay it into a fresh simulated robot
+@benchmark('recorder', n=200000)
+def bench_recorder(n: int) -> None:
+    import os
+    import tempfile
+    from crc8 import STOP_FRAME
+    from recorder import TX, FlightRecorder, read_records, replay
+    from sim import SimRobot, SimSerial, default_scenario, run_headless
+    from telemetry import TelemetryParser
+
+    with tempfile.TemporaryDirectory() as tmp:
+        recorder = FlightRecorder(os.path.join(tmp, 'flight.rec'))
+        report('FlightRecorder.record (file)', lambda: recorder.record(TX, STOP_FRAME), n)
+        recorder.close()
+        count = sum(1 for _ in read_records(os.path.join(tmp, 'flight.rec')))
+        print(f'records kept after {n} writes: {count}')
+
+    backend = default_scenario()
+    app = run_headless(300, backend)
+    recorder = app.robot_controller.recorder
+    records = list(read_records(recorder))
+    robot = SimRobot()
+    SimSerial('replay', robot)
+    telemetry = TelemetryParser()
+    start = perf_counter()
+    replay(records, robot, telemetry)
+    elapsed = perf_counter() - start
+    live = backend.robots['/dev/ttyUSB0']
+    print(f'replayed {len(records)} records in {elapsed * 1000:.0f} ms')
+    print(f'robot frames live={live.frames_ok} replayed={robot.frames_ok}, '
+          f'telemetry live={app.robot_controller.telemetry.ok} replayed={telemetry.ok}')
+
+
+# Instrumentation overhead per frame and histogram accuracy
+@benchmark('metrics', n=200000)
+def bench_metrics(n: int) -> None:
+    from metrics import ControlLatency, Histogram, Metrics
+
+    rng = random.Random(1)
+    values = [int(rng.lognormvariate(8, 1.5)) for _ in range(100000)]
+    hist = Histogram()
+    for v in values:
+        hist.record(v)
+    exact = sorted(values)
+    for p in (50, 90, 99, 99.9):
+        want = exact[min(int(len(exact) * p / 100), len(exact) - 1)]
+        got = hist.percentile(p)
+        print(f'p{p}: exact {want} us, histogram {got} us ({(got - want) / want * 100:+.1f}%)')
+
+    it = itertools.cycle(values)
+    report('Histogram.record', lambda: hist.record(next(it)), n)
+    metrics = Metrics()
+    latency = ControlLatency(metrics)
+
+    def frame():
+        latency.sent(0.0, 0.0)
+        latency.ack(True)
+
+    report('ControlLatency sent + ack', frame, n)
+    report('Metrics.render', metrics.render, 1000)
+
+
+# Button press to robot latency over n virtual seconds of the default
+# scenario, with and without out-of-cycle frames on button edges
+@benchmark('buttons', n=300)
+def bench_buttons(n: int) -> None:
+    from sim import default_scenario, run_headless
+
+    for immediate in (False, True):
+        backend = default_scenario()
+        app = run_headless(0, backend)
+        controller = app.robot_controller
+        if not immediate:
+            controller.button_reader.on_change = None
+        presses = []
+        arrivals = []
+
+        def logged(callback):
+            def pressed():
+                presses.append(backend.clock.now)
+                callback()
+            return pressed
+
+        for pin in (24, 27):
+            button = backend.buttons[pin]
+            button.when_pressed = logged(button.when_pressed)
+
+        robot = backend.robots['/dev/ttyUSB0']
+        receive = robot.receive
+
+        def received(data):
+            before = robot.ctrl
+            receive(data)
+            if robot.ctrl & 0x3C and not before & 0x3C:
+                arrivals.append(backend.clock.now)
+
+        robot.receive = received
+        backend.clock.run(until=n)
+
+        latencies = []
+        for at in presses:
+            later = [t for t in arrivals if at <= t < at + 0.2]
+            if later:
+                latencies.append(later[0] - at)
+        print(f'{"immediate" if immediate else "next tick"}: {len(latencies)} presses, '
+              f'press-to-robot latency avg {sum(latencies) / len(latencies) * 1000:.1f} ms, '
+              f'max {max(latencies) * 1000:.1f} ms, '
+              f'out-of-cycle frames {controller.button_frames}')
+
+
+# UI work over n virtual seconds of the default scenario: label changes
+# asked for by the control code vs. widget calls made by the view model
+@benchmark('ui', n=300)
+def bench_ui(n: int) -> None:
+    from sim import default_scenario, run_headless
+
+    backend = default_scenario()
+    view = run_headless(n, backend).view
+    calls = sum(label.configs + label.places for label in backend.labels)
+    print(f'label changes requested: {view.requests / n:.1f}/s, '
+          f'widget calls: {calls / n:.2f}/s, flushes: {view.flushes / n:.2f}/s, '
+          f'unchanged options skipped: {view.skipped}')
+
+
+# Battery display over n virtual seconds of a robot that sags under load,
+# drains while driving and has a noisy ADC: raw samples vs. the estimator
+@benchmark('battery', n=600)
+def bench_battery(n: int) -> None:
+    from battery import BatteryEstimator
+    from sim import SimCard, default_scenario, run_headless
+
+    backend = default_scenario()
+    for at in range(260, n, 130):
+        backend.tap(SimCard(bytes((9, 9, 9, at & 0xFF))), at=at)
+    app = run_headless(0, backend)
+    robot = backend.robots['/dev/ttyUSB0']
+    robot.battery = 815
+    robot.sag = 0.25
+    robot.drain = 0.1
+    robot.noise = 3
+    controller = app.robot_controller
+    raw_low = []
+    est_low = []
+    predictions = []
+
+    def watch():
+        if controller.telemetry.bat is not None:
+            raw_low.append(controller.telemetry.bat < 801)
+            est_low.append(controller.battery.low)
+            if controller.battery.runtime is not None:
+                predictions.append((backend.clock.now, controller.battery.runtime,
+                                    robot.battery))
+        backend.clock.call_later(1.0, watch)
+
+    watch()
+    backend.clock.run(until=n)
+
+    def flips(states):
+        return sum(a != b for a, b in zip(states, states[1:]))
+
+    print(f'low-battery colour changes: raw samples {flips(raw_low)}, '
+          f'estimator {flips(est_low)}')
+    if predictions:
+        t, runtime, level = predictions[-1]
+        print(f'at {t:.0f} s: {controller.battery.percent}% (true '
+              f'{int((level - BatteryEstimator.EMPTY) / BatteryEstimator.COUNTS)}%), '
+              f'predicted runtime {runtime / 60:.0f} min')
+    estimator = BatteryEstimator()
+    it = itertools.cycle(range(780, 820))
+    report('BatteryEstimator.update', lambda: estimator.update(next(it), 60), 200000)
+
+
+# n complete games on a virtual clock, every update up to 20 ms late as
+# under loop load: how long the robot stays armed and how many sessions
+# are simulated per second, against the previous chained 1 s countdown
+@benchmark('game', n=10000)
+def bench_game(n: int) -> None:
+    from game import IDLE, TIMEOUT, GameEngine
+
+    rng = random.Random(1)
+    now = 0.0
+    engine = GameEngine(lambda: now)
+    armed = []
+
+    def on_event(event):
+        if event == TIMEOUT:
+            armed.append(now - engine.started)
+
+    engine.on_event = on_event
+    start = perf_counter()
+    for _ in range(n):
+        engine.card_scanned(None)
+        while engine.state != IDLE:
+            now = engine.next_deadline() + rng.uniform(0, 0.02)
+            engine.update()
+        now += rng.uniform(0, 5)
+    elapsed = perf_counter() - start
+
+    # App.countdown(): after(1000) 121 times, each call late by the load
+    legacy = [sum(1 + rng.uniform(0, 0.02) for _ in range(121))
+              for _ in range(min(n, 1000))]
+    print(f'previous countdown: armed {sum(legacy) / len(legacy):.2f} s mean, '
+          f'{max(legacy):.2f} s max')
+    # Armed past the game time by the lateness of one update, not of all
+    print(f'GameEngine:         armed {sum(armed) / n:.2f} s mean, '
+          f'{max(armed):.2f} s max, overrun '
+          f'{max(armed) - engine.game_time:.3f} s max')
+    print(f'{n} sessions in {elapsed:.2f} s ({n / elapsed:.0f} sessions/s, '
+          f'{engine.games} games)')
+
+
+# Fleet mode: n virtual seconds of N robots in a game at 20 Hz on one
+# selector loop. Host time per frame includes the simulated robots and
+# serial ports, so robots per core is a lower bound for the control side.
+@benchmark('fleet', n=10)
+def bench_fleet(n: int) -> None:
+    from fleet import BUTTON_BITS, Fleet
+    from sim import SimBackend, sine_trace
+
+    for robots in (1, 4, 16, 64):
+        backend = SimBackend()
+        # One simulated ADC per robot (SPI port i), pins from 100 up
+        joysticks = [((i, 0), (0, 1)) for i in range(robots)]
+        buttons = [tuple(zip(BUTTON_BITS, range(100 + 5 * i, 105 + 5 * i)))
+                   for i in range(robots)]
+        for i in range(robots):
+            for axis in (0, 1):
+                key = axis if i == 0 else (i, 0, axis)
+                backend.joystick(key, sine_trace(2.0 + (2 * i + axis) * 0.1))
+        fleet = Fleet([f'/dev/ttyUSB{i}' for i in range(robots)], backend,
+                      joysticks=joysticks, buttons=buttons)
+        for i in range(robots):
+            fleet.start(i)
+        start = perf_counter()
+        fleet.run(until=backend.clock.now + n)
+        elapsed = perf_counter() - start
+        sent = sum(robot.tx.sent for robot in fleet.robots)
+        ok = sum(backend.robots[robot.port].frames_ok for robot in fleet.robots)
+        per_frame = elapsed / fleet.ticks
+        print(f'{robots:3d} robots: {fleet.ticks / n / robots:.1f} ticks/s per robot, '
+              f'{sent / n / robots:.1f} frames/s sent, robot ok {ok}/{sent}, '
+              f'late {fleet.late}, {per_frame * 1e6:.0f} us per tick, '
+              f'~{1 / (per_frame * Fleet.RATE):.0f} robots per core at 20 Hz')
+        fleet.close()
+
+
+# Rough device open times on the Pi, assumed for the startup benchmark:
+# first gpiozero use (import and pin factory), SPI open plus MFRC522 reset,
+# serial port open
+GPIOZERO_IMPORT = 0.6
+SPI_OPEN = 0.05
+SERIAL_OPEN = 0.02
+
+
+# Cold start: import time of rpi_cu in n fresh processes, with and without
+# the modules it used to import eagerly, then the controller on simulated
+# devices that take the assumed open times above, all one after another
+# vs. the ID serial port and the database opened in parallel with the GPIO
+# devices (the only devices that can open off the main thread)
+@benchmark('startup', n=5)
+def bench_startup(n: int) -> None:
+    import os
+    import subprocess
+    import sys
+    import threading
+    import time
+    from statistics import median
+
+    from rpi_cu import RobotController
+    from sim import SimBackend
+
+    here = os.path.dirname(os.path.abspath(__file__))
+    timing = 'import time; t = time.perf_counter(); import {}; ' \
+        'print(time.perf_counter() - t)'
+
+    def imports(modules):
+        return median(float(subprocess.run(
+            [sys.executable, '-c', timing.format(modules)], cwd=here,
+            capture_output=True, text=True, check=True).stdout)
+            for _ in range(n))
+
+    eager = imports('argparse, asyncio, tkinter, rpi_cu')
+    lazy = imports('rpi_cu')
+    print(f'import rpi_cu: {eager * 1e3:.1f} ms with asyncio/tkinter/argparse, '
+          f'{lazy * 1e3:.1f} ms now')
+
+    class SlowBackend(SimBackend):
+        def __init__(self) -> None:
+            super().__init__()
+            self.gpiozero = threading.Lock()
+            self.imported = False
+
+        def load_gpiozero(self):
+            # The import lock: one thread imports, the others wait
+            with self.gpiozero:
+                if not self.imported:
+                    time.sleep(GPIOZERO_IMPORT)
+                    self.imported = True
+
+        def pin_factory(self):
+            self.load_gpiozero()
+
+        def button(self, pin, bounce_time=None):
+            self.load_gpiozero()
+            return super().button(pin, bounce_time)
+
+        def adc(self, channel, port=0, device=0):
+            self.load_gpiozero()
+            return super().adc(channel, port, device)
+
+        def serial(self, port, baudrate, timeout):
+            time.sleep(SERIAL_OPEN)
+            return super().serial(port, baudrate, timeout)
+
+        def spi(self):
+            time.sleep(SPI_OPEN)
+            return super().spi()
+
+    ready = {}
+    for workers, label in ((0, 'one after another'), (None, 'in parallel')):
+        RobotController.INIT_WORKERS = workers
+        start = time.perf_counter()
+        controller = RobotController(SlowBackend())
+        ready[label] = time.perf_counter() - start
+        startup = controller.startup
+        stop = startup.at('stop_frame') - startup.marks[0][1]
+        print(f'devices {label:<17}: stop frame after {stop * 1e3:5.1f} ms, '
+              f'controller ready after {ready[label] * 1e3:6.1f} ms')
+    RobotController.INIT_WORKERS = None
+    gain = ready['one after another'] - ready['in parallel']
+    print(f'parallel id_serial/used_ids open saves {gain * 1e3:.1f} ms')
+
+
+# n: virtual seconds of the default headless scenario
+@benchmark('app', n=300)
+def bench_app(n: int) -> None:
+    from sim import default_scenario, run_headless
+
+    backend = default_scenario()
+    start = perf_counter()
+    run_headless(n, backend)
+    elapsed = perf_counter() - start
+    robot = backend.robots['/dev/ttyUSB0']
+    print(f'{n} s simulated in {elapsed:.2f} s ({n / elapsed:.0f}x real time)')
+    print(f'robot frames ok={robot.frames_ok} err={robot.frames_err}')
+    print(f'SPI transfers: {sum(spi.transfers for spi in backend.spis)}')
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='MoodBot benchmarks')
+    parser.add_argument('name', choices=sorted(BENCHMARKS))
+    parser.add_argument('-n', type=int, help='iterations (benchmark specific)')
+    args = parser.parse_args()
+    func, n = BENCHMARKS[args.name]
+    func(args.n or n)
@@ -0,0 +1,85 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from typing import Iterable, Optional, Sequence, Tuple
+
+CRC8_POLY = 0x8C    # Dallas/Maxim polynomial (reflected), same as the robot
+
+FRAME_START = 0xFF
+FRAME_LEN = 5       # [START][SPD_L][SPD_R][CTRL][CRC]
+
+# Stop frame: both wheels stopped, all actuators off
+STOP_FRAME = bytes((FRAME_START, 0x00, 0x00, 0x01, 94))
+
+_tables = {}
+
+
+# Build (once per polynomial) the 256-entry lookup table
+def crc8_table(poly: int = CRC8_POLY) -> bytes:
+    table = _tables.get(poly)
+    if table is None:
+        entries = bytearray(256)
+        for i in range(256):
+            crc = i
+            for _ in range(8):
+                if crc & 1:
+                    crc = (crc >> 1) ^ poly
+                else:
+                    crc >>= 1
+            entries[i] = crc
+        table = _tables[poly] = bytes(entries)
+    return table
+
+
+# Table-driven CRC-8, one lookup per byte
+def crc8(data: Iterable[int], poly: int = CRC8_POLY, crc: int = 0) -> int:
+    table = crc8_table(poly)
+    for b in data:
+        crc = table[crc ^ b]
+    return crc
+
+
+_CRC_TABLE = crc8_table(CRC8_POLY)
+
+
+# Build a ready to send frame from the wheel speeds and control bits
+def build_frame(spd_l: int, spd_r: int, ctrl: int) -> bytes:
+    t = _CRC_TABLE
+    return bytes((FRAME_START, spd_l, spd_r, ctrl, t[t[t[spd_l] ^ spd_r] ^ ctrl]))
+
+
+# Encode a batch of (spd_l, spd_r, ctrl) tuples into one buffer.
+# If `out` is given, it is filled in place and must be large enough.
+def encode_frames(frames: Sequence[Tuple[int, int, int]],
+                  out: Optional[bytearray] = None) -> bytearray:
+    size = len(frames) * FRAME_LEN
+    if out is None:
+        out = bytearray(size)
+    elif len(out) < size:
+        raise ValueError(f'buffer too small: {len(out)} < {size}')
+
+    t = _CRC_TABLE
+    pos = 0
+    for spd_l, spd_r, ctrl in frames:
+        out[pos] = FRAME_START
+        out[pos + 1] = spd_l
+        out[pos + 2] = spd_r
+        out[pos + 3] = ctrl
+        out[pos + 4] = t[t[t[spd_l] ^ spd_r] ^ ctrl]
+        pos += FRAME_LEN
+    return out
+
+
+# Check a received or stored frame
+def check_frame(frame: bytes) -> bool:
+    return (len(frame) == FRAME_LEN and frame[0] == FRAME_START
+            and crc8(frame[1:4]) == frame[4])
+
+
+# The stop frame is hardcoded, make sure it is still a valid frame
+if not check_frame(STOP_FRAME):
+    raise RuntimeError(f'STOP_FRAME has an invalid CRC: {STOP_FRAME.hex()}')
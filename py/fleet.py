@@ -0,0 +1,275 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Fleet mode: one control unit process drives several robots, one
+# RobotController per RF port. All ports are served by one selector loop:
+# every robot has its own TX deadline (spread evenly over the frame period)
+# and its own game engine, telemetry is read when a port has data.
+# A scanned card starts a game on the first idle robot.
+#
+# Every robot has its own joystick ADC channels and button pins, the
+# defaults (JOYSTICKS, BUTTONS) cover two robots wired like the single
+# robot unit plus a second set on the free pins:
+#
+#   python3 py/fleet.py /dev/ttyUSB0 /dev/ttyUSB1 --window
+#   python3 py/fleet.py /dev/ttyUSB0 /dev/ttyUSB1 /dev/ttyUSB2 \
+#       --joystick 0.0:0,1 --joystick 0.0:2,3 --joystick 1.0:0,1 \
+#       --buttons 25,24,23,27,22 --buttons 5,6,12,13,26 --buttons ''
+
+import argparse
+import heapq
+import selectors
+from math import ceil
+
+from game import GameEngine
+from hal import get_backend
+from mixer import BTN_DIG_CCW, BTN_DIG_CW, BTN_DIG_DOWN, BTN_DIG_UP, BTN_LED
+from rpi_cu import ButtonReader, MCP3004Reader, RobotController
+from view import ViewModel
+
+# Mask bits of the pins given per robot, in this order
+BUTTON_BITS = (BTN_LED, BTN_DIG_UP, BTN_DIG_DOWN, BTN_DIG_CW, BTN_DIG_CCW)
+
+
+class Fleet:
+    RATE = 20               # Frames per second and robot
+    GAME_TIMEOUT = GameEngine.GAME_TIME     # Seconds per game
+    ID_TIMEOUT = 28800      # Seconds until a card can be used again
+    # ((SPI port, device), (X, Y channel)) of each robot's MCP3004 joystick,
+    # SPI0 CE1 is the RFID reader
+    JOYSTICKS = (((0, 0), (0, 1)), ((0, 0), (2, 3)))
+    # (mask bit, BCM pin) of each robot's buttons
+    BUTTONS = (ButtonReader.PINS,
+               tuple(zip(BUTTON_BITS, (5, 6, 12, 13, 26))))
+
+    def __init__(self, ports, backend=None, rate=RATE,
+                 game_time=GAME_TIMEOUT, id_timeout=ID_TIMEOUT,
+                 joysticks=JOYSTICKS, buttons=BUTTONS, window=None) -> None:
+        check_wiring(len(ports), joysticks, buttons)
+        self.backend = backend or get_backend()
+        self.clock = self.backend.monotonic
+        self.robots = []
+        lead = None
+        for port, (spi, channels), pins in zip(ports, joysticks, buttons):
+            robot = RobotController(self.backend, id_timeout, port=port,
+                                    joystick=channels, buttons=pins,
+                                    shared=lead, spi=spi)
+            lead = lead or robot
+            self.robots.append(robot)
+        self.games = [GameEngine(self.clock, game_time) for _ in self.robots]
+        self.view = None if window is None else \
+            FleetView(window, self.backend.label, self)
+
+        self.selector = self.backend.selector()
+        for i, robot in enumerate(self.robots):
+            self.selector.register(robot.rf_serial, selectors.EVENT_READ, i)
+
+        # (deadline, robot) heap, robots are offset by period / N
+        self.period = 1 / rate
+        now = self.clock()
+        step = self.period / len(self.robots)
+        self.schedule = [(now + i * step, i) for i in range(len(self.robots))]
+        self.ticks = 0          # Frames due (sent or skipped by the policy)
+        self.late = 0           # Deadlines missed by more than a period
+
+    # Start a game on robot `i`
+    def start(self, i: int, card=None) -> None:
+        self.games[i].card_scanned(card)
+        self.robots[i].armed = True
+
+    # Give a newly scanned, unused card the first idle robot
+    def check_card(self) -> None:
+        lead = self.robots[0]
+        if lead.rfid_reader.id is None:
+            return
+        for i, game in enumerate(self.games):
+            if not game.running:
+                break
+        else:
+            # All robots busy, the card waits on the reader
+            return
+        card = lead.rfid_reader.id
+        used = lead.check_rfid()
+        lead.rfid_reader.id = None
+        if not used:
+            self.start(i, card)
+
+    # TX deadline of robot `i`
+    def tx(self, i: int) -> None:
+        robot = self.robots[i]
+        game = self.games[i]
+        game.update()
+        if game.running:
+            robot.send_data()
+        else:
+            robot.armed = False
+            robot.send_stop()
+        self.ticks += 1
+
+    # Wait for telemetry until the next TX deadline, then send what is due
+    def run_once(self) -> None:
+        schedule = self.schedule
+        timeout = max(schedule[0][0] - self.clock(), 0)
+        for key, _ in self.selector.select(timeout):
+            self.robots[key.data].get_bat_lvl()
+        self.check_card()
+
+        now = self.clock()
+        while schedule[0][0] <= now:
+            due, i = schedule[0]
+            self.tx(i)
+            if i == 0:
+                self.robots[0].sync_ids()
+            due += self.period
+            if due <= now:
+                # Fell a whole period behind, do not send a burst to catch up
+                self.late += 1
+                due = now + self.period
+            heapq.heapreplace(schedule, (due, i))
+        if self.view is not None:
+            self.view.update(now)
+
+    # Run until `until` (monotonic time), forever if None
+    def run(self, until=None) -> None:
+        while until is None or self.clock() < until:
+            self.run_once()
+
+    # One status line per robot
+    def status(self):
+        now = self.clock()
+        for robot, game in zip(self.robots, self.games):
+            battery = robot.battery.percent
+            yield (f'{robot.port}: {"game" if game.running else "idle"} '
+                   f'{game.remaining(now):3.0f} s, '
+                   f'battery {"?" if battery is None else battery}%, '
+                   f'games {game.games}, frames {robot.tx.sent}')
+
+    def close(self) -> None:
+        self.selector.close()
+        for robot in self.robots:
+            robot.send_stop()
+            robot.joystick_reader.close()
+            robot.button_reader.close()
+            robot.rf_serial.close()
+            if robot.recorder is not None:
+                robot.recorder.close()
+        self.robots[0].used_ids.close()
+
+
+
+# Check the joystick and button wiring of `count` robots: one entry per
+# robot, channels the ADC has, no channel or pin used twice
+def check_wiring(count: int, joysticks, buttons) -> None:
+    if count > len(joysticks):
+        raise ValueError(f'no joystick for robot {len(joysticks) + 1}')
+    if count > len(buttons):
+        raise ValueError(f'no buttons for robot {len(buttons) + 1}')
+    channels = set()
+    for spi, axes in joysticks[:count]:
+        for channel in axes:
+            if not 0 <= channel < MCP3004Reader.CHANNELS:
+                raise ValueError(f'MCP3004 has no channel {channel}')
+            if (spi, channel) in channels:
+                raise ValueError(f'ADC channel {channel} on SPI '
+                                 f'{spi[0]}.{spi[1]} used twice')
+            channels.add((spi, channel))
+    used = set()
+    for pins in buttons[:count]:
+        for _, pin in pins:
+            if pin in used:
+                raise ValueError(f'button pin {pin} used twice')
+            used.add(pin)
+
+
+# One row per robot: number, time left and battery, red when low
+class FleetView:
+    REFRESH = 0.2       # Seconds between updates
+    ROW = 56            # Row height in pixels
+
+    def __init__(self, window, make_label, fleet) -> None:
+        self.window = window
+        self.fleet = fleet
+        self.view = ViewModel(window, make_label)
+        for i in range(len(fleet.robots)):
+            self.view.label(f'robot{i}', text=f'{i + 1}  --:--  -%',
+                            font=("Arial", 36), foreground="white",
+                            background="black")
+            self.view.place(f'robot{i}', x=10, y=i * self.ROW)
+        self.due = 0.0
+
+    # Refresh the rows and let Tk draw, at most every REFRESH seconds
+    def update(self, now: float) -> None:
+        if now < self.due:
+            return
+        self.due = now + self.REFRESH
+        for i, (robot, game) in enumerate(zip(self.fleet.robots,
+                                              self.fleet.games)):
+            left = ceil(game.remaining(now))
+            battery = robot.battery
+            percent = '-' if battery.percent is None else battery.percent
+            self.view.set(f'robot{i}',
+                          text=f'{i + 1}  {left // 60:02d}:{left % 60:02d}  '
+                               f'{percent}%',
+                          foreground="red" if battery.low else "white")
+        self.window.update()
+
+
+# "<SPI port>.<device>:<X channel>,<Y channel>" for --joystick
+def parse_joystick(text: str):
+    spi, _, channels = text.partition(':')
+    port, device = spi.split('.')
+    x, y = channels.split(',')
+    return (int(port), int(device)), (int(x), int(y))
+
+
+# BCM pins in BUTTON_BITS order for --buttons, empty for none
+def parse_buttons(text: str):
+    pins = [int(pin) for pin in text.split(',')] if text else []
+    if len(pins) not in (0, len(BUTTON_BITS)):
+        raise ValueError(text)
+    return tuple(zip(BUTTON_BITS, pins))
+
+
+if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='MoodBot fleet mode')
+    parser.add_argument('ports', nargs='+', help='RF serial ports')
+    parser.add_argument('--rate', type=float, default=Fleet.RATE,
+                        help='frames per second and robot')
+    parser.add_argument('--status', type=float, default=10,
+                        help='seconds between status lines')
+    parser.add_argument('--joystick', type=parse_joystick, action='append',
+                        metavar='PORT.DEVICE:X,Y',
+                        help='joystick ADC of the next robot (repeat per robot)')
+    parser.add_argument('--buttons', type=parse_buttons, action='append',
+                        metavar='LED,UP,DOWN,CW,CCW',
+                        help="button BCM pins of the next robot, '' for none "
+                             '(repeat per robot)')
+    parser.add_argument('--window', action='store_true',
+                        help='show time left and battery of every robot')
+    args = parser.parse_args()
+
+    window = None
+    if args.window:
+        import tkinter as tk
+
+        window = tk.Tk()
+        window.title("Moodbot fleet")
+        window.configure(bg='black')
+    fleet = Fleet(args.ports, rate=args.rate,
+                  joysticks=args.joystick or Fleet.JOYSTICKS,
+                  buttons=args.buttons or Fleet.BUTTONS, window=window)
+    try:
+        while True:
+            fleet.run(fleet.clock() + args.status)
+            print('\n'.join(fleet.status()))
+    except KeyboardInterrupt:
+        pass
+    finally:
+        fleet.close()
+        if window is not None:
+            window.destroy()
+        get_backend().gpio().cleanup()
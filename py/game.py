@@ -0,0 +1,116 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from math import ceil
+from time import monotonic
+from typing import Callable, Optional
+
+# States
+IDLE = 'idle'                   # Waiting for a card
+RUNNING = 'running'             # Game on, the robot is armed
+COMPLETE = 'complete'           # "Mission complete" shown, then IDLE
+
+# Events passed to on_event
+CARD_ACCEPTED = 'card_accepted'     # Game started
+CARD_REJECTED = 'card_rejected'     # Card was already used
+TICK = 'tick'                       # Seconds left (`shown`) changed
+TIMEOUT = 'timeout'                 # Game time is over
+MISSION_COMPLETE = 'mission_complete'   # Show the end message
+READY = 'ready'                     # End message is over, ask for a card
+
+
+# Game session of one robot. Pure state: no Tk and no I/O, time only comes
+# from `clock`. The game ends a fixed time after the card was accepted, so
+# a late update() delays the events but never changes the game duration.
+# Events go to `on_event(event)`, the UI renders them.
+class GameEngine:
+    GAME_TIME = 120     # Seconds per game
+    MESSAGE_TIME = 3    # Seconds the end message is shown
+
+    def __init__(self, clock: Callable[[], float] = monotonic,
+                 game_time: float = GAME_TIME,
+                 message_time: float = MESSAGE_TIME) -> None:
+        self.clock = clock
+        self.game_time = game_time
+        self.message_time = message_time
+        self.on_event: Optional[Callable[[str], None]] = None
+        self.state = IDLE
+        self.card = None
+        self.started = None     # Clock time the game started
+        self.ends = None        # ... and ends
+        self.message_ends = None
+        self.shown = 0          # Whole seconds left, rounded up
+        self.games = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return self.state == RUNNING
+
+    # Seconds left, 0 when not running
+    def remaining(self, now: Optional[float] = None) -> float:
+        if self.state != RUNNING:
+            return 0
+        return max(self.ends - (self.clock() if now is None else now), 0)
+
+    # A card was scanned, `used` if its ID was already used. Ignored while
+    # a game runs.
+    def card_scanned(self, card, used: bool = False) -> bool:
+        if self.state == RUNNING:
+            return False
+        now = self.clock()
+        if used:
+            self.rejected += 1
+            self.emit(CARD_REJECTED)
+            self.show_message(now)
+            return False
+        self.state = RUNNING
+        self.card = card
+        self.started = now
+        self.ends = now + self.game_time
+        self.message_ends = None
+        self.games += 1
+        self.emit(CARD_ACCEPTED)
+        self.shown = ceil(self.game_time)
+        self.emit(TICK)
+        return True
+
+    # Advance to the current clock time
+    def update(self) -> None:
+        now = self.clock()
+        if self.state == RUNNING:
+            if now >= self.ends:
+                self.state = IDLE
+                self.shown = 0
+                self.emit(TIMEOUT)
+                self.show_message(now)
+                return
+            shown = ceil(self.ends - now)
+            if shown != self.shown:
+                self.shown = shown
+                self.emit(TICK)
+        elif self.state == COMPLETE and now >= self.message_ends:
+            self.state = IDLE
+            self.message_ends = None
+            self.emit(READY)
+
+    # Clock time of the next event, None when idle
+    def next_deadline(self) -> Optional[float]:
+        if self.state == RUNNING:
+            return self.ends - (self.shown - 1) if self.shown > 1 else self.ends
+        if self.state == COMPLETE:
+            return self.message_ends
+        return None
+
+    def show_message(self, now: float) -> None:
+        self.state = COMPLETE
+        self.message_ends = now + self.message_time
+        self.emit(MISSION_COMPLETE)
+
+    def emit(self, event: str) -> None:
+        if self.on_event is not None:
+            self.on_event(event)
@@ -0,0 +1,105 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Device backends. The control unit never constructs hardware devices
+# directly, it asks the current backend for them. HardwareBackend talks to
+# the Raspberry Pi, sim.SimBackend runs everything in-process.
+
+import os
+import selectors
+import threading
+import time
+from typing import Optional
+
+
+# Real devices on the Raspberry Pi, driver modules are imported on first use
+class HardwareBackend:
+
+    # Push button on a BCM pin (gpiozero.Button), edges within
+    # `bounce_time` seconds of the last one are ignored
+    def button(self, pin: int, bounce_time: Optional[float] = None):
+        from gpiozero import Button
+        return Button(pin, bounce_time=bounce_time)
+
+    # Create gpiozero's pin factory now, it is otherwise created lazily by
+    # the first device, from whichever thread opens it
+    def pin_factory(self):
+        from gpiozero import Device
+        return Device.ensure_pin_factory()
+
+    # Joystick ADC channel (gpiozero.MCP3004) of the ADC on SPI `port`
+    # and chip select `device`
+    def adc(self, channel: int, port: int = 0, device: int = 0):
+        from gpiozero import MCP3004
+        return MCP3004(channel=channel, port=port, device=device)
+
+    # Serial port (pyserial)
+    def serial(self, port: str, baudrate: int, timeout: float):
+        import serial
+        return serial.Serial(port=port, baudrate=baudrate, timeout=timeout)
+
+    # Unopened SPI device for the MFRC522 driver
+    def spi(self):
+        import spidev
+        return spidev.SpiDev()
+
+    # RPi.GPIO module
+    def gpio(self):
+        import RPi.GPIO as GPIO
+        return GPIO
+
+    # Tk label widget
+    def label(self, window, **kwargs):
+        from tkinter.ttk import Label
+        return Label(window, **kwargs)
+
+    # Location of a persistent data file
+    def data_path(self, name: str) -> str:
+        path = os.path.join(os.path.expanduser('~'), '.moodbot')
+        os.makedirs(path, exist_ok=True)
+        return os.path.join(path, name)
+
+    # Wall clock used by the application
+    def time(self) -> float:
+        return time.time()
+
+    # Selector to wait on serial ports (fleet mode)
+    def selector(self) -> selectors.BaseSelector:
+        return selectors.DefaultSelector()
+
+    # Monotonic clock for intervals and deadlines
+    def monotonic(self) -> float:
+        return time.monotonic()
+
+    # Call `step` forever in a daemon thread, `step` returns the delay in
+    # seconds until its next call
+    def start_poller(self, step) -> threading.Thread:
+        def loop():
+            while True:
+                time.sleep(step())
+
+        t = threading.Thread(target=loop)
+        t.daemon = True
+        t.start()
+        return t
+
+
+_backend = None
+
+
+# Backend used by devices that are not given one explicitly
+def get_backend():
+    global _backend
+    if _backend is None:
+        _backend = HardwareBackend()
+    return _backend
+
+
+# Replace the default backend, e.g. with sim.SimBackend()
+def set_backend(backend) -> None:
+    global _backend
+    _backend = backend
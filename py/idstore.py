@@ -0,0 +1,100 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import sqlite3
+import time
+from itertools import islice
+from typing import Callable, Iterator, Optional
+
+
+# Used card IDs with per-card expiry, persisted in sqlite.
+# Lookups only touch the in-memory dict (O(1)), the database is written
+# once per new card and read once at startup. The dict is kept in order
+# of first use, so expired cards are always at its front; merged cards
+# can be older than the newest one, the dict is then sorted once on the
+# next purge().
+class UsedIdStore:
+    def __init__(self, path: str = ':memory:', ttl: float = 28800,
+                 clock: Callable[[], float] = time.time) -> None:
+        self.ttl = ttl
+        self.clock = clock
+        self.db = sqlite3.connect(path, isolation_level=None,
+                                  check_same_thread=False)
+        self.db.execute('PRAGMA journal_mode=WAL')
+        self.db.execute('PRAGMA synchronous=NORMAL')
+        self.db.execute('CREATE TABLE IF NOT EXISTS used_ids ('
+                        'id INTEGER PRIMARY KEY, first_used REAL NOT NULL)')
+        self.ids = dict(self.db.execute(
+            'SELECT id, first_used FROM used_ids ORDER BY first_used'))
+        self.ordered = True     # self.ids is in order of first use
+        self.purge()
+
+    # Card was used within the last `ttl` seconds
+    def __contains__(self, card_id) -> bool:
+        first_used = self.ids.get(card_id)
+        return first_used is not None and self.clock() - first_used < self.ttl
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __iter__(self) -> Iterator[int]:
+        return iter(self.ids)
+
+    # Mark a card as used, returns False if it already was
+    def add(self, card_id: int) -> bool:
+        if card_id in self:
+            return False
+        now = self.clock()
+        # Re-insert so the dict stays ordered by first use
+        self.ids.pop(card_id, None)
+        self.ids[card_id] = now
+        self.db.execute('INSERT OR REPLACE INTO used_ids VALUES (?, ?)',
+                        (card_id, now))
+        return True
+
+    # Mark a card as used since `first_used` (another unit's record of it),
+    # keeps the older time if it is known already. Returns True if changed.
+    def merge(self, card_id: int, first_used: float) -> bool:
+        known = self.ids.get(card_id)
+        if known is not None and known <= first_used:
+            return False
+        if self.clock() - first_used >= self.ttl:
+            return False
+        ids = self.ids
+        if ids and first_used < ids[next(reversed(ids))]:
+            self.ordered = False
+        ids.pop(card_id, None)
+        ids[card_id] = first_used
+        self.db.execute('INSERT OR REPLACE INTO used_ids VALUES (?, ?)',
+                        (card_id, first_used))
+        return True
+
+    # Seconds since the card was first used, None if it is not known
+    def age(self, card_id: int) -> Optional[float]:
+        first_used = self.ids.get(card_id)
+        return None if first_used is None else self.clock() - first_used
+
+    # Drop expired cards, returns how many were dropped
+    def purge(self) -> int:
+        if not self.ordered:
+            self.ids = dict(sorted(self.ids.items(), key=lambda item: item[1]))
+            self.ordered = True
+        cutoff = self.clock() - self.ttl
+        expired = 0
+        for card_id, first_used in self.ids.items():
+            if first_used > cutoff:
+                break
+            expired += 1
+        if expired:
+            for card_id in list(islice(self.ids, expired)):
+                del self.ids[card_id]
+            self.db.execute('DELETE FROM used_ids WHERE first_used <= ?',
+                            (cutoff,))
+        return expired
+
+    def close(self) -> None:
+        self.db.close()
@@ -0,0 +1,168 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Used-ID replication between paired control units over /dev/serial0.
+#
+# One frame per line, "<TYPE> <FIELDS>*<CRC8 hex>\n":
+#   Q <rid> <id>        query: was <id> used? (the peer marks it used)
+#   A <rid> <0|1>       answer to query <rid>
+#   G <id>:<age>,...    gossip: these IDs were used <age> seconds ago
+#   S                   send me every ID you know (after a restart)
+#
+# Scans are answered from the local UsedIdStore, which both units keep
+# in sync by gossiping every newly used ID, so no scan waits for the link.
+# Gossip carries the age of each ID, not a timestamp, so a synced ID
+# expires on its original schedule even if the clocks of the units differ.
+# A gossiped ID without an age (older peers) counts as used just now.
+
+from collections import deque
+from time import monotonic
+from typing import Callable, Dict, Optional, Tuple
+
+from crc8 import crc8
+
+
+class IdSyncLink:
+    MAX_BATCH = 16      # IDs per gossip frame
+    MAX_FRAMES = 2      # Gossip frames written per poll()
+    MAX_QUEUED = 1024   # ... and only while fewer bytes wait in the port
+    MAX_LINE = 512      # Longest frame we accept before dropping the buffer
+    TIMEOUT = 0.5       # Seconds until an unanswered query is given up
+
+    def __init__(self, port, store, clock: Callable[[], float] = monotonic) -> None:
+        self.port = port
+        self.store = store
+        self.clock = clock
+        self.buf = bytearray()
+        self.next_rid = 0
+        self.pending: Dict[int, Tuple[float, Optional[Callable]]] = {}
+        self.outbox = deque()
+        self.sent = 0
+        self.received = 0
+        self.bad = 0
+        self.timeouts = 0
+
+    # Write one frame
+    def send(self, *fields) -> None:
+        body = ' '.join(str(f) for f in fields).encode()
+        self.port.write(b'%s*%02X\n' % (body, crc8(body)))
+        self.sent += 1
+
+    # Queue a newly used ID for the next gossip frame, ahead of a resync
+    def announce(self, card_id: int) -> None:
+        self.outbox.appendleft(card_id)
+
+    # Ask the peer about an ID without waiting. `callback(used)` is called
+    # from poll() with True/False, or None if the peer did not answer.
+    def query(self, card_id: int, callback: Optional[Callable] = None) -> int:
+        rid = self.next_rid
+        self.next_rid = (rid + 1) & 0xFFFF
+        self.pending[rid] = (self.clock(), callback)
+        self.send('Q', rid, card_id)
+        return rid
+
+    # Ask the peer for all IDs it knows
+    def request_sync(self) -> None:
+        self.send('S')
+
+    # Queue every known ID for gossip
+    def send_all(self) -> None:
+        self.outbox.extend(self.store)
+
+    # Send queued gossip, at most MAX_FRAMES frames and only while the port
+    # has room: the port has no write timeout, a resync of thousands of IDs
+    # takes seconds to go out and must not block the control loop
+    def flush(self) -> None:
+        outbox = self.outbox
+        store = self.store
+        frames = 0
+        while (outbox and frames < self.MAX_FRAMES
+               and self.port.out_waiting < self.MAX_QUEUED):
+            entries = []
+            while outbox and len(entries) < self.MAX_BATCH:
+                card_id = outbox.popleft()
+                age = store.age(card_id)
+                # Purged while it was queued
+                if age is not None:
+                    entries.append(f'{card_id}:{max(int(age), 0)}')
+            if entries:
+                self.send('G', ','.join(entries))
+                frames += 1
+
+    # Handle everything the peer sent, flush gossip and expire queries.
+    # Never blocks.
+    def poll(self) -> None:
+        waiting = self.port.in_waiting
+        if waiting:
+            self.feed(self.port.read(waiting))
+        if self.outbox:
+            self.flush()
+        if self.pending:
+            self.expire()
+
+    # Feed raw bytes from the peer
+    def feed(self, data: bytes) -> None:
+        buf = self.buf
+        buf += data
+        start = 0
+        while True:
+            end = buf.find(b'\n', start)
+            if end < 0:
+                break
+            self.handle(bytes(buf[start:end]))
+            start = end + 1
+
+        if start:
+            del buf[:start]
+        if len(buf) > self.MAX_LINE:
+            buf.clear()
+            self.bad += 1
+
+    # Check and dispatch one frame without its line end
+    def handle(self, line: bytes) -> None:
+        body, _, crc = line.strip().rpartition(b'*')
+        try:
+            valid = int(crc, 16) == crc8(body)
+        except ValueError:
+            valid = False
+        if not valid:
+            self.bad += 1
+            return
+
+        self.received += 1
+        try:
+            kind, *fields = body.decode().split(' ')
+            if kind == 'Q':
+                card_id = int(fields[1])
+                used = card_id in self.store
+                self.store.add(card_id)
+                self.send('A', fields[0], int(used))
+            elif kind == 'A':
+                entry = self.pending.pop(int(fields[0]), None)
+                if entry is not None and entry[1] is not None:
+                    entry[1](fields[1] == '1')
+            elif kind == 'G':
+                now = self.store.clock()
+                for entry in fields[0].split(','):
+                    card_id, _, age = entry.partition(':')
+                    self.store.merge(int(card_id), now - int(age or 0))
+            elif kind == 'S':
+                self.send_all()
+            else:
+                self.bad += 1
+        except (IndexError, ValueError):
+            self.bad += 1
+
+    # Give up on queries the peer did not answer in time
+    def expire(self) -> None:
+        cutoff = self.clock() - self.TIMEOUT
+        for rid, (sent, callback) in list(self.pending.items()):
+            if sent < cutoff:
+                del self.pending[rid]
+                self.timeouts += 1
+                if callback is not None:
+                    callback(None)
@@ -0,0 +1,264 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Control loop instrumentation: log-linear latency histograms, counters and
+# export in the Prometheus text format, either as a file for the
+# node_exporter textfile collector or on a unix socket
+# (`socat - UNIX-CONNECT:~/.moodbot/metrics.sock`).
+
+import os
+import socket
+from array import array
+from collections import deque
+from time import monotonic
+from typing import Callable, Dict, Optional
+
+SUB_BITS = 4                    # 16 buckets per power of two, <= 6.25% error
+SUB_COUNT = 1 << SUB_BITS
+MAX_BITS = 36                   # Largest value ~19 hours in us
+
+
+# HDR-style histogram of integer values (microseconds). Values below
+# 2 * SUB_COUNT get a bucket each, above that every power of two is split
+# into SUB_COUNT buckets, so record() is a bit_length and a shift.
+class Histogram:
+    def __init__(self) -> None:
+        self.counts = array('Q', bytes(8 * bucket_index((1 << MAX_BITS) - 1) + 8))
+        self.count = 0
+        self.total = 0
+        self.min = None
+        self.max = 0
+
+    def record(self, value: int) -> None:
+        if value < 0:
+            value = 0
+        elif value >> MAX_BITS:
+            value = (1 << MAX_BITS) - 1
+        self.counts[bucket_index(value)] += 1
+        self.count += 1
+        self.total += value
+        if value > self.max:
+            self.max = value
+        if self.min is None or value < self.min:
+            self.min = value
+
+    # Value at percentile `p` (0-100), the upper edge of its bucket
+    def percentile(self, p: float) -> int:
+        if not self.count:
+            return 0
+        rank = max(1, int(self.count * p / 100 + 0.5))
+        seen = 0
+        for i, n in enumerate(self.counts):
+            seen += n
+            if seen >= rank:
+                return min(bucket_high(i), self.max)
+        return self.max
+
+    def reset(self) -> None:
+        self.counts = array('Q', bytes(len(self.counts) * 8))
+        self.count = self.total = self.max = 0
+        self.min = None
+
+
+def bucket_index(value: int) -> int:
+    bits = value.bit_length()
+    if bits <= SUB_BITS + 1:
+        return value
+    shift = bits - SUB_BITS - 1
+    return (shift << SUB_BITS) + (value >> shift)
+
+
+# Largest value that falls into bucket `i`
+def bucket_high(i: int) -> int:
+    if i < 2 * SUB_COUNT:
+        return i
+    shift = (i >> SUB_BITS) - 1
+    return ((i - (shift << SUB_BITS) + 1) << shift) - 1
+
+
+# Named counters and histograms. Counters can also be read from a function
+# at export time, so state other objects already count costs nothing.
+class Metrics:
+    QUANTILES = (0.5, 0.9, 0.99, 0.999)
+
+    def __init__(self, prefix: str = 'moodbot') -> None:
+        self.prefix = prefix
+        self.counters: Dict[str, int] = {}
+        self.sources: Dict[str, Callable[[], float]] = {}
+        self.kinds: Dict[str, str] = {}
+        self.histograms: Dict[str, Histogram] = {}
+        self.help: Dict[str, str] = {}
+
+    # Add `n` to counter `name`
+    def inc(self, name: str, n: int = 1) -> None:
+        self.counters[name] = self.counters.get(name, 0) + n
+
+    # Export the value of `func()` as counter (or gauge) `name`, a gauge
+    # reading None is left out
+    def source(self, name: str, func: Callable[[], float], help: str = '',
+               kind: str = 'counter') -> None:
+        self.sources[name] = func
+        self.help[name] = help
+        self.kinds[name] = kind
+
+    # Histogram `name`, created on first use
+    def histogram(self, name: str, help: str = '') -> Histogram:
+        hist = self.histograms.get(name)
+        if hist is None:
+            hist = self.histograms[name] = Histogram()
+            self.help[name] = help
+        return hist
+
+    # Record a duration in seconds
+    def observe(self, name: str, seconds: float) -> None:
+        self.histogram(name).record(int(seconds * 1e6))
+
+    # Prometheus text exposition format
+    def render(self) -> str:
+        lines = []
+        values = dict(self.counters)
+        for name, func in self.sources.items():
+            values[name] = func()
+        for name in sorted(values):
+            if values[name] is None:
+                continue
+            full = f'{self.prefix}_{name}'
+            if self.help.get(name):
+                lines.append(f'# HELP {full} {self.help[name]}')
+            lines.append(f'# TYPE {full} {self.kinds.get(name, "counter")}')
+            lines.append(f'{full} {values[name]}')
+        for name in sorted(self.histograms):
+            hist = self.histograms[name]
+            full = f'{self.prefix}_{name}_seconds'
+            if self.help.get(name):
+                lines.append(f'# HELP {full} {self.help[name]}')
+            lines.append(f'# TYPE {full} summary')
+            for q in self.QUANTILES:
+                lines.append(f'{full}{{quantile="{q}"}} '
+                             f'{hist.percentile(q * 100) / 1e6:.6f}')
+            lines.append(f'{full}_sum {hist.total / 1e6:.6f}')
+            lines.append(f'{full}_count {hist.count}')
+        return '\n'.join(lines) + '\n'
+
+    # Write the metrics to `path` atomically (textfile collector)
+    def write_textfile(self, path: str) -> None:
+        if path == ':memory:':
+            return
+        tmp = f'{path}.tmp'
+        with open(tmp, 'w') as f:
+            f.write(self.render())
+        os.replace(tmp, path)
+
+
+# Serves the metrics on a unix socket. poll() never blocks, it answers
+# every client waiting at that moment and closes the connection.
+class MetricsSocket:
+    def __init__(self, metrics: Metrics, path: str) -> None:
+        self.metrics = metrics
+        self.path = path
+        self.sock = None
+        if path == ':memory:':
+            return
+        if os.path.exists(path):
+            os.unlink(path)
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self.sock.bind(path)
+        self.sock.listen(4)
+        self.sock.setblocking(False)
+
+    def poll(self) -> int:
+        served = 0
+        while self.sock is not None:
+            try:
+                conn, _ = self.sock.accept()
+            except BlockingIOError:
+                break
+            with conn:
+                conn.settimeout(0.1)
+                try:
+                    conn.sendall(self.metrics.render().encode())
+                except OSError:
+                    pass
+            served += 1
+        return served
+
+    def close(self) -> None:
+        if self.sock is not None:
+            self.sock.close()
+            os.unlink(self.path)
+            self.sock = None
+
+
+# Stage timestamps of each frame from joystick sample to the robot's reply.
+# The robot answers every frame in order, so replies are matched by their
+# sequence number (protocol v2) or else to the oldest frame waiting.
+class ControlLatency:
+    MAX_PENDING = 64    # Frames waiting for a reply before the oldest is lost
+    TIMEOUT = 0.5       # Seconds until a frame's reply is given up
+
+    def __init__(self, metrics: Metrics,
+                 clock: Callable[[], float] = monotonic) -> None:
+        self.metrics = metrics
+        self.clock = clock
+        self.pending = deque()
+        self.sample_to_write = metrics.histogram(
+            'sample_to_write', 'Joystick sample to serial write')
+        self.build_to_write = metrics.histogram(
+            'build_to_write', 'Frame built to serial write')
+        self.write_to_ack = metrics.histogram(
+            'write_to_ack', 'Serial write to the robot reply being parsed')
+        self.sample_to_ack = metrics.histogram(
+            'sample_to_ack', 'Joystick sample to the robot reply, end to end')
+
+    # A frame was written. `sampled` is None for frames not driven by the
+    # joystick (stop frames), `seq` None for v1 frames.
+    def sent(self, sampled: Optional[float], built: float,
+             seq: Optional[int] = None) -> None:
+        now = self.clock()
+        pending = self.pending
+        if len(pending) >= self.MAX_PENDING:
+            pending.popleft()
+            self.metrics.inc('ack_lost')
+        pending.append((sampled, now, seq))
+        self.build_to_write.record(int((now - built) * 1e6))
+        if sampled is not None:
+            self.sample_to_write.record(int((now - sampled) * 1e6))
+
+    # The robot replied to frame `seq`, or to the oldest pending frame
+    def ack(self, ok: bool, seq: Optional[int] = None) -> None:
+        if not ok:
+            self.metrics.inc('err_replies')
+        pending = self.pending
+        if seq is not None:
+            for skip, entry in enumerate(pending):
+                if entry[2] == seq:
+                    break
+            else:
+                self.metrics.inc('unmatched_replies')
+                return
+            # Frames before it were lost on the way
+            for _ in range(skip):
+                pending.popleft()
+                self.metrics.inc('ack_lost')
+        if not pending:
+            self.metrics.inc('unmatched_replies')
+            return
+        now = self.clock()
+        sampled, written, _ = pending.popleft()
+        self.write_to_ack.record(int((now - written) * 1e6))
+        if sampled is not None:
+            self.sample_to_ack.record(int((now - sampled) * 1e6))
+
+    # Drop frames whose reply is overdue
+    def expire(self) -> None:
+        pending = self.pending
+        if not pending:
+            return
+        cutoff = self.clock() - self.TIMEOUT
+        while pending and pending[0][1] < cutoff:
+            pending.popleft()
+            self.metrics.inc('ack_timeouts')
@@ -0,0 +1,122 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Joystick/button mixing into robot frames. mix_frame() does the math on
+# every call, FrameTable precomputes every frame for quantized axes once so
+# a control tick is a single slice of one bytes blob.
+
+from typing import Callable, Tuple
+
+from crc8 import FRAME_LEN, build_frame, encode_frames
+
+MAX_PWM = 127
+DEADZONE = 0.1      # Axis offset from centre that is treated as zero
+
+# Button mask bits (ButtonReader order)
+BTN_LED = 0x01
+BTN_DIG_UP = 0x02
+BTN_DIG_DOWN = 0x04
+BTN_DIG_CW = 0x08
+BTN_DIG_CCW = 0x10
+
+
+# Mixing curves map an axis deflection in [-1, 1] to [-1, 1]
+def linear(a: float) -> float:
+    return a
+
+
+# Soft centre, full range at the ends; k = 0 is linear, k = 1 is cubic
+def expo(k: float) -> Callable[[float], float]:
+    return lambda a: (1 - k) * a + k * a * a * a
+
+
+# Wheel speeds (signed PWM) for joystick axis values in [0, 1]
+def mix(x: float, y: float, curve=linear, trim_l: float = 1.0,
+        trim_r: float = 1.0) -> Tuple[int, int]:
+    l_r_coef = int(curve((x - 0.5) * 2) * MAX_PWM) * -1 \
+        if abs(x - 0.5) >= DEADZONE else 0
+    f_b_coef = int(curve((y - 0.5) * -2) * MAX_PWM) * -1 \
+        if abs(y - 0.5) >= DEADZONE else 0
+
+    l_wheels_spd = int((f_b_coef - l_r_coef) * -1 * trim_l)
+    r_wheels_spd = int((f_b_coef + l_r_coef) * -1 * trim_r)
+
+    # Limit wheel speeds to MAX_PWM
+    l_wheels_spd = min(max(l_wheels_spd, -MAX_PWM), MAX_PWM)
+    r_wheels_spd = min(max(r_wheels_spd, -MAX_PWM), MAX_PWM)
+    return l_wheels_spd, r_wheels_spd
+
+
+# Wheel direction control bits
+def direction_ctrl(l_wheels_spd: int, r_wheels_spd: int) -> int:
+    return (0x00 if l_wheels_spd > 0 else 0x01) | \
+        (0x02 if r_wheels_spd > 0 else 0x00)
+
+
+# Digger and LED control bits for a button mask
+def button_ctrl(mask: int) -> int:
+    ctrl = 0
+    # Digger movement
+    if mask & (BTN_DIG_UP | BTN_DIG_DOWN):
+        ctrl |= 0x10
+        if mask & BTN_DIG_UP:
+            ctrl |= 0x20
+    # Digger rotation
+    if mask & (BTN_DIG_CW | BTN_DIG_CCW):
+        ctrl |= 0x04
+        if mask & BTN_DIG_CW:
+            ctrl |= 0x08
+    # LED
+    if mask & BTN_LED:
+        ctrl |= 0x40
+    return ctrl
+
+
+# Frame for axis values in [0, 1] and a button mask, computed directly
+def mix_frame(x: float, y: float, mask: int, curve=linear,
+              trim_l: float = 1.0, trim_r: float = 1.0) -> bytes:
+    l_wheels_spd, r_wheels_spd = mix(x, y, curve, trim_l, trim_r)
+    ctrl = direction_ctrl(l_wheels_spd, r_wheels_spd) | button_ctrl(mask)
+    return build_frame(abs(l_wheels_spd), abs(r_wheels_spd), ctrl)
+
+
+# Every frame for `bits` bits per axis and all button masks, in one blob.
+# Each axis gets 2**bits + 1 levels so the stick centre is a level of its
+# own. The 32 button masks only produce 18 distinct control codes, the
+# blob stores those and a 32 entry map picks the code for a mask.
+# Curves and trim are baked in when the table is built. Off the grid the
+# frames are approximate: at 6 bits up to 27 PWM steps off next to the
+# deadzone, and the direction bits of a stopped wheel can differ.
+class FrameTable:
+    def __init__(self, bits: int = 6, curve=linear, trim_l: float = 1.0,
+                 trim_r: float = 1.0) -> None:
+        self.bits = bits
+        self.levels = (1 << bits) + 1
+        self.scale = self.levels - 1
+        codes = sorted(set(button_ctrl(mask) for mask in range(32)))
+        self.code_index = bytes(codes.index(button_ctrl(mask))
+                                for mask in range(32))
+        self.codes = len(codes)
+
+        frames = []
+        for qx in range(self.levels):
+            for qy in range(self.levels):
+                l_wheels_spd, r_wheels_spd = mix(
+                    qx / self.scale, qy / self.scale, curve, trim_l, trim_r)
+                spd_l, spd_r = abs(l_wheels_spd), abs(r_wheels_spd)
+                ctrl = direction_ctrl(l_wheels_spd, r_wheels_spd)
+                frames.extend((spd_l, spd_r, ctrl | code) for code in codes)
+        self.blob = bytes(encode_frames(frames))
+
+    # Frame for axis values in [0, 1] and a button mask
+    def frame(self, x: float, y: float, mask: int) -> bytes:
+        scale = self.scale
+        qx = min(max(int(x * scale + 0.5), 0), scale)
+        qy = min(max(int(y * scale + 0.5), 0), scale)
+        pos = ((qx * self.levels + qy) * self.codes
+               + self.code_index[mask]) * FRAME_LEN
+        return self.blob[pos:pos + FRAME_LEN]
@@ -0,0 +1,82 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# RF protocol versions. v1 is the original frame and ASCII reply:
+#
+#   host  -> robot  [0xFF][SPD_L][SPD_R][CTRL][CRC]
+#   robot -> host   "<ADC>:OK\r\n" / "<ADC>:ERR\r\n"
+#
+# v2 adds a sequence number and a fixed-size binary reply:
+#
+#   host  -> robot  [0xFE][SEQ][SPD_L][SPD_R][CTRL][CRC]
+#   robot -> host   [0xFD][SEQ][ADC_LO][ADC_HI][FLAGS][CRC]
+#   both ways       [0xFC][VERSION][CRC]                    hello
+#
+# CRCs are CRC-8 (crc8.CRC8_POLY) over the bytes between start and CRC.
+# The host sends a hello at startup and talks v1 until the robot answers
+# with one; v2 firmware also says hello when it boots. v2 firmware still
+# accepts v1 frames and answers them in v1.
+
+from crc8 import crc8, crc8_table
+
+VERSION = 2
+
+V2_START = 0xFE
+V2_FRAME_LEN = 6
+REPLY_START = 0xFD
+REPLY_LEN = 6
+HELLO_START = 0xFC
+HELLO_LEN = 3
+
+# Reply flags
+FLAG_CRC_ERR = 0x01     # Frame rejected, SEQ is the one received
+FLAG_FAILSAFE = 0x02    # Robot was stopped by its failsafe before this frame
+
+_CRC_TABLE = crc8_table()
+
+
+# Hello frame announcing `version`
+def hello_frame(version: int = VERSION) -> bytes:
+    return bytes((HELLO_START, version, crc8((version,))))
+
+
+# v2 frame from a v1 frame and a sequence number
+def encode_v2(seq: int, frame: bytes) -> bytes:
+    t = _CRC_TABLE
+    spd_l, spd_r, ctrl = frame[1], frame[2], frame[3]
+    return bytes((V2_START, seq, spd_l, spd_r, ctrl,
+                  t[t[t[t[seq] ^ spd_l] ^ spd_r] ^ ctrl]))
+
+
+# v2 telemetry reply
+def encode_reply(seq: int, adc: int, flags: int) -> bytes:
+    body = (seq, adc & 0xFF, adc >> 8, flags)
+    return bytes((REPLY_START,) + body + (crc8(body),))
+
+
+# Writes v1 frames to the robot port in the negotiated protocol version
+class RfLink:
+    def __init__(self, port) -> None:
+        self.port = port
+        self.version = 1
+        self.seq = 0            # Sequence number of the last v2 frame
+
+    # Ask the robot for its protocol version
+    def hello(self) -> None:
+        self.port.write(hello_frame())
+
+    # The robot said hello
+    def negotiate(self, version: int) -> None:
+        self.version = min(version, VERSION)
+
+    # Write one v1 frame
+    def write(self, frame: bytes) -> int:
+        if self.version >= 2:
+            self.seq = (self.seq + 1) & 0xFF
+            frame = encode_v2(self.seq, frame)
+        return self.port.write(frame)
+
@@ -0,0 +1,197 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# Flight recorder for the RF link. Every byte written to or read from the
+# robot port goes into a fixed-size ring file through mmap, one 32 byte
+# record per write/read:
+#
+#   header  <4sHHIQ>   magic "MBFR", version, record size, slots, records
+#                      written so far (the next slot is records % slots)
+#   record  <QBB22s>   monotonic ns, kind (TX/RX), length, payload
+#
+# Payloads longer than 22 bytes are split over several records. Nothing is
+# flushed on the hot path, the page cache writes the file back.
+#
+#   python3 py/recorder.py dump ~/.moodbot/flight.rec
+#   python3 py/recorder.py replay ~/.moodbot/flight.rec --speed 10
+
+import mmap
+import os
+import struct
+import threading
+import time
+from typing import Callable, Iterator, Tuple
+
+MAGIC = b'MBFR'
+VERSION = 1
+HEADER = struct.Struct('<4sHHIQ')
+HEADER_SIZE = 32
+RECORD = struct.Struct('<QBB22s')
+PAYLOAD = 22
+
+TX = 1      # Frame sent to the robot
+RX = 2      # Bytes received from the robot
+
+KIND_NAMES = {TX: 'TX', RX: 'RX'}
+
+
+# Append-only ring of records in a memory-mapped file
+class FlightRecorder:
+    SLOTS = 1 << 16     # 2 MiB, about half an hour of driving
+
+    def __init__(self, path: str, slots: int = SLOTS,
+                 clock_ns: Callable[[], int] = time.monotonic_ns) -> None:
+        self.path = path
+        self.clock_ns = clock_ns
+        size = HEADER_SIZE + slots * RECORD.size
+        if path == ':memory:':
+            self.mm = mmap.mmap(-1, size)
+        else:
+            fd = os.open(path, os.O_RDWR | os.O_CREAT, 0o644)
+            try:
+                if os.fstat(fd).st_size != size:
+                    os.ftruncate(fd, 0)
+                    os.ftruncate(fd, size)
+                self.mm = mmap.mmap(fd, size)
+            finally:
+                os.close(fd)
+
+        magic, version, record_size, old_slots, count = \
+            HEADER.unpack_from(self.mm, 0)
+        if (magic, version, record_size, old_slots) != \
+                (MAGIC, VERSION, RECORD.size, slots):
+            # New or foreign file, start over
+            count = 0
+            HEADER.pack_into(self.mm, 0, MAGIC, VERSION, RECORD.size,
+                             slots, count)
+        self.slots = slots
+        self.count = count
+        # TX (control loop, button callbacks) and RX record concurrently
+        self.lock = threading.Lock()
+
+    # Append one record, splitting long payloads
+    def record(self, kind: int, data: bytes) -> None:
+        t = self.clock_ns()
+        mm = self.mm
+        with self.lock:
+            count = self.count
+            for pos in range(0, len(data), PAYLOAD):
+                chunk = data[pos:pos + PAYLOAD]
+                RECORD.pack_into(mm, HEADER_SIZE + count % self.slots * RECORD.size,
+                                 t, kind, len(chunk), chunk)
+                count += 1
+            self.count = count
+            struct.pack_into('<Q', mm, 12, count)
+
+    def close(self) -> None:
+        self.mm.flush()
+        self.mm.close()
+
+
+# Serial port wrapper recording everything written to and read from `port`
+class RecordingPort:
+    def __init__(self, port, recorder: FlightRecorder) -> None:
+        self.port = port
+        self.recorder = recorder
+
+    @property
+    def in_waiting(self) -> int:
+        return self.port.in_waiting
+
+    def write(self, data: bytes) -> int:
+        self.recorder.record(TX, data)
+        return self.port.write(data)
+
+    def read(self, size: int = 1) -> bytes:
+        data = self.port.read(size)
+        if data:
+            self.recorder.record(RX, data)
+        return data
+
+    def readline(self) -> bytes:
+        data = self.port.readline()
+        if data:
+            self.recorder.record(RX, data)
+        return data
+
+    def __getattr__(self, name):
+        return getattr(self.port, name)
+
+
+# Records of a recording file (or an open recorder's map), oldest first
+def read_records(source) -> Iterator[Tuple[int, int, bytes]]:
+    if isinstance(source, str):
+        with open(source, 'rb') as f:
+            buf = f.read()
+    else:
+        buf = source.mm[:]
+    magic, version, record_size, slots, count = HEADER.unpack_from(buf, 0)
+    if magic != MAGIC or version != VERSION or record_size != RECORD.size:
+        raise ValueError('not a flight recording')
+
+    first = max(count - slots, 0)
+    for i in range(first, count):
+        t, kind, length, payload = RECORD.unpack_from(
+            buf, HEADER_SIZE + i % slots * RECORD.size)
+        yield t, kind, payload[:length]
+
+
+# Stream recorded TX frames into `robot` (e.g. sim.SimRobot) and RX bytes
+# into `telemetry` (a TelemetryParser). speed=1 keeps the recorded timing,
+# higher values replay faster, 0 as fast as possible. Returns the number of
+# records replayed.
+def replay(records, robot=None, telemetry=None, speed: float = 0,
+           sleep=time.sleep, clock=time.monotonic) -> int:
+    start = clock()
+    first = None
+    replayed = 0
+    for t, kind, data in records:
+        if speed:
+            if first is None:
+                first = t
+            delay = (t - first) / 1e9 / speed - (clock() - start)
+            if delay > 0:
+                sleep(delay)
+        if kind == TX and robot is not None:
+            robot.receive(data)
+        elif kind == RX and telemetry is not None:
+            telemetry.feed(data)
+        replayed += 1
+    return replayed
+
+
+if __name__ == '__main__':
+    # Not imported at the top, the control unit loads this module at startup
+    import argparse
+
+    parser = argparse.ArgumentParser(description='MoodBot flight recorder')
+    parser.add_argument('command', choices=('dump', 'replay'))
+    parser.add_argument('path')
+    parser.add_argument('--speed', type=float, default=0,
+                        help='replay speed, 1 = real time, 0 = unpaced')
+    args = parser.parse_args()
+
+    if args.command == 'dump':
+        first = None
+        for t, kind, data in read_records(args.path):
+            first = t if first is None else first
+            print(f'{(t - first) / 1e9:12.6f} {KIND_NAMES.get(kind, kind)} '
+                  f'{data.hex(" ")}  {data!r}')
+    else:
+        from sim import SimRobot, SimSerial
+        from telemetry import TelemetryParser
+
+        robot = SimRobot()
+        SimSerial('replay', robot)
+        telemetry = TelemetryParser()
+        start = time.perf_counter()
+        n = replay(read_records(args.path), robot, telemetry, args.speed)
+        elapsed = time.perf_counter() - start
+        print(f'{n} records in {elapsed:.3f} s ({n / max(elapsed, 1e-9):.0f} records/s)')
+        print(f'robot frames ok={robot.frames_ok} err={robot.frames_err}')
+        print(f'telemetry ok={telemetry.ok} err={telemetry.err} '
+              f'bad={telemetry.bad} battery={telemetry.bat}')
@@ -5,28 +5,39 @@
 # Version: 0.5
 # License: LGPLv3
 
+from startup import StartupTimer
+STARTUP = StartupTimer()    # Created first to time the imports below
+
+# tkinter and asyncio are imported where they are used, so the robot gets
+# its stop frame before they load
+import os
 import threading
-from time import time, sleep
-import tkinter as tk
-from tkinter.ttk import Label
-from gpiozero import Button, MCP3004
-import serial
-import RPi.GPIO as GPIO
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from time import sleep
 from MFRC522 import MFRC522
+from hal import get_backend
+from idstore import UsedIdStore
+from idsync import IdSyncLink
+from battery import BatteryEstimator
+from crc8 import STOP_FRAME
+from game import (CARD_ACCEPTED, MISSION_COMPLETE, READY, TICK, TIMEOUT,
+                  GameEngine)
+from metrics import ControlLatency, Metrics, MetricsSocket
+from mixer import (BTN_DIG_CCW, BTN_DIG_CW, BTN_DIG_DOWN, BTN_DIG_UP,
+                   BTN_LED, FrameTable, linear, mix_frame)
+from protocol import RfLink
+from recorder import FlightRecorder, RecordingPort
+from telemetry import TelemetryParser
+from txpolicy import TxPolicy
+from view import ViewModel
 from typing import Tuple, Union
 
 DEBUG = False
-
-def get_crc8(data: bytes, poly: int) -> int:
-    crc = 0
-    for b in data:
-        crc ^= b
-        for _ in range(8):
-            if crc & 1:
-                crc = (crc >> 1) ^ poly
-            else:
-                crc >>= 1
-    return crc & 0xff
+ASYNC_LOOP = False  # Run the control loop as asyncio tasks, Tk only renders
+FRAME_BITS = 0      # Joystick bits per axis in a frame table, 0 = exact mix per tick
+FLIGHT_RECORDER = True  # Record the RF link to ~/.moodbot/flight.rec
+METRICS_EXPORT = 'textfile'  # ~/.moodbot/moodbot.prom, 'socket' or None
 
 # RFID reader
 class MFRC522Reader:
@@ -35,36 +46,62 @@ class MFRC522Reader:
 
     KEY = [0xFF, 0xFF, 0xFF, 0xFF, 0xFF, 0xFF]
     BLOCK_ADDRS = [8, 9, 10]
-
-    def __init__(self) -> None:
-        self.READER = MFRC522(device=1, pin_rst=11)
+    PIN_IRQ = None      # Pin wired to the reader's IRQ line, None = busy-poll
+    POLL_MIN = 0.02     # Poll interval right after card activity (s)
+    POLL_MAX = 0.05     # Poll interval once the field stays empty (s)
+    HOLD_TIME = 1       # Pause after a card was read (s)
+    UID_CACHE_TIME = 60 # Skip auth and block reads for the same card (s)
+    CRC_MODE = MFRC522.CRC_SOFT # CRC_A on the host, the chip, or both
+
+    def __init__(self, backend=None, pin_irq=PIN_IRQ, crc_mode=CRC_MODE) -> None:
+        self.backend = backend or get_backend()
+        self.READER = MFRC522(device=1, pin_rst=11, shadow=True, pin_irq=pin_irq,
+                              crc_mode=crc_mode,
+                              spi=self.backend.spi(), gpio=self.backend.gpio())
         self.id = None
         self.text = None
         self.t = None
+        self.interval = self.POLL_MAX
+        # Last fully read card, for the UID fast path
+        self.last_uid = None
+        self.last_text = None
+        self.last_read = None
+        self.polls = 0
+        self.fast_reads = 0
+        # Card text blocks are read into this buffer
+        self.block_buf = bytearray(len(self.BLOCK_ADDRS) * 16)
+
+    # Next poll interval, doubles while the field stays empty
+    def backoff(self) -> float:
+        self.interval = min(self.interval * 2, self.POLL_MAX)
+        return self.interval
+
+    # Poll for a card once, returns the delay until the next poll
+    def poll(self) -> float:
+        self.polls += 1
+        id, text = self.read_no_block()
+        if not id:
+            return self.backoff()
+        self.id, self.text = id, text
+        self.interval = self.POLL_MIN
+        if DEBUG:
+            print(self.id)
+            print("Hold a tag near the reader")
+        return self.HOLD_TIME
 
-    # Continuously read and print the ID of the card
-    def run_loop(self) -> None:
-        while True:
-            if DEBUG:
-                print("Hold a tag near the reader")
-            self.id, self.text = self.read()
-            if DEBUG:
-                print(self.id)
-            sleep(1)
-
-    # start te run loop in a separate thread
+    # Continuously read the ID of the card in the background
     def run(self) -> None:
-        self.t = threading.Thread(target=self.run_loop)
-        self.t.daemon = True
-        self.t.start()
+        self.t = self.backend.start_poller(self.poll)
 
     # read a card and return the id and text
     def read(self) -> Tuple[int, str]:
         id, text = self.read_no_block()
 
         while not id:
+            sleep(self.backoff())
             id, text = self.read_no_block()
 
+        self.interval = self.POLL_MIN
         return id, text
 
     # attempt to read a card without blocking and return the id and text
@@ -79,19 +116,25 @@ class MFRC522Reader:
             return None, None
 
         id = self.uid_to_num(uid)
+        now = self.backend.time()
         self.READER.MFRC522_SelectTag(uid)
-        status = self.READER.MFRC522_Auth(
-            self.READER.PICC_AUTHENT1A, 11, self.KEY, uid)
-        data = []
+
+        if uid == self.last_uid and now - self.last_read < self.UID_CACHE_TIME:
+            # Same card we just read, its blocks are known
+            self.fast_reads += 1
+            self.READER.MFRC522_Halt()
+            return id, self.last_text
+
+        status, data = self.READER.MFRC522_ReadBlocks(
+            self.KEY, uid, self.BLOCK_ADDRS[0], self.BLOCK_ADDRS[-1] + 1,
+            self.block_buf)
         text_read = ''
 
         if status == self.READER.MI_OK:
-            for block_num in self.BLOCK_ADDRS:
-                block = self.READER.MFRC522_Read(block_num)
-                if block:
-                    data += block
-            if data:
-                text_read = ''.join(chr(i) for i in data)
+            text_read = data.decode('latin-1')
+            self.last_uid, self.last_text, self.last_read = uid, text_read, now
+        # Halt the card so it stays quiet until it leaves the field
+        self.READER.MFRC522_Halt()
         self.READER.MFRC522_StopCrypto1()
 
         return id, text_read
@@ -106,333 +149,642 @@ class MFRC522Reader:
         return n
 
 
-# Joystick reader
+# Joystick reader. After run() a sampler thread oversamples both axes into
+# ring buffers and read() returns the filtered axis state without touching
+# the ADC.
 class MCP3004Reader:
-    def __init__(self) -> None:
-        self.axis_x = MCP3004(channel=0)
-        self.axis_y = MCP3004(channel=1)
-
+    SAMPLE_RATE = 200   # Samples per second and axis
+    WINDOW = 9          # Ring buffer length in samples
+    FILTER = 'median'   # 'median', 'ema' or None for the latest sample
+    EMA_ALPHA = 0.25
+    CHANNELS = 4        # Inputs of one MCP3004
+    SPI = (0, 0)        # SPI port and device (chip select) of the ADC
+
+    def __init__(self, backend=None, channels=(0, 1), rate=SAMPLE_RATE,
+                 window=WINDOW, filter=FILTER, spi=SPI) -> None:
+        for channel in channels:
+            if not 0 <= channel < self.CHANNELS:
+                raise ValueError(f'MCP3004 has no channel {channel}')
+        self.backend = backend or get_backend()
+        self.axis_x = self.backend.adc(channels[0], *spi)
+        self.axis_y = self.backend.adc(channels[1], *spi)
+        self.period = 1 / rate
+        self.window = window
+        self.filter = filter
+        self.buf_x = array('d', [0.5]) * window
+        self.buf_y = array('d', [0.5]) * window
+        self.pos = 0
+        self.ema_x = 0.5
+        self.ema_y = 0.5
+        self.samples = 0
+        self.sampled = None     # monotonic time of the latest sample
+        self.closed = False
+
+    # Start the sampler thread
+    def run(self) -> None:
+        self.t = self.backend.start_poller(self.sample)
+
+    # Take one sample of both axes, returns the delay until the next one
+    def sample(self) -> float:
+        if self.closed:
+            return self.period
+        x = self.axis_x.value
+        y = self.axis_y.value
+        if not self.samples:
+            # Fill the window so the filters start from the first sample
+            self.buf_x[:] = array('d', [x]) * self.window
+            self.buf_y[:] = array('d', [y]) * self.window
+            self.ema_x, self.ema_y = x, y
+        pos = self.pos
+        self.buf_x[pos] = x
+        self.buf_y[pos] = y
+        self.pos = (pos + 1) % self.window
+        self.ema_x += self.EMA_ALPHA * (x - self.ema_x)
+        self.ema_y += self.EMA_ALPHA * (y - self.ema_y)
+        self.samples += 1
+        self.sampled = self.backend.monotonic()
+        return self.period
+
+    # Filtered axis values, reads the ADC directly until the sampler runs
     def read(self) -> Tuple[float, float]:
-        return [self.axis_x.value, self.axis_y.value]
+        if not self.samples:
+            self.sampled = self.backend.monotonic()
+            return [self.axis_x.value, self.axis_y.value]
+        if self.filter == 'median':
+            mid = self.window // 2
+            return [sorted(self.buf_x)[mid], sorted(self.buf_y)[mid]]
+        if self.filter == 'ema':
+            return [self.ema_x, self.ema_y]
+        pos = self.pos - 1
+        return [self.buf_x[pos], self.buf_y[pos]]
 
     def close(self) -> None:
+        self.closed = True
         self.axis_x.close()
         self.axis_y.close()
 
 
-# Button readerS
+# Button reader. Edge callbacks keep a bitmask of the pressed buttons
+# (mixer.BTN_* bits), `on_change(mask)` is called on every change.
 class ButtonReader:
-    def __init__(self) -> None:
-        # Define the button
-        self.button_led = Button(25)
-        self.button_dig_up = Button(24)
-        self.button_dig_down = Button(23)
-        self.button_dig_cw = Button(27)
-        self.button_dig_ccw = Button(22)
-
-    # Read the button
-    def read(self)  -> Tuple[bool, bool, bool, bool, bool]:
-        return [
-            self.button_led.value,
-            self.button_dig_up.value,
-            self.button_dig_down.value,
-            self.button_dig_cw.value,
-            self.button_dig_ccw.value
-        ]
-
-    # Close the button
+    BOUNCE_TIME = 0.01  # Seconds to ignore edges after an edge
+    # Mask bit and BCM pin of each button
+    PINS = ((BTN_LED, 25), (BTN_DIG_UP, 24), (BTN_DIG_DOWN, 23),
+            (BTN_DIG_CW, 27), (BTN_DIG_CCW, 22))
+
+    def __init__(self, backend=None, bounce_time=BOUNCE_TIME,
+                 pins=PINS) -> None:
+        backend = backend or get_backend()
+        self.lock = threading.Lock()
+        self.on_change = None
+        self.mask = 0
+        self.changes = 0
+        # Define the buttons
+        self.buttons = []
+        for bit, pin in pins:
+            button = backend.button(pin, bounce_time)
+            self.buttons.append(button)
+            button.when_pressed = self.edge(bit, True)
+            button.when_released = self.edge(bit, False)
+            if button.value:
+                self.mask |= bit
+
+    # Edge callback setting or clearing `bit`
+    def edge(self, bit, pressed):
+        def callback():
+            with self.lock:
+                mask = self.mask | bit if pressed else self.mask & ~bit
+                if mask == self.mask:
+                    return
+                self.mask = mask
+                self.changes += 1
+            if self.on_change is not None:
+                self.on_change(mask)
+        return callback
+
+    # Read the buttons as a bitmask
+    def read(self) -> int:
+        return self.mask
+
+    # Close the buttons
     def close(self) -> None:
-        self.button_led.close()
-        self.button_dig_up.close()
-        self.button_dig_down.close()
-        self.button_dig_cw.close()
-        self.button_dig_ccw.close()
+        for button in self.buttons:
+            button.close()
 
 # Robot controller
+#
+# In fleet mode (fleet.py) one process drives several robots. Every robot
+# gets its own controller on its own RF port with its own joystick channels
+# and buttons, the card reader, the used IDs and the frame table are those
+# of the first controller (`shared`).
 class RobotController:
-    def __init__(self) -> None:
-        # Initialize serial connections, RFID and joystick readers,
-        # button reader, and used IDs list
+    KEEPALIVE = 0.2     # Repeat an unchanged frame after this many seconds
+    IDLE_KEEPALIVE = 5  # ... while stopped and waiting for a card
+    RF_PORT = '/dev/ttyUSB0'
+    INIT_WORKERS = None # Threads opening the serial port and the database,
+                        # 0 = all devices one after another on this thread
+
+    def __init__(self, backend=None, id_timeout=28800, keepalive=None,
+                 port=RF_PORT, joystick=(0, 1), buttons=ButtonReader.PINS,
+                 shared=None, startup=None, spi=MCP3004Reader.SPI) -> None:
+        self.backend = backend or get_backend()
+        self.port = port
+        self.shared = shared
+        self.startup = startup or StartupTimer()
+        self.recorder = None
         self.rf_serial = self.open_rf_serial()
-        self.id_serial = self.open_id_serial()
-        self.rfid_reader = MFRC522Reader()
-        self.rfid_reader.run()
-        self.joystick_reader = MCP3004Reader()
-        self.button_reader = ButtonReader()
-        self.used_ids = []
+        # Frames go out in the protocol version negotiated with the robot
+        self.link = RfLink(self.rf_serial)
+        # keepalive=0 sends every frame
+        self.tx = TxPolicy(self.link,
+                           self.KEEPALIVE if keepalive is None else keepalive,
+                           self.backend.monotonic)
+        self.tx_lock = threading.Lock()
+        # Button changes are sent right away while the robot is armed
+        self.armed = False
+        self.button_frames = 0
+        self.init_metrics()
+        # Stop the robot before anything else, whatever the last process
+        # left it doing
+        self.send_stop()
+        self.startup.mark('stop_frame')
+
+        # Initialize RFID and joystick readers, button reader, the serial
+        # connection to the secondary controller and the used IDs list
+        devices = self.init_devices(id_timeout, joystick, buttons, spi)
+        self.joystick_reader = devices['joystick']
+        self.button_reader = devices['buttons']
+        if shared is None:
+            self.id_serial = devices['id_serial']
+            self.rfid_reader = devices['rfid']
+            self.used_ids = devices['used_ids']
+            self.rfid_reader.run()
+            self.joystick_reader.run()
+            self.id_sync = IdSyncLink(self.id_serial, self.used_ids)
+        else:
+            # Fleet member, its joystick is read in the control tick
+            self.id_serial = shared.id_serial
+            self.rfid_reader = shared.rfid_reader
+            self.mixing = shared.mixing
+            self.frame_table = shared.frame_table
+            self.used_ids = shared.used_ids
+            self.id_sync = shared.id_sync
+        self.startup.mark('devices')
+        self.button_reader.on_change = self.on_buttons
+        self.telemetry = TelemetryParser()
+        self.battery = BatteryEstimator(self.backend.monotonic)
+        self.telemetry.on_reply = self.on_reply
+        self.telemetry.on_hello = self.link.negotiate
+        self.link.hello()
+        if shared is None:
+            # Catch up with the IDs the other unit used while we were down
+            self.id_sync.request_sync()
+
+    # Open the devices, most of their start up is waiting on driver
+    # imports, the MFRC522 reset, serial ports and the database. The MFRC522
+    # driver sets the RPi.GPIO pin numbering and gpiozero creates its pin
+    # factory on first use, neither is thread safe, so the GPIO devices are
+    # opened on this thread. Only the ID serial port and the used IDs
+    # database open in the pool meanwhile, INIT_WORKERS = 0 opens them
+    # here as well.
+    def init_devices(self, id_timeout, joystick, buttons, spi):
+        tasks = {}
+        if self.shared is None:
+            tasks['id_serial'] = self.open_id_serial
+            tasks['used_ids'] = lambda: UsedIdStore(
+                self.backend.data_path('used_ids.db'), id_timeout,
+                self.backend.time)
+        if self.INIT_WORKERS == 0 or not tasks:
+            devices = self.open_gpio_devices(joystick, buttons, spi)
+            devices.update((name, self.startup.timed(name, task))
+                           for name, task in tasks.items())
+            return devices
+        with ThreadPoolExecutor(self.INIT_WORKERS or len(tasks)) as pool:
+            futures = {name: pool.submit(self.startup.timed, name, task)
+                       for name, task in tasks.items()}
+            devices = self.open_gpio_devices(joystick, buttons, spi)
+            devices.update((name, future.result())
+                           for name, future in futures.items())
+            return devices
+
+    # RFID reader, pin factory, joystick and buttons in this order, then
+    # the frame table
+    def open_gpio_devices(self, joystick, buttons, spi):
+        devices = {}
+        timed = self.startup.timed
+        if self.shared is None:
+            devices['rfid'] = timed(
+                'rfid', lambda: MFRC522Reader(self.backend))
+        timed('pin_factory', self.backend.pin_factory)
+        devices['joystick'] = timed(
+            'joystick', lambda: MCP3004Reader(self.backend, joystick,
+                                              spi=spi))
+        devices['buttons'] = timed(
+            'buttons', lambda: ButtonReader(self.backend, pins=buttons))
+        if self.shared is None:
+            timed('frame_table', self.set_mixing)
+        return devices
 
     # Open the serial port for the RF module
     def open_rf_serial(self):
-        return serial.Serial(port='/dev/ttyUSB0', baudrate=38400, timeout=0.1)
+        port = self.backend.serial(self.port, 38400, 0)
+        if FLIGHT_RECORDER:
+            monotonic = self.backend.monotonic
+            name = 'flight.rec' if self.shared is None else \
+                f'flight-{os.path.basename(self.port)}.rec'
+            self.recorder = FlightRecorder(
+                self.backend.data_path(name),
+                clock_ns=lambda: int(monotonic() * 1e9))
+            port = RecordingPort(port, self.recorder)
+        return port
 
     # Open the serial port for secondary Controller (ID reader)
     def open_id_serial(self):
-        return serial.Serial(port='/dev/serial0', baudrate=38400, timeout=0.01)
+        return self.backend.serial('/dev/serial0', 38400, 0)
 
-    # Validate the remote ID and update the used IDs list
-    def validate_remote_id(self):
+    # Exchange used IDs with the secondary controller, never blocks
+    def sync_ids(self):
         try:
-            remote_id = int(self.id_serial.readline())
-            if remote_id in self.used_ids:
-                retval = True
-            else:
-                retval = False
-                self.used_ids.append(remote_id)
-            self.id_serial.write(str(retval).encode())
+            self.id_sync.poll()
         except Exception as err:
             if DEBUG:
                 print(err)
-            else:
-                pass
 
-    # Check the remote ID by sending it to the ID reader
-    def check_remote_id(self, rx_msg):
-        self.id_serial.write(str(rx_msg).encode())
-        try:
-            status = self.id_serial.readline() == b'True'
-        except Exception:
-            status = False
-        return status
-
-    # Check if the RFID is in the used IDs list or if it's in the remote ID list
+    # Check if the RFID was used here or on the other unit (the used IDs
+    # are replicated locally) and announce it to the other unit if not
     def check_rfid(self):
         rfid = self.rfid_reader.id
 
-        if rfid in self.used_ids or self.check_remote_id(rfid):
+        if not self.used_ids.add(rfid):
             return True
 
-        self.used_ids.append(rfid)
+        self.id_sync.announce(rfid)
         return False
 
-    # Handle joystick input and calculate wheel speeds
+    # Mixing curve and per-side trim, rebuilds the frame table
+    def set_mixing(self, curve=linear, trim_l=1.0, trim_r=1.0) -> None:
+        self.mixing = (curve, trim_l, trim_r)
+        self.frame_table = FrameTable(FRAME_BITS, curve, trim_l, trim_r) \
+            if FRAME_BITS else None
+
+    # Handle joystick input and build the frame to send
     def handle_joy(self):
-        MAX_PWM = 127
         axis = self.joystick_reader.read()
-        buttons = self.button_reader.read()
+        mask = self.button_reader.read()
 
         if DEBUG:
             print(f'X: {axis[0]-0.5}\nY: {axis[1]-0.5}')
-            print(f'data_to_send:{data}')
-
-        l_wheels_spd = 0
-        r_wheels_spd = 0
-
-        # Calculate left and right coefficients based on joystick axis input
-        l_r_coef = int((axis[0]-0.5)*2*MAX_PWM)*-1\
-              if abs(axis[0]-0.5) >= 0.1 else 0
-        f_b_coef = int((axis[1]-0.5)*-2*MAX_PWM)*-1\
-            if abs(axis[1]-0.5) >= 0.1 else 0
-
-        # Calculate left and right wheel speeds
-        l_wheels_spd = (f_b_coef-l_r_coef)*-1
-        r_wheels_spd = (f_b_coef+l_r_coef)*-1
-
-        # Limit wheel speeds to MAX_PWM
-        l_wheels_spd = min(max(l_wheels_spd, -MAX_PWM), MAX_PWM)
-        r_wheels_spd = min(max(r_wheels_spd, -MAX_PWM), MAX_PWM)
-
-        # Create data packet with wheel speeds and button states
-        data = [0xFF, abs(l_wheels_spd), abs(r_wheels_spd), 0x00, 0]
-        data[3] = (0x00 if l_wheels_spd > 0 else 0x1) | \
-            (0x02 if r_wheels_spd > 0 else 0x00)
-
-        # Digger movement
-        if buttons[1] or buttons[2]:
-            data[3] |= 0x10 
-            if buttons[1]:
-                data[3] |= 0x20
-
-        # Digger rotation
-        if buttons[3] or buttons[4]:
-            data[3] |= 0x04
-            if buttons[3]:
-                data[3] |= 0x08
-        # LED
-        if buttons[0]:
-            data[3] |= 0x40
-
-        # Calculate and append CRC
-        crc = get_crc8(bytes(data[1:4]), 0X8C)
-        data[4] = crc
+
+        if self.frame_table is not None:
+            data = self.frame_table.frame(axis[0], axis[1], mask)
+        else:
+            data = mix_frame(axis[0], axis[1], mask, *self.mixing)
+        if DEBUG:
+            print(f'data_to_send:{list(data)}')
         return data
 
+    # Latency histograms and counters, most counters are read at export
+    def init_metrics(self):
+        self.metrics = Metrics()
+        self.latency = ControlLatency(self.metrics, self.backend.monotonic)
+        source = self.metrics.source
+        source('frames_offered', lambda: self.tx.offered,
+               'Frames built by the control loop')
+        source('frames_sent', lambda: self.tx.sent,
+               'Frames written to the robot')
+        source('replies_ok', lambda: self.telemetry.ok,
+               'Frames the robot accepted')
+        source('replies_err', lambda: self.telemetry.err,
+               'Frames the robot rejected (CRC error)')
+        source('telemetry_bad_lines', lambda: self.telemetry.bad,
+               'Robot lines that could not be parsed')
+        source('id_sync_bad_frames', lambda: self.id_sync.bad,
+               'ID sync frames with a bad CRC or format')
+        source('id_sync_timeouts', lambda: self.id_sync.timeouts,
+               'ID queries the peer did not answer')
+        source('card_polls', lambda: self.rfid_reader.polls,
+               'RFID reader polls')
+        source('joystick_samples', lambda: self.joystick_reader.samples,
+               'Joystick samples taken')
+        source('button_frames', lambda: self.button_frames,
+               'Frames sent out of cycle on a button change')
+        source('frames_lost', lambda: self.telemetry.lost,
+               'Frames the robot never answered (protocol v2)')
+        source('robot_failsafes', lambda: self.telemetry.failsafes,
+               'Replies reporting the robot had stopped on its failsafe')
+        source('protocol_version', lambda: self.link.version,
+               'RF protocol version in use', 'gauge')
+        source('battery_percent', lambda: self.battery.percent,
+               'Estimated battery charge', 'gauge')
+        source('battery_runtime_seconds', lambda: self.battery.runtime,
+               'Predicted runtime until the battery is empty', 'gauge')
+        source('startup_stop_frame_seconds',
+               lambda: self.startup.at('stop_frame'),
+               'Process start to the first stop frame', 'gauge')
+        source('startup_seconds', lambda: self.startup.at('first_step'),
+               'Process start to the first control step', 'gauge')
+
     # Send data (wheel speeds and button states) to the robot
     def send_data(self):
-        data = self.handle_joy()
-        self.rf_serial.write(serial.to_bytes(data))
+        with self.tx_lock:
+            data = self.handle_joy()
+            built = self.backend.monotonic()
+            if self.tx.send(data):
+                self.latency.sent(self.joystick_reader.sampled, built,
+                                  self.sent_seq())
 
     # Send stop command to the robot
     def send_stop(self):
-        self.rf_serial.write(serial.to_bytes([255, 0, 0, 1, 94]))
-
-    # Get battery level from the robot
+        with self.tx_lock:
+            built = self.backend.monotonic()
+            if self.tx.send(STOP_FRAME,
+                            self.IDLE_KEEPALIVE if self.tx.keepalive else 0):
+                self.latency.sent(None, built, self.sent_seq())
+
+    # Sequence number of the frame just sent, None in protocol v1
+    def sent_seq(self):
+        return self.link.seq if self.link.version >= 2 else None
+
+    # Button edge (button callback thread): send the new state at once
+    # instead of waiting for the next tick
+    def on_buttons(self, mask):
+        if self.armed:
+            self.button_frames += 1
+            self.send_data()
+
+    # The robot replied to a frame, its battery reading was taken while
+    # executing the last frame we sent
+    def on_reply(self, ok, seq):
+        self.latency.ack(ok, seq)
+        # The robot samples the battery before it applies the frame it
+        # answers, the reading is under the load of the frame sent before
+        frame = self.tx.prev
+        self.battery.update(self.telemetry.bat,
+                            (frame[1] + frame[2]) / 2 if frame else 0)
+
+    # Get the latest battery level from the robot, never blocks. Replies
+    # are matched to sent frames under tx_lock, buttons send from their
+    # callback thread.
     def get_bat_lvl(self):
-        rx_msg = self.rf_serial.readline()
-        try:
-            bat = int(rx_msg.decode('utf-8').split(':')[0])
-            if DEBUG:
-                print(bat)
-            return bat
-        except:
-            if DEBUG:
-                print(rx_msg)
-            return None
+        with self.tx_lock:
+            self.telemetry.poll(self.rf_serial)
+            self.latency.expire()
+        if DEBUG:
+            print(self.telemetry.bat)
+        return self.telemetry.bat
 
 
 class App:
     GAME_TIMEOUT = 120  # Timeout for the game in seconds, 120=2min
     ID_TIMEOUT = 28800    # Timeout for the ID in seconds, 28800=8h
     DEBUG = True       # Debug flag for printing debug information
-
-    def __init__(self, window):
-        self.window: tk.Tk = window
-        self.robot_controller = RobotController()
+    UI_RATE = 30        # UI refresh rate in Hz (asyncio mode)
+    RX_RATE = 50        # Telemetry poll period in ms (asyncio mode)
+    SYNC_RATE = 50      # Remote ID sync period in ms (asyncio mode)
+    METRICS_RATE = 10000    # Metrics textfile update period in ms
+    METRICS_POLL = 200      # Metrics socket poll period in ms
+    GAME_RATE = 50      # Control step period in ms while a game runs
+    IDLE_RATE = 50      # ... and while waiting for a card, sets tap-to-start
+
+    def __init__(self, window, backend=None, robot_controller=None):
+        self.window = window
+        self.backend = backend or get_backend()
+        # The controller can be made before the window, see __main__
+        self.robot_controller = robot_controller or \
+            RobotController(self.backend, self.ID_TIMEOUT)
+        # In asyncio mode telemetry is polled by its own task
+        self.poll_telemetry = True
+        self.tx_timer = None
         self.init_gui()
+        # Game state lives in the engine, the UI only renders its events
+        self.game = GameEngine(self.backend.monotonic, self.GAME_TIMEOUT)
+        self.game.on_event = self.on_game_event
+        self.init_metrics()
+
+    # Tick duration histogram and the metrics export
+    def init_metrics(self):
+        metrics = self.robot_controller.metrics
+        self.tick_time = metrics.histogram('tick', 'Control loop tick duration')
+        self.metrics_socket = None
+        if METRICS_EXPORT == 'socket':
+            self.metrics_socket = MetricsSocket(
+                metrics, self.backend.data_path('metrics.sock'))
+        if METRICS_EXPORT:
+            self.window.after(self.METRICS_POLL, self.export_metrics)
+
+    # Write the metrics file or answer socket clients
+    def export_metrics(self):
+        if self.metrics_socket is not None:
+            self.metrics_socket.poll()
+            self.window.after(self.METRICS_POLL, self.export_metrics)
+        else:
+            self.robot_controller.metrics.write_textfile(
+                self.backend.data_path('moodbot.prom'))
+            self.window.after(self.METRICS_RATE, self.export_metrics)
 
     # Initialize the graphical user interface
     def init_gui(self):
-        self.rate = 1000
-        self.boot_time = time()
-        self.start_time = time()
-        self.timeout = True
-        self.cnt = 0
-        self.cnt_sts = False
+        self.rate = self.IDLE_RATE
+        # Labels are changed through the view model, see ViewModel.flush()
+        self.view = ViewModel(self.window, self.backend.label)
         # Create and configure timer label
-        self.timer = Label(
-            self.window,
+        self.timer = self.view.label(
+            'timer',
             text="00:00",
             font=("Arial", 160),
             foreground="white",
             relief="solid",
             background="black")
         # Create and configure message label
-        self.msg = Label(
-            self.window, text="Noskenējiet karti!",
+        self.msg = self.view.label(
+            'msg', text="Noskenējiet karti!",
             font=("Arial", 64),
             foreground="white",
             relief="solid",
             background="black")
-        self.msg.place(x=10, y=200)
+        self.view.place('msg', x=10, y=200)
         # Create and configure battery label
-        self.bat = Label(
-            self.window,
+        self.bat = self.view.label(
+            'bat',
             text="0%",
             font=("Arial", 48),
             foreground="white",
             relief="solid",
             background="black")
-        self.bat.place(x=610,)
-
-    # Show "Mission complete" message in LV
-    def mission_complete(self):
-        self.msg.config(text="  Misija pabeigta!")
-        self.window.after(3000, self.waiting_msg)
-
-    # Show "Scan your card" message in LV
-    def waiting_msg(self):
-        self.msg.config(text="Noskenējiet karti!")
-
-    # Start the countdown for the game
-    def start_countdown(self):
-        if not self.timeout:
-            return
-        self.msg.place_forget()
-        self.timer.place(x=85, y=120)
-        self.cnt = self.GAME_TIMEOUT
-        self.timeout = False
-        self.window.after(1000, self.countdown)
-
-    # Update the countdown timer
-    def countdown(self):
-        self.timer.config(
-            text=f'{int((self.cnt-(self.cnt%60))/60):02d}:{self.cnt%60:02d}')
-        self.cnt -= 1
-
-        if self.cnt < 0:
-            self.timeout = True
-            self.timer.place_forget()
-            self.msg.place(x=10, y=200)
-            self.mission_complete()
-        else:
-            self.window.after(1000, self.countdown)
-
-    # Update battery level label
+        self.view.place('bat', x=610)
+
+    # Render a game event and arm or disarm the robot
+    def on_game_event(self, event):
+        if event == CARD_ACCEPTED:
+            self.view.forget('msg')
+            self.view.place('timer', x=85, y=120)
+            self.robot_controller.armed = True
+        elif event == TICK:
+            shown = self.game.shown
+            self.view.set('timer', text=f'{shown // 60:02d}:{shown % 60:02d}')
+        elif event == TIMEOUT:
+            print("Disarm: Timeout!")
+            self.robot_controller.armed = False
+            self.view.forget('timer')
+            self.view.place('msg', x=10, y=200)
+        elif event == MISSION_COMPLETE:
+            # Show "Mission complete" message in LV
+            self.view.set('msg', text="  Misija pabeigta!")
+        elif event == READY:
+            # Show "Scan your card" message in LV
+            self.view.set('msg', text="Noskenējiet karti!")
+
+    # Read the battery level and update the label
     def handle_bat_lvl(self):
-        batlvl = self.robot_controller.get_bat_lvl()
+        self.robot_controller.get_bat_lvl()
+        self.show_bat_lvl(self.robot_controller.battery)
 
-        if batlvl is not None:
-            self.bat.config(text=f'{int((batlvl-723)/2.5)}%')
-
-        if batlvl < 801:
-            self.bat.config(foreground="red")
-        else:
-            self.bat.config(foreground="white")
+    # Update battery level label from the estimate, nothing to show until
+    # the robot has replied
+    def show_bat_lvl(self, battery):
+        if battery.percent is None:
+            return
+        self.view.set('bat', text=f'{battery.percent}%',
+                      foreground="red" if battery.low else "white")
 
     # Check RFID status and start the countdown if a valid ID is found
     def check_id_status(self):
         if self.robot_controller.rfid_reader.id is not None:
-            if not self.robot_controller.check_rfid():
-                if DEBUG:
-                    print(f'RFID: {self.robot_controller.rfid_reader.id}')
-                self.start_countdown()
-                self.rate = 50
-            else:
-                self.robot_controller.rfid_reader.id = None
-                self.mission_complete()
+            self.handle_rfid(self.robot_controller.check_rfid())
         else:
             if DEBUG:
                 print("Activate with Access Key!")
             self.robot_controller.send_stop()
-            self.handle_bat_lvl()
+            if self.poll_telemetry:
+                self.handle_bat_lvl()
+
+    # Start the game for a new card or reject an already used one
+    def handle_rfid(self, used):
+        card = self.robot_controller.rfid_reader.id
+        if DEBUG and not used:
+            print(f'RFID: {card}')
+        if used:
+            self.robot_controller.rfid_reader.id = None
+        self.game.card_scanned(card, used)
 
     # Run the communication with the robot and update battery level
     def run_rf_communication(self):
         try:
-            now = time()
             if DEBUG:
-                print(now-self.start_time)
+                print(self.game.remaining())
             self.robot_controller.rfid_reader.id = None
             self.robot_controller.send_data()
-            self.handle_bat_lvl()
-
-            if self.timeout:
-                print("Disarm: Timeout!")
-                self.robot_controller.send_stop()
+            if self.poll_telemetry:
                 self.handle_bat_lvl()
-                self.rate = 1000
         except Exception as err:
             if DEBUG:
                 print(err)
             else:
                 pass
 
-    # Check for ID timeout and clear used IDs if necessary
+    # Drop used IDs whose timeout has expired
     def check_id_timeout(self):
-        if time() - self.boot_time > self.ID_TIMEOUT:
-            self.robot_controller.used_ids = []
-            self.boot_time = time()
+        self.robot_controller.used_ids.purge()
 
-    # Main loop of the application
-    def run_loop(self):
-        self.robot_controller.validate_remote_id()
-        if self.timeout:
-            self.rate = 1000
+    # One control step: wait for a card or drive the robot
+    def step(self):
+        self.game.update()
+        if not self.game.running:
             self.check_id_status()
             self.check_id_timeout()
         else:
-            self.rate = 50
             self.run_rf_communication()
+        self.rate = self.GAME_RATE if self.game.running else self.IDLE_RATE
+
+    # Print the startup timing breakdown once the first step is done
+    def report_startup(self):
+        startup = self.robot_controller.startup
+        if not startup.reported:
+            startup.mark('first_step')
+            print(startup.report())
+
+    # Main loop of the application
+    def run_loop(self):
+        start = self.backend.monotonic()
+        self.robot_controller.sync_ids()
+        self.step()
         self.window.after(self.rate, self.run_loop)
+        self.tick_time.record(int((self.backend.monotonic() - start) * 1e6))
+        self.report_startup()
+
+    # TX task (asyncio mode)
+    def control_step(self):
+        start = self.backend.monotonic()
+        self.step()
+        self.tx_timer.set_period(self.rate / 1000)
+        self.tick_time.record(int((self.backend.monotonic() - start) * 1e6))
+        self.report_startup()
+
+        if DEBUG and self.tx_timer.ticks % 100 == 0:
+            print(self.tx_timer.stats())
+
+    # Telemetry RX task (asyncio mode)
+    def telemetry_step(self):
+        self.handle_bat_lvl()
+
+    # UI task (asyncio mode): let Tk process its events and redraw
+    async def ui_loop(self, timer):
+        from tkinter import TclError
+
+        while True:
+            await timer.wait()
+            try:
+                self.window.update()
+            except TclError:
+                # Window was closed
+                return
+
+    # Main loop of the application (asyncio mode), returns when the window
+    # is closed. TX runs on a deadline driven timer, see self.tx_timer.stats()
+    async def run_async(self):
+        import asyncio
+        from scheduler import FixedRateTimer, run_periodic
+
+        self.poll_telemetry = False
+        self.tx_timer = FixedRateTimer(self.rate / 1000)
+        tasks = [
+            asyncio.create_task(run_periodic(self.tx_timer, self.control_step)),
+            asyncio.create_task(run_periodic(
+                FixedRateTimer(self.RX_RATE / 1000), self.telemetry_step)),
+            asyncio.create_task(run_periodic(
+                FixedRateTimer(self.SYNC_RATE / 1000),
+                self.robot_controller.sync_ids)),
+            asyncio.create_task(self.ui_loop(FixedRateTimer(1 / self.UI_RATE))),
+        ]
+        try:
+            done, _ = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                task.result()
+        finally:
+            for task in tasks:
+                task.cancel()
 
     # Clean up resources when closing the application
     def close(self):
         self.robot_controller.joystick_reader.close()
         self.robot_controller.button_reader.close()
         self.robot_controller.rf_serial.close()
+        self.robot_controller.used_ids.close()
+        if self.robot_controller.recorder is not None:
+            self.robot_controller.recorder.close()
+        if self.metrics_socket is not None:
+            self.metrics_socket.close()
 
 
 if __name__ == '__main__':
+    STARTUP.mark('imports')
+    window = None
     try:
+        # The robot gets a stop frame while the other devices open
+        controller = RobotController(startup=STARTUP)
+        import tkinter as tk
+
         # creating window
         window = tk.Tk()
 
@@ -440,13 +792,21 @@ if __name__ == '__main__':
         window.title("Moodbot v0.5.0")
         window.geometry("800x480")
         window.configure(bg='black')
+        STARTUP.mark('window')
 
         # creating object
-        app = App(window)
-        window.after(app.rate, app.run_loop)
-        window.mainloop()
+        app = App(window, robot_controller=controller)
+        STARTUP.mark('app')
+        if ASYNC_LOOP:
+            import asyncio
+            asyncio.run(app.run_async())
+        else:
+            # First step right away, not one idle period later
+            window.after(0, app.run_loop)
+            window.mainloop()
     except KeyboardInterrupt:
         print("Cleaning up!")
-        window.destroy()
-        GPIO.cleanup()
+        if window is not None:
+            window.destroy()
+        get_backend().gpio().cleanup()
         exit()
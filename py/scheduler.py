@@ -0,0 +1,75 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import asyncio
+from time import monotonic
+from typing import Awaitable, Callable, Dict, Union
+
+
+# Deadline driven fixed-rate timer for asyncio tasks.
+# Deadlines advance by exactly one period, so time spent in the task body
+# does not add up to the period. Lateness of every wakeup is recorded as
+# jitter, a tick that starts more than one period late is an overrun and
+# re-anchors the schedule instead of bursting to catch up.
+class FixedRateTimer:
+    def __init__(self, period: float, clock: Callable[[], float] = monotonic) -> None:
+        self.period = period
+        self.clock = clock
+        self.deadline = None
+        self.reset_stats()
+
+    # Change the period, the next deadline is one new period after the last
+    def set_period(self, period: float) -> None:
+        self.period = period
+
+    # Sleep until the next deadline
+    async def wait(self) -> None:
+        now = self.clock()
+        if self.deadline is None:
+            self.deadline = now
+        else:
+            self.deadline += self.period
+
+        if now - self.deadline > self.period:
+            self.overruns += 1
+            self.deadline = now
+        elif self.deadline > now:
+            await asyncio.sleep(self.deadline - now)
+
+        late = max(0.0, self.clock() - self.deadline)
+        self.ticks += 1
+        self.jitter_sum += late
+        if late > self.jitter_max:
+            self.jitter_max = late
+
+    # Clear the jitter and overrun statistics
+    def reset_stats(self) -> None:
+        self.ticks = 0
+        self.overruns = 0
+        self.jitter_sum = 0.0
+        self.jitter_max = 0.0
+
+    # Jitter and overrun statistics since the last reset
+    def stats(self) -> Dict[str, Union[int, float]]:
+        return {
+            'period': self.period,
+            'ticks': self.ticks,
+            'overruns': self.overruns,
+            'jitter_avg': self.jitter_sum / self.ticks if self.ticks else 0.0,
+            'jitter_max': self.jitter_max,
+        }
+
+
+# Run `step` on every tick of `timer` until cancelled.
+# `step` may be a plain function or a coroutine function.
+async def run_periodic(timer: FixedRateTimer,
+                       step: Callable[[], Union[None, Awaitable[None]]]) -> None:
+    while True:
+        await timer.wait()
+        result = step()
+        if asyncio.iscoroutine(result):
+            await result
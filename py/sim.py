@@ -0,0 +1,891 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+#
+# In-process simulated devices. SimBackend plugs into hal.set_backend()
+# and runs the whole control unit headless in virtual time:
+#
+#   backend = SimBackend()
+#   backend.joystick(0, sine_trace(4.0))
+#   backend.tap(SimCard(b'\x01\x02\x03\x04'), at=2.0)
+#   app = run_headless(300, backend)
+
+import heapq
+import itertools
+import math
+import random
+import selectors
+from typing import Callable, Dict, List, Optional, Tuple, Union
+
+from crc8 import FRAME_LEN, FRAME_START, crc8
+from protocol import (FLAG_CRC_ERR, FLAG_FAILSAFE, HELLO_LEN, HELLO_START,
+                      V2_FRAME_LEN, V2_START, encode_reply, hello_frame)
+from hal import set_backend
+
+
+# ISO 14443-3 CRC_A, returned as an int (low byte goes first on the air)
+def crc_a(data) -> int:
+    crc = 0x6363
+    for b in data:
+        b ^= crc & 0xFF
+        b = (b ^ (b << 4)) & 0xFF
+        crc = (crc >> 8) ^ (b << 8) ^ (b << 3) ^ (b >> 4)
+    return crc & 0xFFFF
+
+
+# Virtual time event scheduler shared by all simulated devices
+class SimClock:
+    def __init__(self, start: float = 0.0) -> None:
+        self.now = start
+        self.queue = []
+        self.cancelled = set()
+        self.seq = itertools.count()
+
+    # Schedule `func(*args)` at virtual time `when`, returns a handle
+    def call_at(self, when: float, func, *args) -> int:
+        handle = next(self.seq)
+        heapq.heappush(self.queue, (when, handle, func, args))
+        return handle
+
+    # Schedule `func(*args)` after `delay` virtual seconds
+    def call_later(self, delay: float, func, *args) -> int:
+        return self.call_at(self.now + delay, func, *args)
+
+    # Cancel a scheduled call
+    def cancel(self, handle: int) -> None:
+        self.cancelled.add(handle)
+
+    # Run scheduled calls in time order, up to `until` if given
+    def run(self, until: Optional[float] = None) -> None:
+        queue = self.queue
+        while queue:
+            when, handle, func, args = queue[0]
+            if until is not None and when > until:
+                break
+            heapq.heappop(queue)
+            if handle in self.cancelled:
+                self.cancelled.discard(handle)
+                continue
+            if when > self.now:
+                self.now = when
+            func(*args)
+        if until is not None and until > self.now:
+            self.now = until
+
+
+# Joystick trace that holds each (time, value) point until the next one
+def step_trace(points: List[Tuple[float, float]]) -> Callable[[float], float]:
+    points = sorted(points)
+
+    def trace(t: float) -> float:
+        value = 0.5
+        for when, v in points:
+            if when > t:
+                break
+            value = v
+        return value
+    return trace
+
+
+# Joystick trace sweeping the axis around the centre
+def sine_trace(period: float, amplitude: float = 0.5,
+               phase: float = 0.0) -> Callable[[float], float]:
+    def trace(t: float) -> float:
+        value = 0.5 + amplitude * math.sin(2 * math.pi * t / period + phase)
+        return min(max(value, 0.0), 1.0)
+    return trace
+
+
+# Tk window replacement, after() runs in virtual time
+class SimWindow:
+    def __init__(self, clock: SimClock) -> None:
+        self.clock = clock
+
+    def after(self, ms: int, func, *args) -> int:
+        return self.clock.call_later(ms / 1000, func, *args)
+
+    def after_cancel(self, handle: int) -> None:
+        self.clock.cancel(handle)
+
+    def update(self) -> None:
+        self.clock.run(self.clock.now)
+
+    def title(self, *args) -> None:
+        pass
+
+    def geometry(self, *args) -> None:
+        pass
+
+    def configure(self, **kwargs) -> None:
+        pass
+
+    def destroy(self) -> None:
+        self.clock.queue.clear()
+
+
+# Tk label replacement, records its state and how often it was changed
+class SimLabel:
+    def __init__(self, window, **kwargs) -> None:
+        self.props = dict(kwargs)
+        self.placed = None
+        self.configs = 0
+        self.places = 0
+
+    def config(self, **kwargs) -> None:
+        self.props.update(kwargs)
+        self.configs += 1
+
+    configure = config
+
+    def cget(self, key: str):
+        return self.props[key]
+
+    def place(self, **kwargs) -> None:
+        self.placed = kwargs
+        self.places += 1
+
+    def place_forget(self) -> None:
+        self.placed = None
+        self.places += 1
+
+
+# gpiozero.Button replacement
+class SimButton:
+    def __init__(self, pin: int, clock: Optional[SimClock] = None,
+                 bounce_time: Optional[float] = None) -> None:
+        self.pin = pin
+        self.clock = clock
+        self.bounce_time = bounce_time
+        self.last_edge = None
+        self.bounces = 0        # Edges ignored by the debounce
+        self.is_pressed = False
+        self.when_pressed = None
+        self.when_released = None
+        self.closed = False
+
+    @property
+    def value(self) -> int:
+        return int(self.is_pressed)
+
+    def press(self) -> None:
+        if not self.is_pressed and not self.bouncing():
+            self.is_pressed = True
+            if self.when_pressed:
+                self.when_pressed()
+
+    def release(self) -> None:
+        if self.is_pressed and not self.bouncing():
+            self.is_pressed = False
+            if self.when_released:
+                self.when_released()
+
+    # Edge within bounce_time of the last accepted one
+    def bouncing(self) -> bool:
+        if self.bounce_time is None or self.clock is None:
+            return False
+        now = self.clock.now
+        if self.last_edge is not None and now - self.last_edge < self.bounce_time:
+            self.bounces += 1
+            return True
+        self.last_edge = now
+        return False
+
+    def close(self) -> None:
+        self.closed = True
+
+
+# gpiozero.MCP3004 channel replacement, follows a trace over virtual time
+class SimADC:
+    def __init__(self, channel: int, clock: SimClock,
+                 trace: Union[float, Callable[[float], float]] = 0.5) -> None:
+        self.channel = channel
+        self.clock = clock
+        self.trace = trace
+        self.reads = 0
+        self.closed = False
+
+    @property
+    def value(self) -> float:
+        self.reads += 1
+        if callable(self.trace):
+            return self.trace(self.clock.now)
+        return self.trace
+
+    @property
+    def raw_value(self) -> int:
+        return int(self.value * 1023 + 0.5)
+
+    def close(self) -> None:
+        self.closed = True
+
+
+# pyserial Serial replacement connected to a simulated device (or nothing)
+class SimSerial:
+    def __init__(self, port: str, device=None) -> None:
+        self.port = port
+        self.device = device
+        self.rx = bytearray()
+        self.is_open = True
+        self.writes = 0
+        self.tx_bytes = 0
+        if device is not None:
+            device.attach(self)
+
+    @property
+    def in_waiting(self) -> int:
+        return len(self.rx)
+
+    # Writes reach the device at once
+    @property
+    def out_waiting(self) -> int:
+        return 0
+
+    def read(self, size: int = 1) -> bytes:
+        data = bytes(self.rx[:size])
+        del self.rx[:size]
+        return data
+
+    def readline(self) -> bytes:
+        end = self.rx.find(b'\n')
+        return self.read(len(self.rx) if end < 0 else end + 1)
+
+    def write(self, data) -> int:
+        self.writes += 1
+        self.tx_bytes += len(data)
+        if self.device is not None:
+            self.device.receive(bytes(data))
+        return len(data)
+
+    # Bytes sent by the device towards the host
+    def inject(self, data: bytes) -> None:
+        self.rx += data
+
+    def reset_input_buffer(self) -> None:
+        self.rx.clear()
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+# Robot firmware model on the far end of the RF link
+class SimRobot:
+    FAILSAFE = 0.5      # Motors stop when no valid frame came for this long
+
+    def __init__(self, battery: int = 850, clock: Optional[SimClock] = None,
+                 version: int = 2) -> None:
+        self.clock = clock
+        self.version = version  # Protocol version of the firmware
+        self.hellos = 0
+        self.last_frame = None
+        self.failsafes = 0      # Times the failsafe stopped a moving robot
+        self.port = None
+        self.buf = bytearray()
+        self.resync = False     # CRC error seen and answered, see frame_parser.c
+        self.battery = battery
+        self.sag = 0.0          # ADC counts lost per PWM step of wheel speed
+        self.drain = 0.0        # ADC counts per second used at full speed
+        self.noise = 0.0        # Standard deviation of the ADC noise
+        self.rng = random.Random(0)
+        self.drained_at = None
+        self.spd_l = 0
+        self.spd_r = 0
+        self.ctrl = 0x01
+        self.frames_ok = 0
+        self.frames_err = 0
+
+    def attach(self, port: SimSerial) -> None:
+        self.port = port
+        port.inject(b'MOODBOT v0.5.0\r\n')
+        if self.version >= 2:
+            port.inject(hello_frame(self.version))
+
+    def receive(self, data: bytes) -> None:
+        buf = self.buf
+        buf += data
+        v2 = self.version >= 2
+        while buf:
+            start = buf[0]
+            if start == FRAME_START:
+                length = FRAME_LEN
+            elif v2 and start == V2_START:
+                length = V2_FRAME_LEN
+            elif v2 and start == HELLO_START:
+                length = HELLO_LEN
+            else:
+                del buf[0]
+                continue
+            if len(buf) < length:
+                break
+            frame = bytes(buf[:length])
+            if crc8(frame[1:-1]) != frame[-1]:
+                # Rescan from the byte after the start, answer only the
+                # first bad frame until one parses again
+                del buf[0]
+                self.frames_err += 1
+                if not self.resync:
+                    self.resync = True
+                    if start != HELLO_START:
+                        self.reply(frame, False)
+                continue
+            del buf[:length]
+            self.resync = False
+            if start == HELLO_START:
+                self.hellos += 1
+                self.port.inject(hello_frame(self.version))
+            else:
+                self.execute(frame)
+
+    # Apply a v1 or v2 frame with a valid CRC
+    def execute(self, frame: bytes) -> None:
+        tripped = self.check_failsafe()
+        # The firmware reads the battery before applying the frame
+        self.reply(frame, True, tripped)
+        self.spd_l, self.spd_r, self.ctrl = frame[-4:-1]
+        self.frames_ok += 1
+        if self.clock is not None:
+            self.last_frame = self.clock.now
+
+    # Reply to a frame in its protocol version
+    def reply(self, frame: bytes, ok: bool, tripped: bool = False) -> None:
+        battery = self.reading()
+        if frame[0] == V2_START:
+            flags = (0 if ok else FLAG_CRC_ERR) | (FLAG_FAILSAFE if tripped else 0)
+            self.port.inject(encode_reply(frame[1], battery, flags))
+        else:
+            self.port.inject(f'{battery}:{"OK" if ok else "ERR"}\r\n'.encode())
+
+    # Battery ADC value under the current motor load
+    def reading(self) -> int:
+        load = (self.spd_l + self.spd_r) / 2
+        if self.clock is not None:
+            now = self.clock.now
+            if self.drained_at is not None:
+                self.battery -= self.drain * load / 127 * (now - self.drained_at)
+            self.drained_at = now
+        value = self.battery - self.sag * load
+        if self.noise:
+            value += self.rng.gauss(0, self.noise)
+        return int(value)
+
+    # Apply the firmware failsafe if the deadline passed since the last
+    # valid frame, returns True if it stopped a moving robot
+    def check_failsafe(self) -> bool:
+        if self.last_frame is None or \
+                self.clock.now - self.last_frame <= self.FAILSAFE:
+            return False
+        tripped = bool(self.spd_l or self.spd_r or self.ctrl & 0x14)
+        if tripped:
+            self.failsafes += 1
+        self.spd_l = self.spd_r = 0
+        self.ctrl = 0x01
+        self.last_frame = None
+        return tripped
+
+
+# RPi.GPIO module replacement
+class SimGPIO:
+    BOARD = 10
+    BCM = 11
+    OUT = 0
+    IN = 1
+    LOW = 0
+    HIGH = 1
+    PUD_DOWN = 21
+    PUD_UP = 22
+    RISING = 31
+    FALLING = 32
+    BOTH = 33
+
+    def __init__(self) -> None:
+        self.mode = None
+        self.pins = {}
+        self.events = {}
+
+    def getmode(self):
+        return self.mode
+
+    def setmode(self, mode) -> None:
+        self.mode = mode
+
+    def setup(self, pin: int, direction: int, pull_up_down=None, initial=None) -> None:
+        self.pins[pin] = 1 if pull_up_down == self.PUD_UP else (initial or 0)
+
+    def output(self, pin: int, value) -> None:
+        self.pins[pin] = int(bool(value))
+
+    def input(self, pin: int) -> int:
+        return self.pins.get(pin, 0)
+
+    def add_event_detect(self, pin: int, edge: int, callback=None,
+                         bouncetime=None) -> None:
+        self.events[pin] = (edge, callback)
+
+    def remove_event_detect(self, pin: int) -> None:
+        self.events.pop(pin, None)
+
+    def cleanup(self, *args) -> None:
+        self.pins.clear()
+        self.events.clear()
+
+    # Drive an input pin from a simulated device, fires edge callbacks
+    def set_input(self, pin: int, value) -> None:
+        value = int(bool(value))
+        if self.pins.get(pin, 0) == value:
+            return
+        self.pins[pin] = value
+        edge, callback = self.events.get(pin, (None, None))
+        if callback is not None and (edge == self.BOTH or
+                                     (edge == self.RISING) == bool(value)):
+            callback(pin)
+
+
+# MIFARE Classic 1K card
+class SimCard:
+    IDLE = 0
+    READY = 1
+    ACTIVE = 2
+    HALT = 3
+
+    def __init__(self, uid: bytes, text: str = '',
+                 key: bytes = b'\xff' * 6) -> None:
+        self.uid = bytes(uid[:4])
+        self.bcc = self.uid[0] ^ self.uid[1] ^ self.uid[2] ^ self.uid[3]
+        self.blocks = bytearray(1024)
+        self.blocks[0:5] = self.uid + bytes((self.bcc,))
+        for sector in range(16):
+            trailer = (sector * 4 + 3) * 16
+            self.blocks[trailer:trailer + 16] = key + b'\xff\x07\x80\x69' + key
+        data = text.encode('latin-1')[:48].ljust(48)
+        self.blocks[8 * 16:11 * 16] = data
+        self.state = self.IDLE
+
+    def block(self, addr: int) -> bytes:
+        data = bytes(self.blocks[addr * 16:addr * 16 + 16])
+        if addr % 4 == 3:
+            # Key A always reads as zeros
+            data = bytes(6) + data[6:]
+        return data
+
+    def key(self, block: int, key_b: bool) -> bytes:
+        trailer = (block // 4 * 4 + 3) * 16
+        return bytes(self.blocks[trailer + 10:trailer + 16] if key_b
+                     else self.blocks[trailer:trailer + 6])
+
+
+# Register-level MFRC522 model behind a SimSPI device
+class SimMFRC522:
+    CommandReg = 0x01
+    CommIEnReg = 0x02
+    DivlEnReg = 0x03
+    CommIrqReg = 0x04
+    DivIrqReg = 0x05
+    ErrorReg = 0x06
+    Status1Reg = 0x07
+    Status2Reg = 0x08
+    FIFODataReg = 0x09
+    FIFOLevelReg = 0x0A
+    ControlReg = 0x0C
+    BitFramingReg = 0x0D
+    TxControlReg = 0x14
+    CRCResultRegM = 0x21
+    CRCResultRegL = 0x22
+    VersionReg = 0x37
+
+    PCD_IDLE = 0x00
+    PCD_CALCCRC = 0x03
+    PCD_TRANSCEIVE = 0x0C
+    PCD_AUTHENT = 0x0E
+    PCD_RESETPHASE = 0x0F
+
+    READ_ONLY = (ErrorReg, Status1Reg, CRCResultRegM, CRCResultRegL, VersionReg)
+
+    def __init__(self, clock: SimClock) -> None:
+        self.clock = clock
+        self.regs = bytearray(64)
+        self.fifo = bytearray()
+        self.card = None
+        self.auth_sector = None
+        self.pending_write = None
+        self.commands = 0
+        self.irq_output = None  # Called with the IRQ pin level on changes
+        self.reset()
+
+    # Power-on register values
+    def reset(self) -> None:
+        self.regs[:] = bytes(64)
+        self.regs[self.CommandReg] = 0x20
+        self.regs[self.CommIEnReg] = 0x80
+        self.regs[self.CommIrqReg] = 0x14
+        self.regs[self.ControlReg] = 0x10
+        self.regs[self.TxControlReg] = 0x80
+        self.regs[self.VersionReg] = 0x92
+        self.fifo.clear()
+        self.auth_sector = None
+
+    # Put `card` on the reader at virtual time `at` for `duration` seconds
+    def tap(self, card: SimCard, at: float, duration: float = 0.5) -> None:
+        self.clock.call_at(at, self.insert, card)
+        self.clock.call_at(at + duration, self.remove, card)
+
+    def insert(self, card: SimCard) -> None:
+        card.state = SimCard.IDLE
+        self.card = card
+
+    def remove(self, card: SimCard) -> None:
+        if self.card is card:
+            self.card = None
+            self.auth_sector = None
+            self.regs[self.Status2Reg] &= ~0x08 & 0xFF
+
+    # One SPI transfer: a write burst to one address, or a read of the
+    # address sequence (each result is shifted out one byte later)
+    def transfer(self, data) -> List[int]:
+        out = [0] * len(data)
+        if data[0] & 0x80:
+            for i in range(1, len(data)):
+                out[i] = self.read((data[i - 1] >> 1) & 0x3F)
+        else:
+            reg = (data[0] >> 1) & 0x3F
+            for value in data[1:]:
+                self.write(reg, value)
+            self.update_irq()
+        return out
+
+    # IRQ pin: enabled pending interrupts, inverted when IRqInv is set
+    def update_irq(self) -> None:
+        if self.irq_output is None:
+            return
+        regs = self.regs
+        pending = bool(regs[self.CommIrqReg] & regs[self.CommIEnReg] & 0x7F or
+                       regs[self.DivIrqReg] & regs[self.DivlEnReg] & 0x14)
+        if regs[self.CommIEnReg] & 0x80:
+            pending = not pending
+        self.irq_output(int(pending))
+
+    def read(self, reg: int) -> int:
+        if reg == self.FIFODataReg:
+            if not self.fifo:
+                return 0
+            value = self.fifo[0]
+            del self.fifo[0]
+            return value
+        if reg == self.FIFOLevelReg:
+            return len(self.fifo) & 0x7F
+        return self.regs[reg]
+
+    def write(self, reg: int, value: int) -> None:
+        regs = self.regs
+        if reg == self.FIFODataReg:
+            if len(self.fifo) < 64:
+                self.fifo.append(value)
+        elif reg == self.FIFOLevelReg:
+            if value & 0x80:
+                self.fifo.clear()
+        elif reg in (self.CommIrqReg, self.DivIrqReg):
+            # Bit 7 selects whether the marked bits are set or cleared
+            if value & 0x80:
+                regs[reg] |= value & 0x7F
+            else:
+                regs[reg] &= ~value & 0x7F
+        elif reg == self.CommandReg:
+            regs[reg] = (regs[reg] & 0xF0) | (value & 0x0F)
+            self.execute(value & 0x0F)
+        elif reg == self.BitFramingReg:
+            regs[reg] = value
+            if value & 0x80 and regs[self.CommandReg] & 0x0F == self.PCD_TRANSCEIVE:
+                self.transceive()
+        elif reg == self.Status2Reg:
+            regs[reg] = value
+            if not value & 0x08:
+                self.auth_sector = None
+        elif reg not in self.READ_ONLY:
+            regs[reg] = value
+
+    def execute(self, command: int) -> None:
+        self.commands += 1
+        regs = self.regs
+        if command == self.PCD_RESETPHASE:
+            self.reset()
+        elif command == self.PCD_CALCCRC:
+            crc = crc_a(self.fifo)
+            self.fifo.clear()
+            regs[self.CRCResultRegL] = crc & 0xFF
+            regs[self.CRCResultRegM] = crc >> 8
+            regs[self.DivIrqReg] |= 0x04
+        elif command == self.PCD_AUTHENT:
+            self.authenticate(bytes(self.fifo))
+            self.fifo.clear()
+
+    def authenticate(self, data: bytes) -> None:
+        regs = self.regs
+        card = self.card
+        regs[self.ErrorReg] = 0
+        regs[self.CommandReg] &= 0xF0
+        if card is None or card.state != SimCard.ACTIVE:
+            # Nobody answers, only the timer expires
+            regs[self.CommIrqReg] |= 0x01
+            return
+
+        block = data[1]
+        if len(data) == 12 and data[8:12] == card.uid and \
+                data[2:8] == card.key(block, data[0] == 0x61):
+            self.auth_sector = block // 4
+            regs[self.Status2Reg] |= 0x08
+        else:
+            card.state = SimCard.IDLE
+            regs[self.ErrorReg] = 0x01
+        regs[self.CommIrqReg] |= 0x10
+
+    def transceive(self) -> None:
+        regs = self.regs
+        tx = bytes(self.fifo)
+        self.fifo.clear()
+        regs[self.ErrorReg] = 0
+        response = self.picc(tx, regs[self.BitFramingReg] & 0x07)
+        if response is None:
+            regs[self.CommIrqReg] |= 0x41
+        else:
+            data, last_bits = response
+            self.fifo += data
+            regs[self.ControlReg] = (regs[self.ControlReg] & 0xF8) | last_bits
+            regs[self.CommIrqReg] |= 0x70
+
+    # Card side of one exchange, returns (data, last_bits) or None
+    def picc(self, tx: bytes, tx_bits: int) -> Optional[Tuple[bytes, int]]:
+        card = self.card
+        if card is None or not tx:
+            return None
+
+        if tx_bits == 7 and len(tx) == 1:
+            # REQA / WUPA
+            if (tx[0] == 0x26 and card.state == SimCard.IDLE) or \
+                    (tx[0] == 0x52 and card.state in (SimCard.IDLE, SimCard.HALT)):
+                card.state = SimCard.READY
+                return b'\x04\x00', 0
+            return None
+
+        if card.state == SimCard.HALT or card.state == SimCard.IDLE:
+            return None
+
+        if len(tx) > 2 and crc_a(tx) != 0:
+            # A valid frame including its CRC_A leaves a zero residue
+            return b'\x04', 4
+
+        if tx == b'\x93\x20':
+            return card.uid + bytes((card.bcc,)), 0
+        if len(tx) == 9 and tx[0] == 0x93 and tx[1] == 0x70:
+            if tx[2:6] != card.uid:
+                return None
+            card.state = SimCard.ACTIVE
+            sak = b'\x08'
+            crc = crc_a(sak)
+            return sak + bytes((crc & 0xFF, crc >> 8)), 0
+
+        if card.state != SimCard.ACTIVE:
+            return None
+
+        if self.pending_write is not None and len(tx) == 18:
+            block = self.pending_write
+            self.pending_write = None
+            card.blocks[block * 16:block * 16 + 16] = tx[:16]
+            return b'\x0A', 4
+
+        cmd = tx[0]
+        if cmd == 0x50:
+            card.state = SimCard.HALT
+            self.auth_sector = None
+            self.regs[self.Status2Reg] &= ~0x08 & 0xFF
+            return None
+        if cmd in (0x30, 0xA0) and len(tx) == 4:
+            block = tx[1]
+            if self.auth_sector != block // 4:
+                return b'\x04', 4
+            if cmd == 0xA0:
+                self.pending_write = block
+                return b'\x0A', 4
+            data = card.block(block)
+            crc = crc_a(data)
+            return data + bytes((crc & 0xFF, crc >> 8)), 0
+        return None
+
+
+# spidev.SpiDev replacement connected to a chip model
+class SimSPI:
+    def __init__(self, chip: SimMFRC522) -> None:
+        self.chip = chip
+        self.max_speed_hz = 0
+        self.is_open = False
+        self.transfers = 0
+        self.bytes = 0
+
+    def open(self, bus: int, device: int) -> None:
+        self.is_open = True
+
+    def xfer2(self, data) -> List[int]:
+        self.transfers += 1
+        self.bytes += len(data)
+        return self.chip.transfer(data)
+
+    def close(self) -> None:
+        self.is_open = False
+
+
+# selectors.DefaultSelector replacement for SimSerial ports, select()
+# lets virtual time pass until a port has data or the timeout is over
+class SimSelector:
+    def __init__(self, clock: SimClock) -> None:
+        self.clock = clock
+        self.keys: Dict[int, selectors.SelectorKey] = {}
+
+    def register(self, fileobj, events: int, data=None) -> selectors.SelectorKey:
+        key = selectors.SelectorKey(fileobj, id(fileobj), events, data)
+        self.keys[id(fileobj)] = key
+        return key
+
+    def unregister(self, fileobj) -> selectors.SelectorKey:
+        return self.keys.pop(id(fileobj))
+
+    def ready(self) -> List[Tuple[selectors.SelectorKey, int]]:
+        return [(key, selectors.EVENT_READ) for key in self.keys.values()
+                if key.fileobj.in_waiting]
+
+    def select(self, timeout: Optional[float] = None):
+        ready = self.ready()
+        if ready or not timeout or timeout < 0:
+            return ready
+        self.clock.run(until=self.clock.now + timeout)
+        return self.ready()
+
+    def close(self) -> None:
+        self.keys.clear()
+
+
+# Device backend running everything in-process in virtual time
+class SimBackend:
+    POLL_INTERVAL = 0.01    # Minimum virtual time between poller calls
+
+    def __init__(self, clock: Optional[SimClock] = None,
+                 rfid_irq_pin: Optional[int] = None) -> None:
+        self.clock = clock or SimClock()
+        self.gpio_module = SimGPIO()
+        self.rfid = SimMFRC522(self.clock)
+        if rfid_irq_pin is not None:
+            # Wire the reader's IRQ output to a GPIO input
+            self.rfid.irq_output = lambda level: self.gpio_module.set_input(
+                rfid_irq_pin, level)
+        self.traces = {}
+        self.buttons: Dict[int, SimButton] = {}
+        self.adcs: Dict[Union[int, tuple], SimADC] = {}
+        self.serials: Dict[str, SimSerial] = {}
+        self.robots: Dict[str, SimRobot] = {}
+        self.spis: List[SimSPI] = []
+        self.labels: List[SimLabel] = []
+        self.robot_version = 2      # Firmware protocol version of new robots
+
+    def button(self, pin: int,
+               bounce_time: Optional[float] = None) -> SimButton:
+        button = self.buttons[pin] = SimButton(pin, self.clock, bounce_time)
+        return button
+
+    # Simulated devices need no pin factory
+    def pin_factory(self) -> None:
+        return None
+
+    # Channels of the first ADC are keyed by number, channels of others
+    # by (port, device, channel), see joystick()
+    def adc(self, channel: int, port: int = 0, device: int = 0) -> SimADC:
+        key = channel if (port, device) == (0, 0) else (port, device, channel)
+        adc = SimADC(channel, self.clock, self.traces.get(key, 0.5))
+        self.adcs[key] = adc
+        return adc
+
+    # USB serial ports get a robot on the far end, other ports stay silent
+    def serial(self, port: str, baudrate: int, timeout: float) -> SimSerial:
+        device = None
+        if port.startswith('/dev/ttyUSB'):
+            device = self.robots[port] = SimRobot(
+                clock=self.clock, version=self.robot_version)
+        ser = self.serials[port] = SimSerial(port, device)
+        return ser
+
+    def spi(self) -> SimSPI:
+        spi = SimSPI(self.rfid)
+        self.spis.append(spi)
+        return spi
+
+    def gpio(self) -> SimGPIO:
+        return self.gpio_module
+
+    def label(self, window, **kwargs) -> SimLabel:
+        label = SimLabel(window, **kwargs)
+        self.labels.append(label)
+        return label
+
+    # Nothing is persisted between simulations
+    def data_path(self, name: str) -> str:
+        return ':memory:'
+
+    def time(self) -> float:
+        return self.clock.now
+
+    def monotonic(self) -> float:
+        return self.clock.now
+
+    def selector(self) -> SimSelector:
+        return SimSelector(self.clock)
+
+    def start_poller(self, step) -> None:
+        def run():
+            self.clock.call_later(max(step(), self.POLL_INTERVAL), run)
+        self.clock.call_later(0, run)
+
+    def window(self) -> SimWindow:
+        return SimWindow(self.clock)
+
+    # Scripting: joystick trace for an ADC channel, or (port, device,
+    # channel) of an ADC other than the first
+    def joystick(self, channel: Union[int, tuple],
+                 trace: Union[float, Callable[[float], float]]) -> None:
+        self.traces[channel] = trace
+        if channel in self.adcs:
+            self.adcs[channel].trace = trace
+
+    # Scripting: hold button `pin` at virtual time `at` for `duration`
+    def press(self, pin: int, at: float, duration: float = 0.2) -> None:
+        self.clock.call_at(at, lambda: self.buttons[pin].press())
+        self.clock.call_at(at + duration, lambda: self.buttons[pin].release())
+
+    # Scripting: put a card on the reader
+    def tap(self, card: SimCard, at: float, duration: float = 0.5) -> None:
+        self.rfid.tap(card, at, duration)
+
+
+# A couple of games: joystick sweeps, digger buttons, one card reused
+def default_scenario() -> SimBackend:
+    backend = SimBackend()
+    backend.joystick(0, sine_trace(3.0))
+    backend.joystick(1, sine_trace(5.0, phase=1.0))
+    card = SimCard(b'\xde\xad\xbe\xef', 'MoodBot')
+    backend.tap(card, at=2.0)
+    backend.tap(card, at=130.0)
+    backend.tap(SimCard(b'\x01\x02\x03\x04'), at=140.0)
+    for at in range(10, 260, 7):
+        backend.press(24 if at % 2 else 27, at)
+    return backend
+
+
+# Drive the whole App loop headless for `seconds` of virtual time
+def run_headless(seconds: float, backend: Optional[SimBackend] = None):
+    from rpi_cu import App
+
+    backend = backend or default_scenario()
+    set_backend(backend)
+    window = backend.window()
+    app = App(window, backend)
+    window.after(app.rate, app.run_loop)
+    backend.clock.run(until=seconds)
+    return app
+
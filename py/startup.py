@@ -0,0 +1,68 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import os
+from time import perf_counter
+from typing import Callable, Dict, List, Optional, Tuple
+
+
+# Seconds since this process started (Linux), 0 if not known
+def process_age() -> float:
+    try:
+        with open('/proc/self/stat') as f:
+            # Fields after the command name, starttime is field 22
+            start = int(f.read().rsplit(')', 1)[1].split()[19])
+        with open('/proc/uptime') as f:
+            uptime = float(f.read().split()[0])
+    except (OSError, ValueError, IndexError):
+        return 0.0
+    return max(uptime - start / os.sysconf('SC_CLK_TCK'), 0.0)
+
+
+# Startup timing breakdown. Stages run one after another and are timed
+# from process start, the interpreter's own start up is the first stage.
+# Tasks run in parallel within a stage and are timed on their own.
+class StartupTimer:
+    def __init__(self) -> None:
+        now = perf_counter()
+        self.origin = now - process_age()
+        self.marks: List[Tuple[str, float]] = [('python', now - self.origin)]
+        self.tasks: Dict[str, float] = {}
+        self.reported = False
+
+    # Stage `name` just ended
+    def mark(self, name: str) -> None:
+        self.marks.append((name, perf_counter() - self.origin))
+
+    # Seconds from process start to the end of stage `name`
+    def at(self, name: str) -> Optional[float]:
+        for stage, t in self.marks:
+            if stage == name:
+                return t
+        return None
+
+    # Run `func` as task `name`, from any thread
+    def timed(self, name: str, func: Callable):
+        start = perf_counter()
+        try:
+            return func()
+        finally:
+            self.tasks[name] = perf_counter() - start
+
+    # One line: stage durations, parallel tasks in brackets
+    def report(self) -> str:
+        self.reported = True
+        parts = []
+        last = 0.0
+        for name, t in self.marks:
+            parts.append(f'{name} {t - last:.3f}')
+            last = t
+        line = f'startup {last:.3f} s: ' + ', '.join(parts)
+        if self.tasks:
+            line += ' [' + ', '.join(f'{name} {t:.3f}' for name, t in
+                                     sorted(self.tasks.items())) + ']'
+        return line
@@ -0,0 +1,146 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import re
+from time import monotonic
+
+from crc8 import crc8
+from protocol import (FLAG_CRC_ERR, FLAG_FAILSAFE, HELLO_LEN, HELLO_START,
+                      REPLY_LEN, REPLY_START)
+
+_NON_ASCII = re.compile(rb'[\x80-\xff]')
+
+
+# Incremental parser for the robot telemetry: v1 lines ("<ADC>:OK" /
+# "<ADC>:ERR"), v2 binary replies and hellos (see protocol.py).
+# Drains whatever the port has buffered without blocking, splits replies out
+# of one reusable buffer and keeps only the latest reading plus counters.
+class TelemetryParser:
+    MAX_LINE = 64       # Longest line we accept before dropping the buffer
+
+    def __init__(self) -> None:
+        self.buf = bytearray()
+        self.bat = None         # Latest battery ADC value
+        self.updated = None     # monotonic() time of the latest reading
+        self.ok = 0             # Frames the robot accepted
+        self.err = 0            # Frames the robot rejected (CRC error)
+        self.bad = 0            # Lines we could not parse
+        self.seq = None         # Sequence number of the latest v2 reply
+        self.lost = 0           # v2 frames that got no reply (SEQ gaps)
+        self.rejected = 0       # Rejected replies since the latest OK one
+        self.failsafes = 0      # v2 replies with the failsafe flag
+        self.version = None     # Protocol version from the robot's hello
+        self.on_reply = None    # Called with (ok, seq) for every reply
+        self.on_hello = None    # Called with the robot's protocol version
+
+    # Read everything the port has buffered, never blocks
+    def poll(self, port) -> int:
+        waiting = port.in_waiting
+        if not waiting:
+            return 0
+        return self.feed(port.read(waiting))
+
+    # Feed raw bytes, returns the number of complete replies parsed
+    def feed(self, data: bytes) -> int:
+        buf = self.buf
+        buf += data
+        size = len(buf)
+        start = 0
+        lines = 0
+        while start < size:
+            first = buf[start]
+            if first == REPLY_START or first == HELLO_START:
+                length = REPLY_LEN if first == REPLY_START else HELLO_LEN
+                if size - start < length:
+                    break
+                frame = bytes(buf[start:start + length])
+                if crc8(frame[1:-1]) != frame[-1]:
+                    # Not a frame after all, resync on the next byte
+                    self.bad += 1
+                    start += 1
+                    continue
+                if first == REPLY_START:
+                    self.parse_reply(frame)
+                else:
+                    self.parse_hello(frame)
+                start += length
+                lines += 1
+                continue
+
+            end = buf.find(b'\n', start)
+            # v1 lines are ASCII, a byte above 0x7F before the line end is
+            # junk or the start of a binary reply
+            junk = _NON_ASCII.search(buf, start, size if end < 0 else end)
+            if junk is not None:
+                self.bad += 1
+                start = junk.start()
+                if buf[start] != REPLY_START and buf[start] != HELLO_START:
+                    start += 1
+                continue
+            if end < 0:
+                break
+            self.parse_line(bytes(buf[start:end]))
+            start = end + 1
+            lines += 1
+
+        if start:
+            del buf[:start]
+        if len(buf) > self.MAX_LINE:
+            # No line end in sight, resync on the next one
+            buf.clear()
+            self.bad += 1
+        return lines
+
+    # Parse a single line without its line end
+    def parse_line(self, line: bytes) -> None:
+        value, _, status = line.strip().partition(b':')
+        try:
+            bat = int(value)
+        except ValueError:
+            self.bad += 1
+            return
+
+        if status == b'OK':
+            self.ok += 1
+        elif status == b'ERR':
+            self.err += 1
+        else:
+            self.bad += 1
+            return
+        self.bat = bat
+        self.updated = monotonic()
+        if self.on_reply is not None:
+            self.on_reply(status == b'OK', None)
+
+    # Parse a v2 reply with a valid CRC
+    def parse_reply(self, frame: bytes) -> None:
+        seq, flags = frame[1], frame[4]
+        ok = not flags & FLAG_CRC_ERR
+        if ok:
+            self.ok += 1
+            if self.seq is not None:
+                # Rejected frames in the gap were answered, not lost
+                gap = (seq - self.seq - 1) & 0xFF
+                self.lost += max(gap - self.rejected, 0)
+            self.seq = seq
+            self.rejected = 0
+        else:
+            # The SEQ of a rejected frame cannot be trusted
+            self.err += 1
+            self.rejected += 1
+        if flags & FLAG_FAILSAFE:
+            self.failsafes += 1
+        self.bat = frame[2] | frame[3] << 8
+        self.updated = monotonic()
+        if self.on_reply is not None:
+            self.on_reply(ok, seq if ok else None)
+
+    # Parse a hello with a valid CRC
+    def parse_hello(self, frame: bytes) -> None:
+        self.version = frame[1]
+        if self.on_hello is not None:
+            self.on_hello(self.version)
@@ -0,0 +1,96 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import sys
+import threading
+
+from recorder import read_records
+from rpi_cu import RobotController
+from sim import SimBackend, set_backend
+
+
+def controller():
+    backend = SimBackend()
+    set_backend(backend)
+    return backend, RobotController(backend, keepalive=0)
+
+
+# Button edges send from their callback thread while the control loop
+# parses the replies
+def test_button_thread_and_replies():
+    backend, robot = controller()
+    robot.armed = True
+    errors = []
+
+    def press():
+        try:
+            for i in range(3000):
+                robot.on_buttons(i & 1)
+        except Exception as err:
+            errors.append(err)
+
+    thread = threading.Thread(target=press)
+    interval = sys.getswitchinterval()
+    # Switch threads often, so sends land in the middle of reply parsing
+    sys.setswitchinterval(1e-6)
+    try:
+        thread.start()
+        while thread.is_alive():
+            robot.get_bat_lvl()
+        thread.join()
+    finally:
+        sys.setswitchinterval(interval)
+    robot.get_bat_lvl()
+    assert not errors
+    assert robot.telemetry.ok == robot.tx.sent
+    assert not robot.latency.pending
+    # Frames dropped from a full pending queue get their replies unmatched
+    counters = robot.metrics.counters
+    assert counters.get('ack_lost', 0) == counters.get('unmatched_replies', 0)
+    records = list(read_records(robot.recorder))
+    assert len(records) == robot.recorder.count
+
+
+# Replies are matched to sent frames under the lock the senders take
+def test_replies_parsed_under_tx_lock():
+    backend, robot = controller()
+    held = []
+    ack = robot.latency.ack
+
+    def checked_ack(ok, seq=None):
+        held.append(robot.tx_lock.locked())
+        ack(ok, seq)
+
+    robot.latency.ack = checked_ack
+    for _ in range(3):
+        robot.send_stop()
+        robot.get_bat_lvl()
+    assert held and all(held)
+
+
+# A reply's battery reading was taken under the load of the frame sent
+# before the one it answers
+def test_battery_sag_of_previous_frame():
+    backend, robot = controller()
+    loads = []
+    update = robot.battery.update
+
+    def recorded_update(raw, pwm=0):
+        loads.append(pwm)
+        update(raw, pwm)
+
+    robot.battery.update = recorded_update
+    robot.get_bat_lvl()
+    robot.armed = True
+    backend.joystick(1, 0.0)
+    for _ in range(3):
+        robot.send_data()
+        robot.get_bat_lvl()
+    driven = robot.tx.last
+    assert driven[1] and driven[2]
+    assert loads[-3:] == [0, (driven[1] + driven[2]) / 2,
+                          (driven[1] + driven[2]) / 2]
@@ -0,0 +1,69 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import pytest
+
+from fleet import BUTTON_BITS, Fleet, parse_buttons, parse_joystick
+from sim import SimBackend, SimWindow, set_backend
+
+PORTS = ['/dev/ttyUSB0', '/dev/ttyUSB1', '/dev/ttyUSB2']
+
+
+def sim() -> SimBackend:
+    backend = SimBackend()
+    set_backend(backend)
+    return backend
+
+
+def test_default_wiring_covers_two_robots():
+    backend = sim()
+    fleet = Fleet(PORTS[:2], backend)
+    assert sorted(backend.adcs) == [0, 1, 2, 3]
+    assert len(backend.buttons) == 10
+    fleet.close()
+    with pytest.raises(ValueError, match='no joystick for robot 3'):
+        Fleet(PORTS, sim())
+
+
+def test_wiring_is_checked():
+    joysticks = Fleet.JOYSTICKS + (((0, 0), (4, 5)),)
+    buttons = Fleet.BUTTONS + ((),)
+    with pytest.raises(ValueError, match='no channel 4'):
+        Fleet(PORTS, sim(), joysticks=joysticks, buttons=buttons)
+    joysticks = Fleet.JOYSTICKS + (((0, 0), (3, 0)),)
+    with pytest.raises(ValueError, match='channel 3 on SPI 0.0 used twice'):
+        Fleet(PORTS, sim(), joysticks=joysticks, buttons=buttons)
+    joysticks = Fleet.JOYSTICKS + (((1, 0), (0, 1)),)
+    buttons = Fleet.BUTTONS + (((BUTTON_BITS[0], 26),),)
+    with pytest.raises(ValueError, match='pin 26 used twice'):
+        Fleet(PORTS, sim(), joysticks=joysticks, buttons=buttons)
+
+
+def test_third_robot_on_second_adc():
+    backend = sim()
+    backend.joystick((1, 0, 1), 1.0)
+    fleet = Fleet(PORTS, backend,
+                  joysticks=Fleet.JOYSTICKS + (parse_joystick('1.0:0,1'),),
+                  buttons=Fleet.BUTTONS + (parse_buttons(''),))
+    fleet.start(2)
+    fleet.run(until=backend.clock.now + 1)
+    assert backend.robots[PORTS[2]].spd_l > 0
+    assert backend.robots[PORTS[0]].spd_l == 0
+    fleet.close()
+
+
+def test_window_shows_every_robot():
+    backend = sim()
+    window = SimWindow(backend.clock)
+    fleet = Fleet(PORTS[:2], backend, game_time=60, window=window)
+    fleet.start(1)
+    fleet.run(until=backend.clock.now + 1.5)
+    texts = [label.props['text'] for label in backend.labels]
+    assert texts[0].startswith('1  00:00  ')
+    assert texts[1].startswith('2  00:59  ')
+    assert all(label.placed is not None for label in backend.labels)
+    fleet.close()
@@ -0,0 +1,105 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import random
+
+from game import (CARD_ACCEPTED, CARD_REJECTED, COMPLETE, IDLE,
+                  MISSION_COMPLETE, READY, RUNNING, TICK, TIMEOUT, GameEngine)
+
+SESSIONS = 2000
+
+
+class Clock:
+    def __init__(self) -> None:
+        self.now = 0.0
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# Engine on an injected clock, events recorded with the clock time and
+# the robot armed like App.on_game_event does
+def engine(game_time=10, message_time=3):
+    clock = Clock()
+    game = GameEngine(clock, game_time, message_time)
+    events = []
+    armed = [False]
+
+    def on_event(event):
+        events.append((event, clock.now, game.shown))
+        if event == CARD_ACCEPTED:
+            armed[0] = True
+        elif event == TIMEOUT:
+            armed[0] = False
+
+    game.on_event = on_event
+    return clock, game, events, armed
+
+
+# Many sessions with every update() up to `late` seconds after the deadline
+def test_sessions_with_late_updates():
+    rng = random.Random(1)
+    clock, game, events, armed = engine()
+    for session in range(SESSIONS):
+        late = rng.choice((0, 0.01, 0.3, 2.5))
+        del events[:]
+        assert game.card_scanned(session)
+        ends = game.ends
+        assert ends == clock.now + game.game_time
+        while game.state != IDLE:
+            deadline = game.next_deadline()
+            # Just before a deadline nothing changes, armed until ends
+            clock.now = deadline - 1e-6
+            game.update()
+            assert armed[0] == (clock.now < ends)
+            clock.now = deadline + rng.uniform(0, late)
+            game.update()
+            assert armed[0] == (clock.now < ends)
+        kinds = [event for event, _, _ in events]
+        ticks = kinds.count(TICK)
+        assert kinds == [CARD_ACCEPTED] + [TICK] * ticks + \
+            [TIMEOUT, MISSION_COMPLETE, READY]
+        shown = [value for event, _, value in events if event == TICK]
+        assert shown == sorted(set(shown), reverse=True)
+        assert shown[0] == game.game_time
+        if late == 0:
+            assert shown == list(range(game.game_time, 0, -1))
+        # Disarmed on the first update at or after `ends`, however late
+        timeout_at = events[kinds.index(TIMEOUT)][1]
+        assert ends <= timeout_at <= ends + late
+        clock.now += rng.uniform(0, 5)
+    assert game.games == SESSIONS
+
+
+# Updates exactly on the deadlines: the robot is disarmed exactly at ends
+def test_disarmed_exactly_at_ends():
+    clock, game, events, armed = engine(game_time=120)
+    game.card_scanned('card')
+    while game.state == RUNNING:
+        clock.now = game.next_deadline()
+        game.update()
+    assert not armed[0]
+    assert clock.now == game.ends
+    assert events[-2][:2] == (TIMEOUT, game.ends)
+
+
+def test_rejected_card():
+    clock, game, events, armed = engine()
+    assert not game.card_scanned('card', used=True)
+    assert game.state == COMPLETE and not armed[0]
+    assert [event for event, _, _ in events] == [CARD_REJECTED,
+                                                 MISSION_COMPLETE]
+    # The message ends on its deadline
+    clock.now = game.next_deadline()
+    game.update()
+    assert game.state == IDLE
+    assert events[-1][0] == READY
+    assert game.rejected == 1 and game.games == 0
+    # Cards are ignored while a game runs
+    assert game.card_scanned('new')
+    assert not game.card_scanned('other')
+    assert game.card == 'new' and game.games == 1
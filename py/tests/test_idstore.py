@@ -0,0 +1,27 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from idstore import UsedIdStore
+
+
+# Cards merged older than the newest one still expire in order
+def test_merge_out_of_order():
+    now = [1000.0]
+    store = UsedIdStore(ttl=100, clock=lambda: now[0])
+    store.add(1)
+    assert store.merge(2, 950)
+    assert store.merge(3, 920)
+    assert not store.merge(2, 990)
+    assert store.merge(1, 910)
+    assert not store.merge(4, 900)
+    now[0] = 1015
+    assert store.purge() == 1
+    assert 1 not in store and 3 in store
+    assert list(store) == [3, 2]
+    now[0] = 1050
+    assert store.purge() == 2
+    assert len(store) == 0
@@ -0,0 +1,126 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from idstore import UsedIdStore
+from idsync import IdSyncLink
+
+TTL = 3600
+
+
+class Clock:
+    def __init__(self, now: float = 0.0) -> None:
+        self.now = now
+
+    def __call__(self) -> float:
+        return self.now
+
+
+# Port that hands everything written to the peer link
+class Wire:
+    in_waiting = 0
+
+    def __init__(self) -> None:
+        self.peer = None
+        self.out_waiting = 0
+        self.writes = 0
+
+    def write(self, data: bytes) -> None:
+        self.writes += 1
+        self.peer.feed(data)
+
+
+# Two linked units, unit B's clock runs `offset` seconds ahead
+def units(offset: float = 0.0):
+    clock_a, clock_b = Clock(), Clock(offset)
+    store_a = UsedIdStore(ttl=TTL, clock=clock_a)
+    store_b = UsedIdStore(ttl=TTL, clock=clock_b)
+    wire_a, wire_b = Wire(), Wire()
+    link_a = IdSyncLink(wire_a, store_a, clock=clock_a)
+    link_b = IdSyncLink(wire_b, store_b, clock=clock_b)
+    wire_a.peer, wire_b.peer = link_b, link_a
+    return (clock_a, store_a, link_a), (clock_b, store_b, link_b)
+
+
+def advance(clocks, seconds: float) -> None:
+    for clock in clocks:
+        clock.now += seconds
+
+
+# Poll until all queued gossip went out
+def drain(*links) -> None:
+    while any(link.outbox for link in links):
+        for link in links:
+            link.poll()
+
+
+def test_synced_id_keeps_expiry():
+    (clock_a, store_a, link_a), (clock_b, store_b, link_b) = units(offset=500)
+    store_a.add(42)
+    advance((clock_a, clock_b), 1000)
+    link_b.request_sync()
+    drain(link_a)
+    assert 42 in store_b
+    advance((clock_a, clock_b), TTL - 1000 - 1)
+    assert 42 in store_a and 42 in store_b
+    advance((clock_a, clock_b), 2)
+    assert 42 not in store_a and 42 not in store_b
+
+
+def test_gossip_keeps_expiry():
+    (clock_a, store_a, link_a), (clock_b, store_b, _) = units()
+    store_a.add(7)
+    link_a.announce(7)
+    advance((clock_a, clock_b), 100)
+    link_a.flush()
+    advance((clock_a, clock_b), TTL - 100 - 1)
+    assert 7 in store_b
+    advance((clock_a, clock_b), 2)
+    assert 7 not in store_b
+
+
+def test_resync_keeps_older_first_use():
+    (clock_a, store_a, link_a), (clock_b, store_b, link_b) = units()
+    store_a.add(1)
+    advance((clock_a, clock_b), 1000)
+    store_b.add(1)
+    store_b.add(2)
+    link_b.request_sync()
+    link_a.request_sync()
+    drain(link_a, link_b)
+    assert store_a.age(1) == store_b.age(1) == 1000
+    assert store_a.age(2) == store_b.age(2) == 0
+    advance((clock_a, clock_b), TTL - 1000)
+    assert store_a.purge() == store_b.purge() == 1
+    assert list(store_a) == list(store_b) == [2]
+
+
+def test_expired_and_old_format_gossip():
+    (clock_a, _, link_a), (clock_b, store_b, link_b) = units()
+    advance((clock_a, clock_b), TTL)
+    link_a.send('G', f'5:{TTL},6')
+    assert 5 not in store_b
+    assert store_b.age(6) == 0
+    assert link_b.bad == 0
+
+
+# A resync goes out a few frames per poll, and only while the port has room
+def test_resync_never_blocks():
+    (_, store_a, link_a), (_, store_b, link_b) = units()
+    for card_id in range(3000):
+        store_a.add(card_id)
+    link_b.request_sync()
+    link_a.port.out_waiting = link_a.MAX_QUEUED
+    link_a.poll()
+    assert link_a.port.writes == 0
+    link_a.port.out_waiting = 0
+    store_a.add(5000)
+    link_a.announce(5000)
+    link_a.poll()
+    assert link_a.port.writes == link_a.MAX_FRAMES
+    assert 5000 in store_b
+    drain(link_a)
+    assert sorted(store_b) == sorted(store_a)
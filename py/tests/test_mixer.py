@@ -0,0 +1,40 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+import random
+
+from mixer import FrameTable, expo, mix_frame
+from rpi_cu import RobotController
+from sim import SimBackend, set_backend
+
+
+# The control loop sends exactly what mix_frame() computes: no PWM error
+# and no direction bit differences
+def test_default_frames_are_exact():
+    backend = SimBackend()
+    set_backend(backend)
+    controller = RobotController(backend, keepalive=0)
+    assert controller.frame_table is None
+    rng = random.Random(1)
+    for _ in range(2000):
+        backend.joystick(0, rng.random())
+        backend.joystick(1, rng.random())
+        frame = controller.handle_joy()
+        x, y = controller.joystick_reader.read()
+        assert frame == mix_frame(x, y, controller.button_reader.read())
+
+
+# The table is exact on its grid
+def test_frame_table_grid():
+    curve, trim_l = expo(0.4), 0.95
+    table = FrameTable(4, curve, trim_l)
+    s = table.scale
+    for qx in range(s + 1):
+        for qy in range(s + 1):
+            for mask in range(32):
+                assert table.frame(qx / s, qy / s, mask) == \
+                    mix_frame(qx / s, qy / s, mask, curve, trim_l)
@@ -0,0 +1,68 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from protocol import FLAG_CRC_ERR, encode_reply, hello_frame
+from telemetry import TelemetryParser
+
+
+def replies(first, count):
+    return b''.join(encode_reply(seq & 0xFF, 800 + seq, 0)
+                    for seq in range(first, first + count))
+
+
+def parse(*chunks):
+    parser = TelemetryParser()
+    seqs = []
+    parser.on_reply = lambda ok, seq: seqs.append(seq)
+    for chunk in chunks:
+        parser.feed(chunk)
+    return parser, seqs
+
+
+def test_junk_before_replies():
+    parser, seqs = parse(b'\x12\x34' + replies(1, 20), replies(21, 10))
+    assert seqs == list(range(1, 31))
+    assert parser.lost == 0
+    assert parser.bat == 830
+
+
+def test_ascii_junk_before_replies():
+    parser, seqs = parse(b'12' + replies(1, 20))
+    assert seqs == list(range(1, 21))
+
+
+def test_corrupted_reply_in_between():
+    bad = bytearray(encode_reply(11, 810, 0))
+    bad[3] ^= 0x40
+    parser, seqs = parse(replies(1, 10) + bytes(bad) + replies(12, 10))
+    assert seqs == list(range(1, 11)) + list(range(12, 22))
+    assert parser.lost == 1
+
+
+def test_truncated_reply_in_between():
+    parser, seqs = parse(replies(1, 10) + encode_reply(11, 810, 0)[:4],
+                         replies(12, 10))
+    assert seqs == list(range(1, 11)) + list(range(12, 22))
+
+
+def test_lines_and_binary_mixed():
+    parser, seqs = parse(b'MOODBOT v0.5.0\r\n' + hello_frame(2) +
+                         b'\xfd812:OK\r\n' + replies(1, 3))
+    assert parser.version == 2
+    assert seqs == [None, 1, 2, 3]
+    assert parser.ok == 4
+
+
+# A frame the robot rejected is counted in err only, not again as lost
+def test_rejected_frame_not_lost():
+    rejected = encode_reply(0x55, 805, FLAG_CRC_ERR)
+    parser, seqs = parse(replies(1, 4), rejected, replies(6, 4))
+    assert parser.err == 1 and parser.lost == 0
+    parser, seqs = parse(replies(1, 4), rejected, replies(7, 4))
+    assert parser.err == 1 and parser.lost == 1
+    parser, seqs = parse(replies(1, 4), rejected, rejected, replies(6, 4))
+    assert parser.err == 2 and parser.lost == 0
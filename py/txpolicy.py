@@ -0,0 +1,73 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from time import monotonic
+from typing import Callable, Optional
+
+
+# Change-driven frame transmission. A frame that differs from the last one
+# sent goes out at once, a repeat only when `keepalive` seconds have passed
+# since the last send. The robot stops on its own when frames stop coming
+# (FAILSAFE_MS in arduino.ino), so the keepalive has to stay well below
+# that deadline while it is driving.
+class TxPolicy:
+    KEEPALIVE = 0.2     # Seconds between repeats of an unchanged frame
+
+    def __init__(self, port, keepalive: float = KEEPALIVE,
+                 clock: Callable[[], float] = monotonic) -> None:
+        self.port = port
+        self.keepalive = keepalive
+        self.clock = clock
+        self.last = None
+        self.prev = None        # Frame sent before `last`
+        self.last_sent = 0.0
+        self.started = clock()
+        self.offered = 0        # Frames handed to send()
+        self.sent = 0           # Frames written to the port
+        self.changes = 0        # ... because they differed from the last one
+        self.keepalives = 0     # ... because the keepalive was due
+        self.forced = 0         # ... because the caller forced them
+
+    # Send `frame` if it changed or the keepalive is due, returns True if
+    # it was written. `keepalive` overrides the default interval.
+    def send(self, frame: bytes, keepalive: Optional[float] = None,
+             force: bool = False) -> bool:
+        now = self.clock()
+        self.offered += 1
+        if force:
+            self.forced += 1
+        elif frame != self.last:
+            self.changes += 1
+        elif now - self.last_sent >= (self.keepalive if keepalive is None
+                                      else keepalive):
+            self.keepalives += 1
+        else:
+            return False
+        self.port.write(frame)
+        self.prev = self.last
+        self.last = frame
+        self.last_sent = now
+        self.sent += 1
+        return True
+
+    # Counters plus offered/sent frame rates since the last reset
+    def stats(self) -> dict:
+        elapsed = max(self.clock() - self.started, 1e-9)
+        return {
+            'offered': self.offered,
+            'sent': self.sent,
+            'changes': self.changes,
+            'keepalives': self.keepalives,
+            'forced': self.forced,
+            'offered_rate': self.offered / elapsed,
+            'sent_rate': self.sent / elapsed,
+        }
+
+    def reset_stats(self) -> None:
+        self.started = self.clock()
+        self.offered = self.sent = 0
+        self.changes = self.keepalives = self.forced = 0
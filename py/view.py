@@ -0,0 +1,88 @@
+# Product: MoodBot (Control Unit)
+# Author:  Edgars Grankins
+# Company: GRCR-Technologies
+# Date:    18.10.2026
+# Version: 0.5
+# License: LGPLv3
+
+from typing import Dict, Optional
+
+FORGOTTEN = None    # Placement of a label that is not shown
+
+
+# Label state as the control code wants it. set()/place()/forget() only
+# record the wanted state, flush() runs at most every `refresh` ms and
+# touches a widget only for options that differ from what it shows, so
+# redraw work does not follow the control loop rate.
+class ViewModel:
+    REFRESH = 100       # Minimum ms between flushes (10 Hz)
+
+    def __init__(self, window, make_label, refresh: int = REFRESH) -> None:
+        self.window = window
+        self.make_label = make_label
+        self.refresh = refresh
+        self.labels = {}
+        self.shown: Dict[str, dict] = {}
+        self.wanted: Dict[str, dict] = {}
+        self.placed: Dict[str, Optional[dict]] = {}
+        self.placing: Dict[str, Optional[dict]] = {}
+        self.scheduled = False
+        self.requests = 0       # set/place/forget calls
+        self.flushes = 0        # flush() runs
+        self.updates = 0        # Widget config/place calls made
+        self.skipped = 0        # Changes dropped as already shown
+
+    # Create a label with its initial options, it starts unplaced
+    def label(self, name: str, **options):
+        widget = self.labels[name] = self.make_label(self.window, **options)
+        self.shown[name] = dict(options)
+        self.placed[name] = FORGOTTEN
+        return widget
+
+    # Want new options for a label
+    def set(self, name: str, **options) -> None:
+        self.wanted.setdefault(name, {}).update(options)
+        self.schedule()
+
+    # Want a label placed at `x`/`y`
+    def place(self, name: str, **placement) -> None:
+        self.placing[name] = placement
+        self.schedule()
+
+    # Want a label hidden
+    def forget(self, name: str) -> None:
+        self.placing[name] = FORGOTTEN
+        self.schedule()
+
+    # Flush `refresh` ms after the first change since the last flush
+    def schedule(self) -> None:
+        self.requests += 1
+        if not self.scheduled:
+            self.scheduled = True
+            self.window.after(self.refresh, self.flush)
+
+    # Apply what changed since the last flush
+    def flush(self) -> None:
+        self.scheduled = False
+        self.flushes += 1
+        wanted, self.wanted = self.wanted, {}
+        for name, options in wanted.items():
+            shown = self.shown[name]
+            diff = {k: v for k, v in options.items() if shown.get(k) != v}
+            self.skipped += len(options) - len(diff)
+            if diff:
+                self.labels[name].config(**diff)
+                shown.update(diff)
+                self.updates += 1
+
+        placing, self.placing = self.placing, {}
+        for name, placement in placing.items():
+            if placement == self.placed[name]:
+                self.skipped += 1
+                continue
+            if placement is FORGOTTEN:
+                self.labels[name].place_forget()
+            else:
+                self.labels[name].place(**placement)
+            self.placed[name] = placement
+            self.updates += 1